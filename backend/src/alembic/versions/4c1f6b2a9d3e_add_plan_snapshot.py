@@ -0,0 +1,27 @@
+"""Add plan snapshot
+
+Revision ID: 4c1f6b2a9d3e
+Revises: b0de57f30350
+Create Date: 2026-10-18 10:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c1f6b2a9d3e'
+down_revision: Union[str, None] = 'b0de57f30350'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The column already exists in databases created by Base.metadata.create_all
+    op.execute("ALTER TABLE plans ADD COLUMN IF NOT EXISTS plan_snapshot BYTEA")
+
+
+def downgrade() -> None:
+    op.drop_column('plans', 'plan_snapshot')
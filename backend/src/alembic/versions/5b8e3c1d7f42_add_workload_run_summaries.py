@@ -0,0 +1,42 @@
+"""Add workload run summaries
+
+Revision ID: 5b8e3c1d7f42
+Revises: 9e2d4a7b5c18
+Create Date: 2026-10-18 14:21:09.318274
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b8e3c1d7f42'
+down_revision: Union[str, None] = '9e2d4a7b5c18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The table may already exist in databases created by Base.metadata.create_all, summaries are backfilled on startup
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS workload_run_summaries (
+            workload_run_id INTEGER NOT NULL REFERENCES workload_runs (id),
+            queries_count INTEGER NOT NULL,
+            runtime_min FLOAT,
+            runtime_max FLOAT,
+            runtime_mean FLOAT,
+            runtime_histogram JSONB NOT NULL,
+            joins_histogram JSONB NOT NULL,
+            tables_histogram JSONB NOT NULL,
+            nodes_histogram JSONB NOT NULL,
+            PRIMARY KEY (workload_run_id)
+        )
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('workload_run_summaries')
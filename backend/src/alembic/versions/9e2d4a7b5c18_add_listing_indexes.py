@@ -0,0 +1,51 @@
+"""Add listing and plan tree indexes
+
+Revision ID: 9e2d4a7b5c18
+Revises: 4c1f6b2a9d3e
+Create Date: 2026-10-18 11:03:27.904512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e2d4a7b5c18'
+down_revision: Union[str, None] = '4c1f6b2a9d3e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+plan_stats_columns = ["nodes", "plans", "joins", "tables", "columns", "predicates"]
+
+indexes = [
+    ("ix_plans_workload_run_id_id_in_run", "plans", ["workload_run_id", "id_in_run", "id"]),
+    ("ix_plans_workload_run_id_plan_runtime", "plans", ["workload_run_id", "plan_runtime", "id"]),
+    ("ix_plans_top_plan_id", "plans", ["top_plan_id"]),
+    ("ix_plans_parent_id", "plans", ["parent_id"]),
+    ("ix_plans_plan_stats_id", "plans", ["plan_stats_id"]),
+    ("ix_output_columns_top_plan_id", "output_columns", ["top_plan_id"]),
+    ("ix_output_columns_columns_output_column_id", "output_columns_columns", ["output_column_id"]),
+    ("ix_plan_output_columns_output_column_id", "plan_output_columns", ["output_column_id"]),
+    ("ix_logical_nodes_top_plan_id", "logical_nodes", ["top_plan_id"]),
+    ("ix_logical_nodes_parent_id", "logical_nodes", ["parent_id"]),
+    *[(f"ix_plan_stats_workload_run_id_{column}", "plan_stats", ["workload_run_id", column, "id"]) for column in plan_stats_columns],
+]
+
+
+def upgrade() -> None:
+    # Tables, columns and indexes may already exist in databases created by Base.metadata.create_all
+    op.execute("ALTER TABLE plan_stats ADD COLUMN IF NOT EXISTS workload_run_id INTEGER REFERENCES workload_runs (id)")
+    op.execute("UPDATE plan_stats SET workload_run_id = plans.workload_run_id FROM plans WHERE plans.plan_stats_id = plan_stats.id AND plan_stats.workload_run_id IS NULL")
+    for name, table, columns in indexes:
+        quoted_columns = ", ".join(f'"{column}"' for column in columns)
+        op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({quoted_columns})")
+    for table in {table for _, table, _ in indexes}:
+        op.execute(f"ANALYZE {table}")
+
+
+def downgrade() -> None:
+    for name, _, _ in indexes:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+    op.drop_column('plan_stats', 'workload_run_id')
@@ -0,0 +1,36 @@
+"""Add plan artifacts
+
+Revision ID: c3a9f0e6d2b1
+Revises: 5b8e3c1d7f42
+Create Date: 2026-10-18 15:02:44.170398
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3a9f0e6d2b1'
+down_revision: Union[str, None] = '5b8e3c1d7f42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The table may already exist in databases created by Base.metadata.create_all, artifacts are rendered on the first request
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS plan_artifacts (
+            plan_id INTEGER NOT NULL REFERENCES plans (id),
+            version VARCHAR NOT NULL,
+            response TEXT NOT NULL,
+            PRIMARY KEY (plan_id)
+        )
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('plan_artifacts')
@@ -0,0 +1,24 @@
+import sys
+
+sys.path.append("./zero_shot_learned_db")
+
+from tqdm import tqdm
+from config import get_settings
+from query.db import Session, get_db, setup_db_connection
+from query.models import Plan
+from query.store import store_plan_snapshots
+
+
+def backfill_plan_snapshots(db: Session, batch_size: int):
+    plan_ids = [i[0] for i in db.query(Plan.id).filter(Plan.workload_run_id.is_not(None), Plan.plan_snapshot.is_(None)).order_by(Plan.id).all()]
+    print(f"Backfilling snapshots of {len(plan_ids)} plans")
+    for start in tqdm(range(0, len(plan_ids), batch_size)):
+        store_plan_snapshots(plan_ids[start : start + batch_size], db)
+        db.commit()
+
+
+if __name__ == "__main__":
+    settings = get_settings()
+    setup_db_connection(settings)
+    with next(get_db()) as db:
+        backfill_plan_snapshots(db, settings.query.ingestion_chunk_size)
@@ -0,0 +1,39 @@
+import copy
+import sys
+import time
+
+sys.path.append("./zero_shot_learned_db")
+
+from config import get_settings
+from ml.dependencies import MLHelperOld
+from ml.scheduler import ModelWorkerPool
+from ml.service import ExplainerType, explainers
+
+
+def benchmark_explainer_pool(ml: MLHelperOld, calls: int):
+    """Prints the per-call overhead of getting an explainer, built on every call versus taken from a pooled replica"""
+    pool = ModelWorkerPool(ml.model, 1)
+    # Explainers built per call register hooks on their model, so they get their own copy
+    model = copy.deepcopy(ml.model)
+    for explainer_type in ExplainerType:
+        start_time = time.perf_counter()
+        for _ in range(calls):
+            explainers[explainer_type](model, log=False)
+        built_time = time.perf_counter() - start_time
+
+        with pool.acquire() as replica:
+            replica.get_explainer(explainer_type, False)
+        start_time = time.perf_counter()
+        for _ in range(calls):
+            with pool.acquire() as replica:
+                replica.get_explainer(explainer_type, False)
+        pooled_time = time.perf_counter() - start_time
+        print(f"{explainer_type}: built {built_time / calls * 1e6:.1f}us, pooled {pooled_time / calls * 1e6:.1f}us per call")
+
+
+if __name__ == "__main__":
+    # python benchmark_explainer_pool.py <dataset file in ml__base_data_dir> [calls]
+    settings = get_settings()
+    ml = MLHelperOld()
+    ml.load(settings, sys.argv[1])
+    benchmark_explainer_pool(ml, int(sys.argv[2]) if len(sys.argv) > 2 else 100)
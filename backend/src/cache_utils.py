@@ -0,0 +1,150 @@
+import sys
+import threading
+import types
+from collections import OrderedDict
+from enum import StrEnum
+from typing import Any, Callable, Generic, Hashable, Iterable, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class EvictionPolicy(StrEnum):
+    LRU = "lru"
+    FIFO = "fifo"
+
+
+class LRUCache(Generic[K, V]):
+    max_size: int
+    max_bytes: int | None
+    eviction_policy: EvictionPolicy
+    bytes: int
+    hits: int
+    misses: int
+    evictions: int
+
+    def __init__(self, max_size: int, max_bytes: int | None = None, size_fn: Callable[[V], int] | None = None, eviction_policy: EvictionPolicy = EvictionPolicy.LRU):
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.eviction_policy = eviction_policy
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._size_fn = size_fn
+        self._items: OrderedDict[K, tuple[V, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key: K):
+        return key in self._items
+
+    def get(self, key: K) -> V | None:
+        with self._lock:
+            if key not in self._items:
+                self.misses += 1
+                return None
+            self.hits += 1
+            if self.eviction_policy == EvictionPolicy.LRU:
+                self._items.move_to_end(key)
+            return self._items[key][0]
+
+    def put(self, key: K, value: V):
+        size = self._size_fn(value) if self._size_fn is not None else 0
+        with self._lock:
+            if key in self._items:
+                self.bytes -= self._items[key][1]
+            self._items[key] = (value, size)
+            self._items.move_to_end(key)
+            self.bytes += size
+            self._evict()
+
+    def refresh(self, key: K):
+        """Recomputes the size of an entry, e.g. after the cached object grew"""
+        with self._lock:
+            if key not in self._items or self._size_fn is None:
+                return
+            value, size = self._items[key]
+        new_size = self._size_fn(value)
+        with self._lock:
+            if key not in self._items or self._items[key][0] is not value:
+                return
+            self._items[key] = (value, new_size)
+            self.bytes += new_size - size
+            self._evict()
+
+    def pop(self, key: K):
+        with self._lock:
+            if key not in self._items:
+                return None
+            value, size = self._items.pop(key)
+            self.bytes -= size
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.bytes = 0
+
+    def stats(self):
+        return {
+            "size": len(self._items),
+            "max_size": self.max_size,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _evict(self):
+        # The most recently stored entry is always kept, even if it alone exceeds the byte budget
+        while len(self._items) > 1 and (len(self._items) > self.max_size or (self.max_bytes is not None and self.bytes > self.max_bytes)):
+            _, (_, size) = self._items.popitem(last=False)
+            self.bytes -= size
+            self.evictions += 1
+        if len(self._items) > self.max_size:
+            self._items.clear()
+            self.bytes = 0
+
+
+_skipped_types = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType)
+
+
+def estimate_size(obj: Any, exclude: Iterable[Any] = ()) -> int:
+    """
+    Approximates the memory used by an object graph in bytes.
+    Tensors, numpy arrays and DGL graphs are counted by their buffers; objects in exclude (e.g. shared statistics) are not counted.
+    """
+    seen = set(id(o) for o in exclude)
+    size = 0
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        if id(o) in seen or isinstance(o, _skipped_types):
+            continue
+        seen.add(id(o))
+
+        if hasattr(o, "element_size") and hasattr(o, "nelement"):
+            size += o.element_size() * o.nelement()
+        elif isinstance(getattr(o, "nbytes", None), int):
+            size += o.nbytes
+        elif hasattr(o, "canonical_etypes") and hasattr(o, "num_edges"):
+            # DGL graph: int64 source and destination id per edge plus node and edge features
+            size += 2 * 8 * o.num_edges()
+            for ntype in o.ntypes:
+                stack.extend(o.nodes[ntype].data.values())
+            for etype in o.canonical_etypes:
+                stack.extend(o.edges[etype].data.values())
+        else:
+            size += sys.getsizeof(o)
+            if isinstance(o, dict):
+                stack.extend(o.keys())
+                stack.extend(o.values())
+            elif isinstance(o, (list, tuple, set, frozenset)):
+                stack.extend(o)
+            elif hasattr(o, "__dict__"):
+                stack.append(o.__dict__)
+    return size
@@ -2,6 +2,8 @@ from functools import lru_cache
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 from evaluation.config import EvaluationSettings
+from health.config import HealthSettings
+from jobs.config import JobsSettings
 from ml.config import MLSettings
 from query.config import QuerySettings
 
@@ -19,6 +21,8 @@ class Settings(BaseSettings):
     ml: MLSettings = MLSettings()
     eval: EvaluationSettings = EvaluationSettings()
     query: QuerySettings = QuerySettings()
+    jobs: JobsSettings = JobsSettings()
+    health: HealthSettings = HealthSettings()
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", env_nested_delimiter="__")
 
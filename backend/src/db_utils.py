@@ -1,7 +1,10 @@
 import subprocess
 import os.path
+from alembic import command
+from alembic.config import Config
 from config import Settings
 import psycopg2
+from sqlalchemy import Engine, MetaData, inspect
 from psycopg2 import sql
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
 
@@ -41,3 +44,26 @@ def restore_backup(settings: Settings, database_name: str, backup_file: str):
         process.wait()
 
         print(f"Restored backup {backup_file} in {database_name}")
+
+
+def upgrade_db():
+    """Runs all alembic migrations, which add columns and tables of newer versions to restored backups and existing databases"""
+    alembic_dir = os.path.dirname(os.path.abspath(__file__))
+    config = Config(os.path.join(alembic_dir, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(alembic_dir, "alembic"))
+    # Keeps the logging configuration of the server
+    config.attributes["configure_logger"] = False
+    command.upgrade(config, "head")
+
+
+def get_missing_columns(engine: Engine, metadata: MetaData):
+    """Columns of the models that are missing in existing tables of the database, missing tables are created by create_all"""
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    missing_columns: list[str] = []
+    for table in metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+        missing_columns.extend(f"{table.name}.{column.name}" for column in table.columns if column.name not in existing_columns)
+    return missing_columns
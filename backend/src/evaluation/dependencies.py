@@ -6,7 +6,7 @@ from config import Settings, get_settings
 from evaluation.models import EvaluationRun, PlanExplanation
 from ml.dependencies import MLHelper
 from ml.service import ExplainerType
-from query.dependecies import InferenceMutex, get_parsed_plan
+from query.dependecies import get_parsed_plan
 from query.models import Dataset, Plan, PlanStats, WorkloadRun
 from query.db import db_depends
 from evaluation.service import explainers_for_evaluation
@@ -49,11 +49,8 @@ def store_and_get_explanations_for_workload(
                         continue
                     plan_explanation = next(filter(lambda x: x.explainer_type == explainer_type and x.plan_id == plan.id and x.model_name == model.name, existing_explanations), None)
                     if plan_explanation is None:
-                        with InferenceMutex() as mutex:
-                            explainer = ml.get_explainer(explainer_type, workload.dataset.name, model.name)
-                            parsed_plan = get_parsed_plan(plan.id, db, ml, mutex)
-                            parsed_plan.prepare_plan_for_inference()
-                            explanation = explainer.explain(parsed_plan)
+                        parsed_plan = get_parsed_plan(plan.id, db, ml)
+                        explanation = ml.explain_plan(parsed_plan, explainer_type, model.name)
                         plan_explanation = PlanExplanation(
                             explainer_type=explainer_type,
                             plan_id=plan.id,
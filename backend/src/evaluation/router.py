@@ -13,8 +13,10 @@ from evaluation.service import EvaluationScoreToDraw, QErrorToDraw, create_dirs,
 from evaluation_fns.dependencies import EvaluationBaseParams
 from evaluation_fns.router import fidelity_minus, fidelity_plus, pearson, pearson_node_depth, spearman, pearson_cardinality, spearman_cardinality, spearman_node_depth
 from ml.dependencies import MLHelper
+from ml.perturbation import MemoizedExplainer
+from ml.plan_view import ParsedPlanView
 from ml.service import ExplainerType
-from query.dependecies import InferenceMutex, get_parsed_plan
+from query.dependecies import get_parsed_plan
 from query.db import db_depends
 from query.models import Plan, PlanStats, WorkloadRun
 from utils import save_model_to_file
@@ -86,12 +88,15 @@ def run_all_for_workload(
 
     for plan, node_explanation in tqdm(evaluation_run.explanations):
         for plan_explanation in node_explanation:
+            # Shared by all evaluation types of the explanation, so masked variants repeated across fidelity thresholds are predicted once
+            parsed_plan: ParsedPlanView | None = None
+            predictions = {}
             for evaluation_type, fn in score_evaluation_fns:
                 res = next(filter(lambda x: x.evaluation_type == evaluation_type, plan_explanation.evaluations), None)
                 if res is None:
-                    with InferenceMutex() as mutex:
-                        parsed_plan = get_parsed_plan(plan.id, db, ml, mutex)
-                        parsed_plan.prepare_plan_for_inference()
+                    if parsed_plan is None:
+                        parsed_plan = ml.get_plan_view(get_parsed_plan(plan.id, db, ml))
+                    with ml.lease_model(plan_explanation.model_name) as lease:
                         if evaluation_type == EvaluationType.CHARACTERIZATION_SCORE:
                             fidelity_plus_score = next(filter(lambda x: x.evaluation_type == EvaluationType.FIDELITY_PLUS, plan_explanation.evaluations))
                             fidelity_minus_score = next(filter(lambda x: x.evaluation_type == EvaluationType.FIDELITY_MINUS, plan_explanation.evaluations))
@@ -104,9 +109,10 @@ def run_all_for_workload(
                             )
                             base_params = EvaluationBaseParams(
                                 parsed_plan=parsed_plan,
-                                base_explainer=ml.get_explainer(ExplainerType.BASE, parsed_plan.dataset_name, plan_explanation.model_name),
+                                base_explainer=MemoizedExplainer(lease.get_explainer(ExplainerType.BASE), predictions),
                                 ml=ml,
                                 explanation=explanation,
+                                lease=lease,
                             )
                             res = fn(base_params)
                             score = EvaluationScore(score=res.score, evaluation_type=evaluation_type)
@@ -272,14 +278,14 @@ def get_most_important_nodes(
         for explanation in tqdm(run.plan_explanations):
             base_scores = [NodeScore(**score) for score in explanation.base_scores]
             node_id = max(base_scores, key=lambda x: x.score).node_id
-            parsed_plan = get_parsed_plan(explanation.plan_id, db, ml, None)
+            parsed_plan = get_parsed_plan(explanation.plan_id, db, ml)
             node = parsed_plan.get_node(node_id)
             gather_most_important_node_stats(node, most_important_nodes, explanation.explainer_type, explanation.model_name)
 
             if explanation.plan_id not in already_evaluated_plans_with_base_explainers:
                 for base_explainer_type in [ExplainerType.BASE, ExplainerType.BASE_CARDINALITY, ExplainerType.BASE_NODE_DEPTH]:
-                    base_explainer = ml.get_explainer(base_explainer_type)
-                    node_id = max(base_explainer.explain(parsed_plan).base_scores, key=lambda x: x.score).node_id
+                    with parsed_plan.lock, ml.get_explainer(base_explainer_type) as base_explainer:
+                        node_id = max(base_explainer.explain(parsed_plan).base_scores, key=lambda x: x.score).node_id
                     node = parsed_plan.get_node(node_id)
                     gather_most_important_node_stats(node, most_important_nodes, base_explainer_type)
                 already_evaluated_plans_with_base_explainers.append(explanation.plan_id)
@@ -346,10 +352,9 @@ def draw_plots_qerror(
                 for plan in tqdm(plans):
                     prediction = db.query(EvalPrediction).filter(EvalPrediction.plan_id == plan.id, EvalPrediction.model_name == model.name).first()
                     if prediction is None:
-                        with InferenceMutex() as mutex:
-                            parsed_plan = get_parsed_plan(plan.id, db, ml, mutex)
-                            parsed_plan.prepare_plan_for_inference()
-                            base_explainer = ml.get_explainer(ExplainerType.BASE, parsed_plan.dataset_name, model.name)
+                        parsed_plan = get_parsed_plan(plan.id, db, ml)
+                        with parsed_plan.lock, ml.get_explainer(ExplainerType.BASE, model.name) as base_explainer:
+                            ml.prepare_plan_for_inference(parsed_plan)
                             prediction = base_explainer.predict(parsed_plan)
                             db.add(EvalPrediction(plan_id=plan.id, model_name=model.name, prediction=prediction.prediction, qerror=prediction.qerror))
                     if prediction.qerror > settings.eval.valid_qerror_threshold:
@@ -2,8 +2,10 @@ from typing import Annotated
 from fastapi import Depends, HTTPException
 
 from ml.dependencies import MLHelper
+from ml.perturbation import MemoizedExplainer
+from ml.scheduler import ModelLease
 from ml.service import ExplainerType
-from query.dependecies import get_explainer_optional_for_parsed_plan, get_parsed_plan_for_inference, inference_mutex
+from query.dependecies import get_explainer_optional_for_parsed_plan, get_model_lease, get_parsed_plan_for_inference
 from query.schemas import ExplanationResponseBase
 
 from zero_shot_learned_db.explanations.data_models.explanation import Explanation
@@ -16,18 +18,28 @@ class EvaluationBaseParams:
     base_explainer: BaseExplainer
     ml: MLHelper
     explanation: Explanation
+    lease: ModelLease | None
+    explainers: dict[ExplainerType, MemoizedExplainer]
 
-    def __init__(self, parsed_plan: ParsedPlan, base_explainer: BaseExplainer, ml: MLHelper, explanation: Explanation):
+    def __init__(self, parsed_plan: ParsedPlan, base_explainer: BaseExplainer, ml: MLHelper, explanation: Explanation, lease: ModelLease | None = None):
         self.parsed_plan = parsed_plan
         self.base_explainer = base_explainer
         self.ml = ml
         self.explanation = explanation
+        self.lease = lease
+        self.explainers = {ExplainerType.BASE: base_explainer} if isinstance(base_explainer, MemoizedExplainer) else {}
+
+    def get_explainer(self, explainer_type: ExplainerType):
+        """Memoized explainer of the lease, so all metrics of a request share its predictions and explanations of the plan"""
+        if explainer_type not in self.explainers:
+            self.explainers[explainer_type] = MemoizedExplainer(self.lease.get_explainer(explainer_type))
+        return self.explainers[explainer_type]
 
 
 def evaluation_base_params(
     parsed_plan: Annotated[ParsedPlan, Depends(get_parsed_plan_for_inference)],
     explainer: Annotated[BaseExplainer, Depends(get_explainer_optional_for_parsed_plan)],
-    inference_mutex: Annotated[None, Depends(inference_mutex)],
+    lease: Annotated[ModelLease, Depends(get_model_lease)],
     ml: Annotated[MLHelper, Depends()],
     explanation: ExplanationResponseBase | None = None,
 ):
@@ -39,7 +51,8 @@ def evaluation_base_params(
 
     yield EvaluationBaseParams(
         parsed_plan=parsed_plan,
-        base_explainer=ml.get_explainer(ExplainerType.BASE, parsed_plan.dataset_name),
+        base_explainer=MemoizedExplainer(lease.get_explainer(ExplainerType.BASE)),
         ml=ml,
         explanation=explanation,
+        lease=lease,
     )
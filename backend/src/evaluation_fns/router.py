@@ -1,8 +1,8 @@
-from typing import Annotated
-from fastapi import APIRouter, Depends
+from typing import Annotated, Any, Callable
+from fastapi import APIRouter, Depends, Query
 
 from evaluation_fns.dependencies import EvaluationBaseParams, evaluation_base_params
-from evaluation_fns.schemas import CorrelationEvaluationResponse, FidelityEvaluationResponse, MostImportantNodeEvaluationResponse, ScoreResponse
+from evaluation_fns.schemas import CorrelationEvaluationResponse, EvaluationFnType, EvaluationsResponse, FidelityEvaluationResponse, MostImportantNodeEvaluationResponse, ScoreResponse
 from ml.service import ExplainerType
 from zero_shot_learned_db.explanations.evaluation import evaluation_characterization_score_raw, evaluation_fidelity_minus, evaluation_fidelity_plus, evaluation_most_important_node, evaluation_pearson_correlation, evaluation_spearman_correlation
 
@@ -42,19 +42,42 @@ def spearman(params: Annotated[EvaluationBaseParams, Depends(evaluation_base_par
 
 @router.post("/pearson-cardinality", response_model=CorrelationEvaluationResponse)
 def pearson_cardinality(params: Annotated[EvaluationBaseParams, Depends(evaluation_base_params)]):
-    return evaluation_pearson_correlation(params.ml.get_explainer(ExplainerType.BASE_CARDINALITY, params.parsed_plan.dataset_name), params.explanation, params.parsed_plan)
+    return evaluation_pearson_correlation(params.get_explainer(ExplainerType.BASE_CARDINALITY), params.explanation, params.parsed_plan)
 
 
 @router.post("/spearman-cardinality", response_model=CorrelationEvaluationResponse)
 def spearman_cardinality(params: Annotated[EvaluationBaseParams, Depends(evaluation_base_params)]):
-    return evaluation_spearman_correlation(params.ml.get_explainer(ExplainerType.BASE_CARDINALITY, params.parsed_plan.dataset_name), params.explanation, params.parsed_plan)
+    return evaluation_spearman_correlation(params.get_explainer(ExplainerType.BASE_CARDINALITY), params.explanation, params.parsed_plan)
 
 
 @router.post("/pearson-node-depth", response_model=CorrelationEvaluationResponse)
 def pearson_node_depth(params: Annotated[EvaluationBaseParams, Depends(evaluation_base_params)]):
-    return evaluation_pearson_correlation(params.ml.get_explainer(ExplainerType.BASE_NODE_DEPTH, params.parsed_plan.dataset_name), params.explanation, params.parsed_plan)
+    return evaluation_pearson_correlation(params.get_explainer(ExplainerType.BASE_NODE_DEPTH), params.explanation, params.parsed_plan)
 
 
 @router.post("/spearman-node-depth", response_model=CorrelationEvaluationResponse)
 def spearman_node_depth(params: Annotated[EvaluationBaseParams, Depends(evaluation_base_params)]):
-    return evaluation_spearman_correlation(params.ml.get_explainer(ExplainerType.BASE_NODE_DEPTH, params.parsed_plan.dataset_name), params.explanation, params.parsed_plan)
+    return evaluation_spearman_correlation(params.get_explainer(ExplainerType.BASE_NODE_DEPTH), params.explanation, params.parsed_plan)
+
+
+evaluation_fns: dict[EvaluationFnType, Callable[[EvaluationBaseParams], Any]] = {
+    EvaluationFnType.FIDELITY_PLUS: fidelity_plus,
+    EvaluationFnType.FIDELITY_MINUS: fidelity_minus,
+    EvaluationFnType.CHARACTERIZATION_SCORE: characterization_score,
+    EvaluationFnType.MOST_IMPORTANT_NODE: most_important_node,
+    EvaluationFnType.PEARSON: pearson,
+    EvaluationFnType.SPEARMAN: spearman,
+    EvaluationFnType.PEARSON_CARDINALITY: pearson_cardinality,
+    EvaluationFnType.SPEARMAN_CARDINALITY: spearman_cardinality,
+    EvaluationFnType.PEARSON_NODE_DEPTH: pearson_node_depth,
+    EvaluationFnType.SPEARMAN_NODE_DEPTH: spearman_node_depth,
+}
+
+
+# Metrics of one request share the plan view, explanation, memoized predictions and base explanations
+@router.post("/all", response_model=EvaluationsResponse)
+def all_evaluations(
+    params: Annotated[EvaluationBaseParams, Depends(evaluation_base_params)],
+    types: Annotated[list[EvaluationFnType] | None, Query()] = None,
+):
+    return EvaluationsResponse(evaluations={evaluation_type: evaluation_fns[evaluation_type](params) for evaluation_type in dict.fromkeys(types or list(EvaluationFnType))})
@@ -1,7 +1,22 @@
+from enum import StrEnum
+
 from custom_model import CustomModel
 from query.schemas import ExplanationResponseBase, PredictionResponseBase
 
 
+class EvaluationFnType(StrEnum):
+    FIDELITY_PLUS = "fidelity-plus"
+    FIDELITY_MINUS = "fidelity-minus"
+    CHARACTERIZATION_SCORE = "characterization-score"
+    MOST_IMPORTANT_NODE = "most-important-node"
+    PEARSON = "pearson"
+    SPEARMAN = "spearman"
+    PEARSON_CARDINALITY = "pearson-cardinality"
+    SPEARMAN_CARDINALITY = "spearman-cardinality"
+    PEARSON_NODE_DEPTH = "pearson-node-depth"
+    SPEARMAN_NODE_DEPTH = "spearman-node-depth"
+
+
 class ScoreResponse(CustomModel):
     score: float
 
@@ -20,3 +35,8 @@ class MostImportantNodeEvaluationResponse(CustomModel):
 class CorrelationEvaluationResponse(ScoreResponse):
     baseline: ExplanationResponseBase
     explanation: ExplanationResponseBase
+
+
+class EvaluationsResponse(CustomModel):
+    # Ordered from the most specific to the most general response, so each evaluation is validated as its own response type
+    evaluations: dict[EvaluationFnType, FidelityEvaluationResponse | CorrelationEvaluationResponse | MostImportantNodeEvaluationResponse | ScoreResponse]
@@ -0,0 +1,5 @@
+from pydantic import BaseModel
+
+
+class HealthSettings(BaseModel):
+    retry_after: int = 5
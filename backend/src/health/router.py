@@ -0,0 +1,25 @@
+from typing import Annotated
+from fastapi import APIRouter, Depends, Response
+
+from health.schemas import ReadinessResponse
+from health.service import StartupState
+
+
+router = APIRouter(tags=["health"], prefix="/health")
+
+
+@router.get("/live")
+def get_liveness():
+    return "OK"
+
+
+@router.get("/ready", response_model=ReadinessResponse)
+def get_readiness(response: Response, startup: Annotated[StartupState, Depends()]):
+    if not startup.ready:
+        response.status_code = 503
+        response.headers["Retry-After"] = str(startup.retry_after)
+    return ReadinessResponse(
+        ready=startup.ready,
+        stages=startup.stages_response(),
+        models=startup.ml_helper.registry.stats() if startup.ml_helper is not None else [],
+    )
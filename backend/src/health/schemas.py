@@ -0,0 +1,34 @@
+from enum import StrEnum
+from custom_model import CustomModel
+from zero_shot_models.schemas import ModelLoadStatsResponse
+
+
+class StartupStage(StrEnum):
+    INGESTION = "ingestion"
+    ML = "ml"
+    PLAN_STORE = "plan_store"
+    PLAN_ARTIFACTS = "plan_artifacts"
+    VALIDATION = "validation"
+
+
+class StageStatus(StrEnum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    SKIPPED = "skipped"
+    FAILED = "failed"
+
+
+class StageResponse(CustomModel):
+    name: StartupStage
+    status: StageStatus
+    progress: int | None = None
+    total: int | None = None
+    duration: float | None = None
+    error: str | None = None
+
+
+class ReadinessResponse(CustomModel):
+    ready: bool
+    stages: list[StageResponse]
+    models: list[ModelLoadStatsResponse]
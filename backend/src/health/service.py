@@ -0,0 +1,96 @@
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
+
+from fastapi import HTTPException
+
+from health.schemas import StageResponse, StageStatus, StartupStage
+
+if TYPE_CHECKING:
+    from ml.dependencies import MLHelper
+
+
+def service_unavailable(detail: str, retry_after: int):
+    return HTTPException(503, detail, headers={"Retry-After": str(retry_after)})
+
+
+class StageState:
+    status: StageStatus
+    progress: int | None
+    total: int | None
+    start_time: float | None
+    end_time: float | None
+    error: str | None
+
+    def __init__(self):
+        self.status = StageStatus.PENDING
+        self.progress = None
+        self.total = None
+        self.start_time = None
+        self.end_time = None
+        self.error = None
+
+
+class StartupState:
+    """
+    Progress of the startup stages that run in the background after the database is set up.
+    Routes that only need the database are served right away, routes that need MLHelper return 503 until it is loaded.
+    """
+
+    stages: dict[StartupStage, StageState]
+    ml_helper: "MLHelper | None"
+    retry_after: int
+
+    def __init__(self, retry_after: int):
+        self.stages = {stage: StageState() for stage in StartupStage}
+        self.ml_helper = None
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return all(state.status in [StageStatus.DONE, StageStatus.SKIPPED] for state in self.stages.values())
+
+    @contextmanager
+    def stage(self, stage: StartupStage):
+        state = self.stages[stage]
+        state.status = StageStatus.RUNNING
+        state.start_time = time.time()
+        try:
+            yield
+        except Exception as e:
+            traceback.print_exc()
+            state.error = str(e)
+            state.status = StageStatus.FAILED
+            raise
+        finally:
+            state.end_time = time.time()
+        state.status = StageStatus.DONE
+
+    def skip(self, stage: StartupStage):
+        self.stages[stage].status = StageStatus.SKIPPED
+
+    def set_progress(self, stage: StartupStage, progress: int, total: int):
+        with self._lock:
+            self.stages[stage].progress = progress
+            self.stages[stage].total = total
+
+    def get_ml_helper(self):
+        if self.ml_helper is None:
+            raise service_unavailable("Models are not loaded yet", self.retry_after)
+        return self.ml_helper
+
+    def stages_response(self):
+        return [
+            StageResponse(
+                name=stage,
+                status=state.status,
+                progress=state.progress,
+                total=state.total,
+                duration=state.end_time - state.start_time if state.start_time is not None and state.end_time is not None else None,
+                error=state.error,
+            )
+            for stage, state in self.stages.items()
+        ]
@@ -0,0 +1,73 @@
+import hashlib
+import re
+
+from fastapi import Request, Response
+
+from cache_utils import LRUCache
+
+
+class CachedResponse:
+    etag: str
+    body: bytes
+    media_type: str | None
+
+    def __init__(self, etag: str, body: bytes, media_type: str | None):
+        self.etag = etag
+        self.body = body
+        self.media_type = media_type
+
+
+class HTTPCache:
+    """
+    Middleware for GET routes whose responses only depend on the path and the loaded featurization, statistics and models (e.g. ingested plans).
+    Responses get an ETag from the path and version, requests with a matching If-None-Match are answered with 304,
+    and serialized bodies are kept in a bounded LRU cache, so repeated requests skip the route entirely.
+    Until a version is set (on startup), requests are passed through.
+    """
+
+    paths: list[re.Pattern]
+    cache_control: str
+    version: str | None
+    responses: LRUCache[str, CachedResponse]
+
+    def __init__(self, paths: list[str], max_size: int, max_bytes: int, cache_control: str):
+        self.paths = [re.compile(path) for path in paths]
+        self.cache_control = cache_control
+        self.version = None
+        self.responses = LRUCache(max_size, max_bytes, lambda response: len(response.body))
+
+    def set_version(self, version: str):
+        if version != self.version:
+            self.responses.clear()
+        self.version = version
+
+    def get_etag(self, url: str):
+        return f'"{hashlib.sha256(f"{self.version}:{url}".encode()).hexdigest()[:32]}"'
+
+    def get_headers(self, etag: str):
+        return {"ETag": etag, "Cache-Control": self.cache_control}
+
+    async def __call__(self, request: Request, call_next):
+        if self.version is None or request.method != "GET" or not any(path.fullmatch(request.url.path) for path in self.paths):
+            return await call_next(request)
+
+        url = f"{request.url.path}?{request.url.query}"
+        etag = self.get_etag(url)
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None and etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers=self.get_headers(etag))
+
+        cached = self.responses.get(url)
+        if cached is not None and cached.etag == etag:
+            return Response(cached.body, media_type=cached.media_type, headers=self.get_headers(etag))
+
+        response: Response = await call_next(request)
+        if response.status_code != 200:
+            return response
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        media_type = response.headers.get("content-type")
+        self.responses.put(url, CachedResponse(etag, body, media_type))
+        return Response(body, media_type=media_type, headers=self.get_headers(etag))
+
+    def stats(self):
+        return self.responses.stats()
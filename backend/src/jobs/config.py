@@ -0,0 +1,7 @@
+from pydantic import BaseModel
+
+
+class JobsSettings(BaseModel):
+    max_workers: int = 4
+    max_stored_jobs: int = 1000
+    model_unavailable_retries: int = 3
@@ -0,0 +1,54 @@
+import time
+from contextlib import contextmanager
+from typing import Annotated
+from fastapi import APIRouter, Depends, HTTPException
+
+from config import Settings, get_settings
+from jobs.schemas import JobResponse
+from jobs.service import JobManager
+from ml.dependencies import MLHelper
+from ml.service import ExplainerType
+from query.dependecies import get_parsed_plan, get_zero_shot_model_key_for_query
+from query.db import get_db
+from query.schemas import ExplanationResponse
+from query.service import explain_query
+from zero_shot_learned_db.explanations.load import ParsedPlan
+
+
+router = APIRouter(tags=["jobs"])
+
+
+def run_explanation_job(ml: MLHelper, query_id: int, explainer_type: ExplainerType, model_key: str | None, retries: int):
+    start = time.time()
+    with contextmanager(get_db)() as db:
+        for attempt in range(retries + 1):
+            ml.wait_for_model(model_key)
+            try:
+                explanation = explain_query(query_id, explainer_type, model_key, db, ml)
+                break
+            except HTTPException as e:
+                # The model can be unloaded by other requests before the explanation leases it
+                if e.status_code != 503 or attempt == retries:
+                    raise
+    return ExplanationResponse(**explanation.model_dump(), execution_time=time.time() - start)
+
+
+@router.post("/queries/{query_id}/explanation/{explainer_type}/jobs", response_model=JobResponse, status_code=202)
+def submit_explanation_job(
+    explainer_type: ExplainerType,
+    parsed_plan: Annotated[ParsedPlan, Depends(get_parsed_plan)],
+    model_key: Annotated[str, Depends(get_zero_shot_model_key_for_query)],
+    ml: Annotated[MLHelper, Depends()],
+    jobs: Annotated[JobManager, Depends()],
+    settings: Annotated[Settings, Depends(get_settings)],
+):
+    job = jobs.submit(run_explanation_job, ml, parsed_plan.id, explainer_type, model_key, settings.jobs.model_unavailable_retries)
+    return JobResponse(id=job.id, status=job.status)
+
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+def get_job(job_id: str, jobs: Annotated[JobManager, Depends()]):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(422, f"Job with id == {job_id} was not found")
+    return JobResponse(id=job.id, status=job.status, result=job.result, error=job.error)
@@ -0,0 +1,17 @@
+from enum import StrEnum
+from custom_model import CustomModel
+from query.schemas import ExplanationResponse
+
+
+class JobStatus(StrEnum):
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class JobResponse(CustomModel):
+    id: str
+    status: JobStatus
+    result: ExplanationResponse | None = None
+    error: str | None = None
@@ -0,0 +1,72 @@
+import threading
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from jobs.schemas import JobStatus
+
+
+def get_error_message(e: Exception):
+    # HTTPException has no message, only a detail
+    message = getattr(e, "detail", None) or str(e)
+    return f"{type(e).__name__}: {message}" if message else type(e).__name__
+
+
+class Job:
+    id: str
+    status: JobStatus
+    result: Any
+    error: str | None
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.status = JobStatus.PENDING
+        self.result = None
+        self.error = None
+
+
+class JobManager:
+    jobs: OrderedDict[str, Job]
+    max_stored_jobs: int
+    executor: ThreadPoolExecutor
+
+    def __init__(self, max_workers: int, max_stored_jobs: int):
+        self.jobs = OrderedDict()
+        self.max_stored_jobs = max_stored_jobs
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="jobs")
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs):
+        job = Job()
+        with self._lock:
+            self.jobs[job.id] = job
+            self._evict_finished_jobs()
+        self.executor.submit(self._run, job, fn, *args, **kwargs)
+        return job
+
+    def get(self, job_id: str):
+        with self._lock:
+            return self.jobs.get(job_id, None)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job: Job, fn: Callable[..., Any], *args, **kwargs):
+        job.status = JobStatus.RUNNING
+        try:
+            job.result = fn(*args, **kwargs)
+            job.status = JobStatus.SUCCEEDED
+        except Exception as e:
+            traceback.print_exc()
+            job.error = get_error_message(e)
+            job.status = JobStatus.FAILED
+
+    def _evict_finished_jobs(self):
+        # Oldest jobs are dropped first, pending and running jobs are always kept
+        for job_id in list(self.jobs.keys()):
+            if len(self.jobs) <= self.max_stored_jobs:
+                break
+            if self.jobs[job_id].status in (JobStatus.SUCCEEDED, JobStatus.FAILED):
+                self.jobs.pop(job_id)
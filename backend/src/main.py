@@ -1,4 +1,5 @@
 import sys
+import threading
 
 sys.path.append("./zero_shot_learned_db")
 
@@ -9,6 +10,10 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from config import get_settings
+from http_cache import HTTPCache
+from health.router import router as health_router
+from health.schemas import StartupStage
+from health.service import StartupState
 from ml.dependencies import MLHelper
 
 
@@ -17,8 +22,11 @@ from ml.dependencies import MLHelper
 from query.db import get_db, setup_db_connection as setup_query_db_connection
 from query.store import store_all_workload_queries_in_db
 from query.router import router as query_router
+from query.service import build_plan_artifacts, build_plan_store
 from zero_shot_models.router import router as zero_shot_models_router
 from evaluation_fns.router import router as evaluation_fns_router
+from jobs.router import router as jobs_router
+from jobs.service import JobManager
 from validate_queries_in_db import validate_queries_in_db
 
 
@@ -35,26 +43,66 @@ if settings.db_log:
     sqlalchemy_logger.addHandler(file_handler)
 
 
+def run_startup_stages(startup: StartupState):
+    """Runs everything after the database setup in the background, in order, and stops at the first failed stage"""
+    try:
+        with startup.stage(StartupStage.INGESTION):
+            store_all_workload_queries_in_db(settings, lambda progress, total: startup.set_progress(StartupStage.INGESTION, progress, total))
+
+        with startup.stage(StartupStage.ML):
+            ml_helper = MLHelper()
+            with next(get_db()) as db:
+                ml_helper.load(settings, db)
+            http_cache.set_version(ml_helper.version)
+            startup.ml_helper = ml_helper
+
+        if settings.ml.plan_store_prebuild and ml_helper.plan_store is not None:
+            with startup.stage(StartupStage.PLAN_STORE), next(get_db()) as db:
+                build_plan_store(ml_helper, db)
+        else:
+            startup.skip(StartupStage.PLAN_STORE)
+
+        if settings.query.plan_artifacts_prebuild:
+            with startup.stage(StartupStage.PLAN_ARTIFACTS), next(get_db()) as db:
+                build_plan_artifacts(ml_helper, db)
+        else:
+            startup.skip(StartupStage.PLAN_ARTIFACTS)
+
+        if settings.ml.validate_queries_in_db:
+            with startup.stage(StartupStage.VALIDATION), next(get_db()) as db:
+                ml_helper.wait_for_model()
+                validate_queries_in_db(ml_helper, db, settings)
+        else:
+            startup.skip(StartupStage.VALIDATION)
+    except Exception:
+        print("Startup failed, see /health/ready")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Only the database is set up before serving, routes that need models return 503 until their stage is done
     setup_query_db_connection(settings)
-    store_all_workload_queries_in_db(settings)
-
-    ml_helper = MLHelper()
-    with next(get_db()) as db:
-        ml_helper.load(settings, db)
-    app.dependency_overrides[MLHelper] = lambda: ml_helper
-
-    if settings.ml.validate_queries_in_db:
-        with next(get_db()) as db:
-            validate_queries_in_db(ml_helper, db, settings)
+    startup = StartupState(settings.health.retry_after)
+    app.dependency_overrides[StartupState] = lambda: startup
+    app.dependency_overrides[MLHelper] = startup.get_ml_helper
+    job_manager = JobManager(settings.jobs.max_workers, settings.jobs.max_stored_jobs)
+    app.dependency_overrides[JobManager] = lambda: job_manager
+    threading.Thread(target=run_startup_stages, args=(startup,), name="startup", daemon=True).start()
 
     yield
 
+    job_manager.shutdown()
+    if startup.ml_helper is not None:
+        startup.ml_helper.scheduler.shutdown()
+
 
 app = FastAPI(lifespan=lifespan)
 
+# Responses of these routes only change with featurization, statistics and models
+http_cache = HTTPCache([r"/queries/\d+", r"/general/features"], settings.query.http_cache_max_size, settings.query.http_cache_max_bytes, settings.query.http_cache_control)
+app.state.http_cache = http_cache
 
+app.middleware("http")(http_cache)
 app.middleware("http")(log_request_middleware)
 app.add_middleware(
     CORSMiddleware,
@@ -62,6 +110,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Read by the web client to retry 503 responses during startup
+    expose_headers=["Retry-After"],
 )
 
 # WARNING: Evaluation routes are unmaintened and may be broken,
@@ -73,6 +123,8 @@ app.add_middleware(
 app.include_router(query_router)
 app.include_router(zero_shot_models_router)
 app.include_router(evaluation_fns_router)
+app.include_router(jobs_router)
+app.include_router(health_router)
 
 
 # Index
@@ -0,0 +1,174 @@
+import weakref
+from typing import Any, Hashable
+
+import dgl
+import torch
+
+from zero_shot_learned_db.explanations.explainers.base_explainer import BaseExplainer
+from zero_shot_learned_db.explanations.load import ParsedPlan
+from zero_shot_learned_db.models.zero_shot_models.zero_shot_model import ZeroShotModel
+
+# Input shapes whose batched forward passes of a model replica were verified to match single forward passes, False if they didn't match
+_batching_verified: "weakref.WeakKeyDictionary[ZeroShotModel, set[Hashable] | bool]" = weakref.WeakKeyDictionary()
+
+
+class _InputCapturedError(Exception):
+    pass
+
+
+class _BatchingMismatchError(Exception):
+    pass
+
+
+class ModelInput:
+    """Arguments of the forward pass the explainer runs to predict a single plan"""
+
+    args: tuple
+    kwargs: dict[str, Any]
+
+    def __init__(self, args: tuple, kwargs: dict[str, Any]):
+        self.args = args
+        self.kwargs = kwargs
+
+    @property
+    def nodes(self):
+        return count_graph_nodes((self.args, self.kwargs))
+
+    @property
+    def shape(self):
+        return get_input_shape((self.args, self.kwargs))
+
+
+def count_graph_nodes(value: Any) -> int:
+    if isinstance(value, dgl.DGLGraph):
+        return value.num_nodes()
+    if isinstance(value, dict):
+        return sum(count_graph_nodes(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(count_graph_nodes(item) for item in value)
+    return 0
+
+
+def get_input_shape(value: Any) -> Hashable:
+    """Node and edge types that occur in the graphs and feature dimensions of an input, inputs of the same shape take the same paths through the model"""
+    if isinstance(value, dgl.DGLGraph):
+        return (tuple(ntype for ntype in value.ntypes if value.num_nodes(ntype) > 0), tuple(etype for etype in value.canonical_etypes if value.num_edges(etype) > 0))
+    if isinstance(value, torch.Tensor):
+        return (value.dtype, tuple(value.shape[1:]))
+    if isinstance(value, dict):
+        return tuple((key, get_input_shape(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(get_input_shape(item) for item in value)
+    return type(value).__name__
+
+
+def collate(values: list[Any]) -> Any:
+    """Batches the forward inputs of single plans: graphs with dgl.batch, tensors along the node dimension, containers per element"""
+    first = values[0]
+    if isinstance(first, dgl.DGLGraph):
+        return dgl.batch(values)
+    if isinstance(first, torch.Tensor):
+        return torch.cat(values)
+    if isinstance(first, dict):
+        if any(value.keys() != first.keys() for value in values):
+            raise ValueError("Inputs have different keys")
+        return {key: collate([value[key] for value in values]) for key in first}
+    if isinstance(first, (list, tuple)):
+        if any(len(value) != len(first) for value in values):
+            raise ValueError("Inputs have different lengths")
+        return type(first)(collate(list(items)) for items in zip(*values))
+    if any(value is not first and value != first for value in values):
+        raise ValueError(f"Inputs of type {type(first).__name__} differ and can't be batched")
+    return first
+
+
+def predict_with_forward(explainer: BaseExplainer, model: ZeroShotModel, parsed_plan: ParsedPlan, forward):
+    """Runs the prediction of the explainer with the forward pass of the model replaced"""
+    model.forward = forward
+    try:
+        return explainer.predict(parsed_plan)
+    finally:
+        del model.forward
+
+
+def capture_model_input(explainer: BaseExplainer, model: ZeroShotModel, parsed_plan: ParsedPlan) -> tuple[ModelInput | None, Any]:
+    """Returns the input of the forward pass for the plan, or the prediction if the explainer didn't run the model"""
+    captured: list[ModelInput] = []
+
+    def forward(*args, **kwargs):
+        captured.append(ModelInput(args, kwargs))
+        raise _InputCapturedError()
+
+    try:
+        return None, predict_with_forward(explainer, model, parsed_plan, forward)
+    except _InputCapturedError:
+        return captured[0], None
+
+
+def forward_batch(model: ZeroShotModel, inputs: list[ModelInput]) -> torch.Tensor:
+    output = model(*collate([model_input.args for model_input in inputs]), **collate([model_input.kwargs for model_input in inputs]))
+    if not isinstance(output, torch.Tensor) or output.dim() == 0 or output.shape[0] != len(inputs):
+        raise ValueError("Batched output has no prediction per plan")
+    return output
+
+
+def verify_batching(model: ZeroShotModel, inputs: list[ModelInput], output: torch.Tensor, verified: set[Hashable]):
+    """Compares the batched output of the first plan of every input shape that wasn't verified yet with its single forward pass"""
+    for index, model_input in enumerate(inputs):
+        shape = model_input.shape
+        if shape in verified:
+            continue
+        expected = model(*model_input.args, **model_input.kwargs)
+        if not isinstance(expected, torch.Tensor) or expected.shape != output[index : index + 1].shape or not torch.allclose(expected, output[index : index + 1], rtol=1e-4, atol=1e-6):
+            raise _BatchingMismatchError("Batched predictions differ from single predictions")
+        verified.add(shape)
+
+
+def predict_batched(explainer: BaseExplainer, model: ZeroShotModel, parsed_plans: list[ParsedPlan], max_nodes: int) -> list[Any]:
+    """
+    Predicts the plans with one forward pass over their batched graphs per chunk of at most max_nodes graph nodes.
+    The explainer still prepares the input and post-processes the output of every plan, only the forward pass is shared,
+    so the predictions are the same as predicting the plans one by one. A single plan is predicted directly.
+    Batching is verified once per input shape (node and edge types of the graphs, feature dimensions) against a single forward pass,
+    plans of a verified shape are trusted to batch like the verified plan, even if e.g. their sizes differ.
+    Models whose batched output differs from single forward passes are predicted one by one.
+    """
+    if len(parsed_plans) == 1 or _batching_verified.get(model) is False:
+        return [explainer.predict(parsed_plan) for parsed_plan in parsed_plans]
+
+    predictions: list[Any] = [None] * len(parsed_plans)
+    chunks: list[list[tuple[int, ModelInput]]] = [[]]
+    chunk_nodes = 0
+    for index, parsed_plan in enumerate(parsed_plans):
+        model_input, prediction = capture_model_input(explainer, model, parsed_plan)
+        if model_input is None:
+            predictions[index] = prediction
+            continue
+        nodes = model_input.nodes
+        if len(chunks[-1]) > 0 and chunk_nodes + nodes > max_nodes:
+            chunks.append([])
+            chunk_nodes = 0
+        chunks[-1].append((index, model_input))
+        chunk_nodes += nodes
+
+    for chunk in chunks:
+        if len(chunk) == 0:
+            continue
+        indices = [index for index, _ in chunk]
+        verified = _batching_verified.setdefault(model, set())
+        try:
+            if verified is False:
+                raise _BatchingMismatchError("Batched predictions differ from single predictions")
+            output = forward_batch(model, [model_input for _, model_input in chunk])
+            verify_batching(model, [model_input for _, model_input in chunk], output, verified)
+        except Exception as e:
+            # Models that failed before any shape was verified can't batch, later failures only affect the chunk
+            if verified is not False and (isinstance(e, _BatchingMismatchError) or len(verified) == 0):
+                print(f"WARNING: model can't predict batches, plans are predicted one by one: {e}")
+                _batching_verified[model] = False
+            for index in indices:
+                predictions[index] = explainer.predict(parsed_plans[index])
+            continue
+        for position, index in enumerate(indices):
+            predictions[index] = predict_with_forward(explainer, model, parsed_plans[index], lambda *args, **kwargs: output[position : position + 1])
+    return predictions
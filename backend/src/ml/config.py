@@ -1,5 +1,7 @@
 from pydantic import BaseModel
 
+from cache_utils import EvictionPolicy
+
 
 class MLSettings(BaseModel):
     base_data_dir: str = ".././zero-shot-data"
@@ -19,6 +21,24 @@ class MLSettings(BaseModel):
     seed: int = 0
 
     explainers_log: bool = False
+    warm_explainers: list[str] = ["BaseExplainer"]
     validate_graphs_from_nodes: bool = False
 
-    plans_cache_max_size: int = 10
+    plans_cache_max_size: int = 10000
+    plans_cache_max_bytes: int | None = 2 * 1024**3
+    plans_cache_eviction_policy: EvictionPolicy = EvictionPolicy.LRU
+    result_cache_max_size: int = 10000
+
+    plan_store_dir: str | None = "plan_store"
+    plan_store_prebuild: bool = False
+    snapshot_dir: str | None = "snapshots"
+
+    inference_workers_per_model: int = 2
+    models_max_resident: int = 4
+    models_max_bytes: int | None = None
+    models_preload_default: bool = True
+    models_validate_on_startup: bool = False
+    models_retry_failed_after: float = 60
+    inference_batch_max_nodes: int = 20000
+    perturbation_prefetch: bool = True
+    torch_threads: int | None = None
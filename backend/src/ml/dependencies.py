@@ -1,20 +1,32 @@
+import hashlib
 import os.path
-import time
+from contextlib import contextmanager
 from fastapi import HTTPException
 import numpy as np
 from sklearn.pipeline import Pipeline
 import torch
 import tqdm
 
+from cache_utils import LRUCache, estimate_size
 from config import Settings
+from health.service import service_unavailable
+from ml.batching import predict_batched
+from ml.plan_store import PlanStore
+from ml.perturbation import PERTURBATION_EXPLAINERS, memoize_predictions, prefetch_perturbations
+from ml.plan_view import ParsedPlanView
+from ml.registry import ModelRegistry
+from ml.scheduler import InferenceScheduler
+from ml.snapshot import get_ml_snapshot, get_ml_snapshot_key
 from ml.service import ExplainerType, explainers
 from query.db import Session
-from query.models import DatabaseStats, Plan, WorkloadRun, ZeroShotModelConfig
+from query.models import WorkloadRun, ZeroShotModelConfig
+from query.result_cache import ResultCache
+from utils import get_file_hash
 from zero_shot_learned_db.cross_db_benchmark.benchmark_tools.database import DatabaseSystem
 from zero_shot_learned_db.explanations.data_models.hyperparameters import HyperParameters, load_hyperparameters
 from zero_shot_learned_db.explanations.data_models.statistics import FeatureStatistics, load_statistics
 from zero_shot_learned_db.explanations.data_models.workload_run import DatabaseStats as PydanticDatabaseStats, load_workload_run
-from zero_shot_learned_db.explanations.load import ParsedPlan, get_label_norm, get_label_norm_runtimes
+from zero_shot_learned_db.explanations.load import ParsedPlan, get_label_norm
 from zero_shot_learned_db.explanations.model import prepare_model
 from zero_shot_learned_db.models.zero_shot_models.zero_shot_model import ZeroShotModel
 
@@ -22,13 +34,17 @@ from zero_shot_learned_db.models.zero_shot_models.zero_shot_model import ZeroSho
 class MLHelper:
     hyperparameters: HyperParameters
     feature_statistics: FeatureStatistics
-    default_model: ZeroShotModel = None
     default_model_id: int = None
-    zero_shot_models: dict[str, ZeroShotModel]
+    registry: ModelRegistry
+    scheduler: InferenceScheduler
+    model_hashes: dict[str, str]
+    result_cache: ResultCache
     settings: Settings
     database_stats: dict[int, PydanticDatabaseStats]
-    plans_cache: dict[int, tuple[ParsedPlan, float]]
+    plans_cache: LRUCache[int, ParsedPlan]
+    plan_store: PlanStore | None = None
     label_norm: Pipeline
+    version: str
 
     def load(self, settings: Settings, db: Session):
         self.settings = settings
@@ -43,75 +59,178 @@ class MLHelper:
         )
         torch.manual_seed(self.hyperparameters.seed)
         np.random.seed(self.hyperparameters.seed)
+        if settings.ml.torch_threads is not None:
+            torch.set_num_threads(settings.ml.torch_threads)
 
         self.feature_statistics = load_statistics(statistics_file)
-        self.label_norm = get_label_norm_runtimes([i[0] for i in db.query(Plan.plan_runtime).filter(Plan.sql.is_not(None)).all()], self.hyperparameters.final_mlp_kwargs.loss_class_name)
+        snapshot_dir = os.path.join(settings.ml.base_data_dir, settings.ml.snapshot_dir) if settings.ml.snapshot_dir is not None else None
+        snapshot = get_ml_snapshot(snapshot_dir, self.hyperparameters.final_mlp_kwargs.loss_class_name, db)
+        self.label_norm = snapshot.label_norm
+        self.database_stats = snapshot.database_stats
 
-        self.zero_shot_models = {}
+        self.registry = ModelRegistry(
+            self.create_model,
+            settings.ml.inference_workers_per_model,
+            settings.ml.models_max_resident,
+            settings.ml.models_max_bytes,
+            warm_explainers=[(ExplainerType(explainer_type), settings.ml.explainers_log) for explainer_type in settings.ml.warm_explainers],
+            retry_failed_after=settings.ml.models_retry_failed_after,
+        )
+        self.scheduler = InferenceScheduler(self.registry, settings.ml.explainers_log)
+        self.model_hashes = {}
+        self.result_cache = ResultCache(settings.ml.result_cache_max_size)
         for zs_model in db.query(ZeroShotModelConfig).all():
             self.load_model(zs_model, db)
+        # The default model is loaded in the background, so it is usually resident before the first request
+        if settings.ml.models_preload_default and self.scheduler.default_model_key is not None:
+            self.registry.load(self.scheduler.default_model_key)
+
+        # Changes whenever featurization, statistics, models or the ingested workload runs change, used for ETags in http_cache.py
+        database_key = get_ml_snapshot_key(self.hyperparameters.final_mlp_kwargs.loss_class_name, db)
+        version = hashlib.sha256()
+        for file_hash in [get_file_hash(settings.ml.hyperparameters_file), get_file_hash(statistics_file), *sorted(self.model_hashes.values()), database_key]:
+            version.update(file_hash.encode())
+        self.version = version.hexdigest()[:16]
 
-        self.database_stats = {}
-        for db_stats in db.query(DatabaseStats).all():
-            workload_run = db.query(WorkloadRun.id).filter(WorkloadRun.database_stats_id == db_stats.id).first()
-            self.database_stats[workload_run[0]] = db_stats.to_pydantic()
-        self.plans_cache = {}
+        # Statistics and hyperparameters are shared by all plans and must not count towards the budget
+        shared_objects = [self.hyperparameters, self.feature_statistics, *self.database_stats.values()]
+        self.plans_cache = LRUCache(
+            settings.ml.plans_cache_max_size,
+            settings.ml.plans_cache_max_bytes,
+            lambda plan: estimate_size(plan, shared_objects),
+            settings.ml.plans_cache_eviction_policy,
+        )
+        if settings.ml.plan_store_dir is not None:
+            self.plan_store = PlanStore(os.path.join(settings.ml.base_data_dir, settings.ml.plan_store_dir), settings.ml.hyperparameters_file, statistics_file, database_key)
 
     def load_model(self, model_config: ZeroShotModelConfig, db: Session):
+        """Registers a model, it is only loaded on first use (see ModelRegistry)"""
+        model_file = os.path.join(self.settings.ml.base_data_dir, self.settings.ml.zs_model_dir, model_config.file_name) + ".pt"
+        if not os.path.isfile(model_file):
+            print(f"Model {model_config.id} can't be loaded. It will be removed")
+            db.delete(model_config)
+            db.commit()
+            return
+        if self.settings.ml.models_validate_on_startup:
+            try:
+                self.create_model(model_config.file_name)
+            except HTTPException as e:
+                print(f"{e.detail}. It will be removed")
+                db.delete(model_config)
+                db.commit()
+                return
+
+        self.model_hashes[model_config.file_name] = get_file_hash(model_file)
+        self.registry.register(model_config.file_name)
+        print("Registered model:", model_config.name, model_config.file_name)
+        if self.default_model_id is None:
+            self.default_model_id = model_config.id
+
+    def create_model(self, model_key: str):
         model_dir = os.path.join(self.settings.ml.base_data_dir, self.settings.ml.zs_model_dir)
         # Only imdb models require label normalizer?????????????????????????
-        label_norm_for_model = self.label_norm if "imdb" in model_config.file_name else None
+        label_norm_for_model = self.label_norm if "imdb" in model_key else None
         try:
-            self.zero_shot_models[model_config.file_name] = prepare_model(
+            return prepare_model(
                 self.hyperparameters,
                 self.feature_statistics,
                 label_norm_for_model,
                 model_dir,
-                model_config.file_name,
+                model_key,
             )
-        except Exception:
-            print(f"Model {model_config.id} can't be loaded. It will be removed")
-            db.delete(model_config)
-            db.commit()
-            return
-
-        print("Loaded model:", model_config.name, model_config.file_name)
-        if self.default_model is None:
-            self.default_model = self.zero_shot_models[model_config.file_name]
-            self.default_model_id = model_config.id
+        except Exception as e:
+            raise HTTPException(422, f"Model {model_key} can't be loaded: {e}") from e
 
     def _assert_loaded(self):
-        assert self.default_model is not None
-        assert self.zero_shot_models is not None
+        assert self.scheduler is not None
+        assert self.scheduler.default_model_key is not None
 
+    def resolve_model_key(self, model_key: str | None = None):
+        self._assert_loaded()
+        return self.scheduler.resolve_model_key(model_key)
+
+    def require_model(self, model_key: str | None = None):
+        """
+        Starts loading a model that is not resident and raises 503 meanwhile, so requests never block on model loading.
+        Raises the error of a failed load (422) until the registry retries it.
+        """
+        model_key = self.resolve_model_key(model_key)
+        future = self.registry.load(model_key)
+        if not future.done():
+            raise service_unavailable(f"Model {model_key} is loading", self.settings.health.retry_after)
+        error = future.exception()
+        if isinstance(error, HTTPException):
+            raise error
+        if error is not None:
+            raise HTTPException(422, f"Model {model_key} can't be loaded: {error}")
+        return model_key
+
+    def wait_for_model(self, model_key: str | None = None):
+        """Blocks until a model is resident, for background work that should not fail while the model loads"""
+        self.registry.load(self.resolve_model_key(model_key)).result()
+
+    def lease_model(self, model_key: str | None = None):
+        self._assert_loaded()
+        return self.scheduler.lease(self.require_model(model_key))
+
+    @contextmanager
     def get_explainer(self, explainer_type: ExplainerType, model_key: str | None = None):
+        with self.lease_model(model_key) as lease:
+            yield lease.get_explainer(explainer_type)
+
+    def explain_plan(self, parsed_plan: ParsedPlan, explainer_type: ExplainerType, model_key: str | None = None):
+        """Explains a view of the shared plan, perturbation explainers look up the single-node perturbations predicted in batches beforehand"""
+        plan_view = self.get_plan_view(parsed_plan)
+        with self.lease_model(model_key) as lease:
+            predictions = None
+            if self.settings.ml.perturbation_prefetch and explainer_type in PERTURBATION_EXPLAINERS:
+                # Taken before the perturbation explainer, which gets back the model state it expects when it is taken
+                predictions = prefetch_perturbations(lease.get_explainer(ExplainerType.BASE), lease.model, plan_view, PERTURBATION_EXPLAINERS[explainer_type], self.settings.ml.inference_batch_max_nodes)
+            explainer = lease.get_explainer(explainer_type)
+            if predictions is not None:
+                memoize_predictions(explainer, predictions)
+            return explainer.explain(plan_view)
+
+    def predict_plans(self, parsed_plans: list[ParsedPlan], model_key: str | None = None):
         self._assert_loaded()
+        plan_views = [self.get_plan_view(parsed_plan) for parsed_plan in parsed_plans]
+        with self.lease_model(model_key) as lease, torch.no_grad():
+            return predict_batched(lease.get_explainer(ExplainerType.BASE), lease.model, plan_views, self.settings.ml.inference_batch_max_nodes)
 
-        model = self.zero_shot_models.get(model_key, None)
-        if model is None:
-            if model_key is not None:
-                print(f"WARNING: {model_key} does not exist, default model is used")
-            model = self.default_model
-        return explainers[explainer_type](model, log=self.settings.ml.explainers_log)
+    def get_shared_plan_objects(self, workload_run_id: int):
+        return {
+            "hyperparameters": self.hyperparameters,
+            "feature_statistics": self.feature_statistics,
+            "database_stats": self.database_stats[workload_run_id],
+        }
 
-    def cache_store_plan(self, plan: ParsedPlan):
-        self.plans_cache[plan.id] = (plan, time.time())
+    def prepare_plan_for_inference(self, parsed_plan: ParsedPlan):
+        # Featurization only depends on the plan itself, so it is done once per plan (like MLHelperOld does on load)
+        if getattr(parsed_plan, "inference_prepared", False):
+            return
+        parsed_plan.prepare_plan_for_inference()
+        parsed_plan.inference_prepared = True
+        # Inference graphs are built lazily, so the cached size is only updated once they exist
+        self.plans_cache.refresh(parsed_plan.id)
+        if self.plan_store is not None and not self.plan_store.contains(parsed_plan.workload_run_id, parsed_plan.id):
+            self.plan_store.save(parsed_plan, parsed_plan.workload_run_id, self.get_shared_plan_objects(parsed_plan.workload_run_id))
 
-        if len(self.plans_cache) > self.settings.ml.plans_cache_max_size:
-            min_time = time.time() + 1
-            oldest_id = 0
-            for id, (plan, t) in self.plans_cache.items():
-                if t < min_time:
-                    min_time = t
-                    oldest_id = id
-            self.plans_cache.pop(oldest_id)
+    def get_plan_view(self, parsed_plan: ParsedPlan):
+        """Prepares the shared plan (under its lock) and returns a view that can be masked and used without the lock"""
+        with parsed_plan.lock:
+            self.prepare_plan_for_inference(parsed_plan)
+        return ParsedPlanView(parsed_plan)
 
-    def cache_get_plan(self, plan_id: int):
-        if plan_id not in self.plans_cache:
+    def load_stored_plan(self, workload_run_id: int, plan_id: int):
+        if self.plan_store is None:
             return None
-        plan = self.plans_cache[plan_id][0]
-        self.cache_store_plan(plan)
-        return plan
+        return self.plan_store.load(workload_run_id, plan_id, self.get_shared_plan_objects(workload_run_id))
+
+    def cache_store_plan(self, plan: ParsedPlan):
+        self.plans_cache.put(plan.id, plan)
+
+    def cache_get_plan(self, plan_id: int):
+        return self.plans_cache.get(plan_id)
 
 
 class MLHelperOld:
@@ -0,0 +1,94 @@
+from typing import Any, Hashable
+
+import torch
+
+from ml.batching import predict_batched
+from ml.plan_view import ParsedPlanView
+from ml.service import ExplainerType
+from zero_shot_learned_db.explanations.data_models.nodes import NodeType
+from zero_shot_learned_db.explanations.explainers.base_explainer import BaseExplainer
+from zero_shot_learned_db.explanations.load import ParsedPlan
+from zero_shot_learned_db.models.zero_shot_models.zero_shot_model import ZeroShotModel
+
+# Explainers that score a node by masking it and re-predicting, with whether only plan operators are masked
+PERTURBATION_EXPLAINERS: dict[ExplainerType, bool] = {
+    ExplainerType.DIFFERENCE_EXPLAINER: False,
+    ExplainerType.DIFFERENCE_EXPLAINER_ONLY_PLANS: True,
+}
+
+
+def get_prediction_key(parsed_plan: ParsedPlanView) -> Hashable:
+    return (parsed_plan.id, parsed_plan.mask_key, parsed_plan.features_version)
+
+
+class MemoizedExplainer:
+    """
+    Wraps an explainer and memoizes the predictions (and explanations) of plan views by their mask and features.
+    Fidelity evaluations over several thresholds and cumulative importances mostly mask the same node sets,
+    so every distinct masked variant of a plan is predicted once. Plans that aren't views are always predicted.
+    """
+
+    explainer: BaseExplainer
+    predictions: dict[Hashable, Any]
+    hits: int
+    misses: int
+
+    def __init__(self, explainer: BaseExplainer, predictions: dict[Hashable, Any] | None = None):
+        self.explainer = explainer
+        self.predictions = predictions if predictions is not None else {}
+        self.hits = 0
+        self.misses = 0
+        # Bound before memoize_predictions replaces predict on the explainer itself
+        self._predict = explainer.predict
+
+    def predict(self, parsed_plan: ParsedPlan):
+        if not isinstance(parsed_plan, ParsedPlanView):
+            return self._predict(parsed_plan)
+        key = get_prediction_key(parsed_plan)
+        if key in self.predictions:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self.predictions[key] = self._predict(parsed_plan)
+        return self.predictions[key]
+
+    def explain(self, parsed_plan: ParsedPlan):
+        if not isinstance(parsed_plan, ParsedPlanView):
+            return self.explainer.explain(parsed_plan)
+        key = ("explain", get_prediction_key(parsed_plan))
+        if key not in self.predictions:
+            self.predictions[key] = self.explainer.explain(parsed_plan)
+        return self.predictions[key]
+
+    def __getattr__(self, name: str):
+        return getattr(self.explainer, name)
+
+
+def memoize_predictions(explainer: BaseExplainer, predictions: dict[Hashable, Any]):
+    """
+    Routes the predictions an explainer makes on itself through the memo.
+    ModelReplica resets the explainer state before its next use, so the memo never outlives the lease.
+    """
+    memoized = MemoizedExplainer(explainer, predictions)
+    explainer.predict = memoized.predict
+    return memoized
+
+
+def get_perturbed_node_ids(parsed_plan: ParsedPlan, only_plans: bool):
+    return [node.id_in_nx_graph for node in parsed_plan.graph_nodes if not only_plans or node.node.node_type == NodeType.PLAN]
+
+
+def prefetch_perturbations(explainer: BaseExplainer, model: ZeroShotModel, parsed_plan: ParsedPlan, only_plans: bool, max_nodes: int) -> dict[Hashable, Any]:
+    """
+    Predicts the plan and all its single-node perturbations with batched forward passes (see predict_batched) on the leased replica,
+    keyed like MemoizedExplainer, so a perturbation explainer only looks them up instead of running one forward pass per node.
+    """
+    views = []
+    for node_id in [None, *get_perturbed_node_ids(parsed_plan, only_plans)]:
+        view = ParsedPlanView(parsed_plan)
+        if node_id is not None:
+            view.set_node_mask([node_id])
+        views.append(view)
+    with torch.no_grad():
+        predictions = predict_batched(explainer, model, views, max_nodes)
+    return {get_prediction_key(view): prediction for view, prediction in zip(views, predictions)}
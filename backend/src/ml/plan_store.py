@@ -0,0 +1,86 @@
+import hashlib
+import os
+import re
+import shutil
+import threading
+from typing import Any
+
+import torch
+
+from utils import get_file_hash
+from zero_shot_learned_db.explanations.load import ParsedPlan
+
+# Increase when the stored attributes of ParsedPlan change
+PLAN_STORE_FORMAT_VERSION = 1
+
+# Names of the version directories of the store
+VERSION_PATTERN = re.compile("[0-9a-f]{16}")
+
+# Set on the plan at runtime and never persisted
+TRANSIENT_ATTRIBUTES = ["lock"]
+
+
+class SharedRef:
+    """Placeholder for an object shared by all plans that is replaced on load instead of being stored with every plan"""
+
+    name: str
+
+    def __init__(self, name: str):
+        self.name = name
+
+
+class PlanStore:
+    """
+    Stores featurized ParsedPlans (graphs and feature tensors) on disk, one file per plan in a directory per workload run.
+    Tensor storages are memory-mapped on load, so their data is paged in from disk when it is used,
+    but the rest of the plan is unpickled, so loading still copies everything that isn't tensor data.
+    The version changes whenever hyperparameters, feature statistics or the ingested workload runs (database_key) change,
+    which invalidates all stored plans, so plan ids of a previous ingestion never return stale plans.
+    """
+
+    directory: str
+    version: str
+
+    def __init__(self, base_directory: str, hyperparameters_file: str, statistics_file: str, database_key: str):
+        version = hashlib.sha256()
+        version.update(str(PLAN_STORE_FORMAT_VERSION).encode())
+        version.update(get_file_hash(hyperparameters_file).encode())
+        version.update(get_file_hash(statistics_file).encode())
+        version.update(database_key.encode())
+        self.version = version.hexdigest()[:16]
+        self.directory = os.path.join(base_directory, self.version)
+        # Plans of other versions are never loaded again, other entries of the directory aren't owned by the store and are kept
+        if os.path.isdir(base_directory):
+            for name in os.listdir(base_directory):
+                path = os.path.join(base_directory, name)
+                if name != self.version and VERSION_PATTERN.fullmatch(name) and os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+
+    def get_path(self, workload_run_id: int, plan_id: int):
+        return os.path.join(self.directory, str(workload_run_id), f"{plan_id}.pt")
+
+    def contains(self, workload_run_id: int, plan_id: int):
+        return os.path.isfile(self.get_path(workload_run_id, plan_id))
+
+    def save(self, parsed_plan: ParsedPlan, workload_run_id: int, shared: dict[str, Any]):
+        shared_ids = {id(value): name for name, value in shared.items()}
+        state = {key: SharedRef(shared_ids[id(value)]) if id(value) in shared_ids else value for key, value in parsed_plan.__dict__.items() if key not in TRANSIENT_ATTRIBUTES}
+        path = self.get_path(workload_run_id, parsed_plan.id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first, so concurrent readers never see partial files
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        torch.save(state, tmp_path)
+        os.replace(tmp_path, path)
+
+    def load(self, workload_run_id: int, plan_id: int, shared: dict[str, Any]) -> ParsedPlan | None:
+        path = self.get_path(workload_run_id, plan_id)
+        if not os.path.isfile(path):
+            return None
+        try:
+            state: dict[str, Any] = torch.load(path, mmap=True, weights_only=False)
+        except Exception as e:
+            print(f"WARNING: stored plan {path} can't be loaded and is ignored: {e}")
+            return None
+        parsed_plan = ParsedPlan.__new__(ParsedPlan)
+        parsed_plan.__dict__.update({key: shared[value.name] if isinstance(value, SharedRef) else value for key, value in state.items()})
+        return parsed_plan
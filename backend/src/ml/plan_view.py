@@ -0,0 +1,121 @@
+import itertools
+import threading
+from typing import Hashable
+
+from zero_shot_learned_db.explanations.load import ParsedPlan
+
+
+# Versions of changed features are never reused, unlike object ids
+_features_versions = itertools.count(1)
+
+
+class FeaturesDict(dict):
+    """Features of a view with a version that changes whenever the features are changed, 0 while they are the features of the plan"""
+
+    version: int
+
+    def __init__(self, *args, version: int = 0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.version = version
+
+    def changed(self):
+        self.version = next(_features_versions)
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.changed()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.changed()
+
+    def __ior__(self, other):
+        result = super().__ior__(other)
+        self.changed()
+        return result
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self.changed()
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, *args):
+        result = super().pop(*args)
+        self.changed()
+        return result
+
+    def popitem(self):
+        result = super().popitem()
+        self.changed()
+        return result
+
+    def clear(self):
+        super().clear()
+        self.changed()
+
+
+class ParsedPlanView(ParsedPlan):
+    """
+    Copy-on-write view of a prepared (usually cached and shared) ParsedPlan.
+    Tensors, nodes and statistics are shared with the plan. Containers and DGL graphs are copied shallowly (graphs with local_var),
+    so node masks and features set on the view are an overlay that never changes the plan or other views.
+    Views are used by a single request, so they can be masked and predicted without the lock of the shared plan.
+    """
+
+    # Identifies the mask currently set on the view, None without a mask
+    mask_key: Hashable | None
+
+    def __init__(self, parsed_plan: ParsedPlan):
+        for key, value in parsed_plan.__dict__.items():
+            if key == "features" and isinstance(value, dict):
+                value = FeaturesDict(value)
+            elif isinstance(value, (dict, list)):
+                value = type(value)(value)
+            elif hasattr(value, "local_var") and hasattr(value, "canonical_etypes"):
+                value = value.local_var()
+            self.__dict__[key] = value
+        self.lock = threading.Lock()
+        self.mask_key = None
+
+    def __setattr__(self, name, value):
+        if name == "features" and isinstance(value, dict):
+            value = FeaturesDict(value, version=next(_features_versions))
+        super().__setattr__(name, value)
+
+    @property
+    def features_version(self) -> int:
+        """Identifies the features of the view, 0 while they are the features of the plan"""
+        features = self.__dict__.get("features")
+        return features.version if isinstance(features, FeaturesDict) else 0
+
+    def set_node_mask(self, node_ids, *args, **kwargs):
+        version = self.features_version
+        super().set_node_mask(node_ids, *args, **kwargs)
+        self._restore_features_version(version)
+        self.mask_key = ("hard", tuple(sorted(node_ids))) if node_ids is not None else None
+
+    def set_soft_node_mask(self, node_weights, *args, **kwargs):
+        version = self.features_version
+        super().set_soft_node_mask(node_weights, *args, **kwargs)
+        self._restore_features_version(version)
+        self.mask_key = get_soft_mask_key(node_weights) if node_weights is not None else None
+
+    def _restore_features_version(self, version: int):
+        # Features changed by a mask are identified by the mask key
+        features = self.__dict__.get("features")
+        if isinstance(features, FeaturesDict):
+            features.version = version
+
+
+def get_soft_mask_key(node_weights):
+    # A weight of 1 keeps the node unchanged and a weight of 0 removes it like a hard mask, so equivalent masks get the same key
+    weights = sorted((node_id, float(weight)) for node_id, weight in node_weights if float(weight) != 1)
+    if len(weights) == 0:
+        return None
+    if all(weight == 0 for _, weight in weights):
+        return ("hard", tuple(node_id for node_id, _ in weights))
+    return ("soft", tuple(weights))
@@ -0,0 +1,123 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Iterable
+
+from cache_utils import LRUCache
+from ml.scheduler import ModelWorkerPool
+from ml.service import ExplainerType
+from zero_shot_learned_db.models.zero_shot_models.zero_shot_model import ZeroShotModel
+
+
+class ModelLoadStats:
+    loads: int
+    last_load_time: float | None
+    total_load_time: float
+    failures: int
+    last_error: str | None
+
+    def __init__(self):
+        self.loads = 0
+        self.last_load_time = None
+        self.total_load_time = 0
+        self.failures = 0
+        self.last_error = None
+
+
+class ModelRegistry:
+    """
+    Zero-shot models by key, loaded on first use instead of on startup.
+    Resident models (with all their worker replicas) are kept in an LRU bounded by count and memory.
+    Loads run in a background thread pool and are single-flight: concurrent requests for a model wait for the same load.
+    Evicted models stay usable by running leases and are freed when those finish.
+    A failed load is returned as the failed future for retry_failed_after seconds, so callers see its error instead of starting it again.
+    """
+
+    model_keys: list[str]
+    workers_per_model: int
+    # Explainers built for every replica when a model is loaded, as (type, log)
+    warm_explainers: list[tuple[ExplainerType, bool]]
+    resident: LRUCache[str, ModelWorkerPool]
+    load_stats: dict[str, ModelLoadStats]
+    executor: ThreadPoolExecutor
+
+    def __init__(self, load_model: Callable[[str], ZeroShotModel], workers_per_model: int, max_models: int, max_bytes: int | None = None, load_workers: int = 1, warm_explainers: Iterable[tuple[ExplainerType, bool]] = (), retry_failed_after: float = 0):
+        self.model_keys = []
+        self.workers_per_model = workers_per_model
+        self.warm_explainers = list(warm_explainers)
+        self.retry_failed_after = retry_failed_after
+        self.resident = LRUCache(max_models, max_bytes, lambda pool: pool.bytes)
+        self.load_stats = {}
+        self.executor = ThreadPoolExecutor(max_workers=load_workers, thread_name_prefix="model-load")
+        self._load_model = load_model
+        self._loading: dict[str, Future[ModelWorkerPool]] = {}
+        # Failed loads with the time they failed
+        self._failed: dict[str, tuple[float, Future[ModelWorkerPool]]] = {}
+        self._lock = threading.Lock()
+
+    def register(self, model_key: str):
+        if model_key not in self.model_keys:
+            self.model_keys.append(model_key)
+            self.load_stats[model_key] = ModelLoadStats()
+
+    def load(self, model_key: str) -> Future[ModelWorkerPool]:
+        """Returns the resident model or starts loading it in the background, unless it is already loading"""
+        with self._lock:
+            pool = self.resident.get(model_key)
+            if pool is not None:
+                future = Future()
+                future.set_result(pool)
+                return future
+            future = self._loading.get(model_key)
+            if future is None:
+                failed = self._failed.get(model_key)
+                if failed is not None and time.time() - failed[0] < self.retry_failed_after:
+                    return failed[1]
+                future = self.executor.submit(self._load, model_key)
+                self._loading[model_key] = future
+            return future
+
+    def get_pool(self, model_key: str):
+        return self.load(model_key).result()
+
+    def _load(self, model_key: str):
+        start = time.time()
+        try:
+            pool = ModelWorkerPool(self._load_model(model_key), self.workers_per_model, self.warm_explainers)
+        except Exception as e:
+            with self._lock:
+                self._failed[model_key] = (time.time(), self._loading.pop(model_key))
+                stats = self.load_stats[model_key]
+                stats.failures += 1
+                stats.last_error = str(getattr(e, "detail", None) or e)
+            print(f"Model {model_key} can't be loaded: {e}")
+            raise
+        load_time = time.time() - start
+        with self._lock:
+            self.resident.put(model_key, pool)
+            self._loading.pop(model_key)
+            self._failed.pop(model_key, None)
+            stats = self.load_stats[model_key]
+            stats.loads += 1
+            stats.last_load_time = load_time
+            stats.total_load_time += load_time
+        print(f"Loaded model {model_key} in {load_time:.2f}s ({pool.bytes / 1024**2:.1f} MiB with {pool.workers} replicas)")
+        return pool
+
+    def stats(self):
+        return [
+            {
+                "model_key": model_key,
+                "resident": model_key in self.resident,
+                "loading": model_key in self._loading,
+                "loads": stats.loads,
+                "last_load_time": stats.last_load_time,
+                "total_load_time": stats.total_load_time,
+                "failures": stats.failures,
+                "last_error": stats.last_error,
+            }
+            for model_key, stats in self.load_stats.items()
+        ]
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
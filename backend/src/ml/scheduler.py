@@ -0,0 +1,148 @@
+import copy
+import queue
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Iterable
+
+from ml.service import ExplainerType, explainers
+from zero_shot_learned_db.explanations.explainers.base_explainer import BaseExplainer
+from zero_shot_learned_db.models.zero_shot_models.zero_shot_model import ZeroShotModel
+
+if TYPE_CHECKING:
+    from ml.registry import ModelRegistry
+
+
+class ModelState:
+    """Hooks, training mode and requires_grad of a model and its modules, which explainers change while they run"""
+
+    HOOKS = ["_forward_hooks", "_forward_hooks_with_kwargs", "_forward_hooks_always_called", "_forward_pre_hooks", "_forward_pre_hooks_with_kwargs", "_backward_hooks", "_backward_pre_hooks"]
+
+    def __init__(self, model: ZeroShotModel):
+        self.modules = [(module, module.training, {name: dict(getattr(module, name)) for name in self.HOOKS if hasattr(module, name)}) for module in model.modules()]
+        self.parameters = [(parameter, parameter.requires_grad) for parameter in model.parameters()]
+
+    def restore(self):
+        for module, training, hooks in self.modules:
+            module.training = training
+            for name, saved_hooks in hooks.items():
+                # Updated in place, handles returned by register_*_hook keep a reference to the dict
+                module_hooks = getattr(module, name)
+                module_hooks.clear()
+                module_hooks.update(saved_hooks)
+        for parameter, requires_grad in self.parameters:
+            parameter.requires_grad_(requires_grad)
+
+
+class ModelReplica:
+    """
+    A model replica with explainers that are built once and reused by every lease of the replica.
+    Replicas are leased exclusively, so their explainers are never used concurrently.
+    Explainers are built on the pristine model state of the replica. Before every use, an explainer gets a deep copy of its state right after
+    it was built, and the model gets back the hooks, training mode and requires_grad it had at that time, so calls never see state of previous calls.
+    """
+
+    model: ZeroShotModel
+    state: ModelState
+    explainers: dict[tuple[ExplainerType, bool], tuple[BaseExplainer, dict[str, Any], ModelState]]
+
+    def __init__(self, model: ZeroShotModel):
+        self.model = model
+        self.state = ModelState(model)
+        self.explainers = {}
+        # The model and its hook dicts (referenced by hook handles) are shared by the explainers and never copied with their state
+        hooks = [getattr(module, name) for module in model.modules() for name in ModelState.HOOKS if hasattr(module, name)]
+        self._shared = {id(value): value for value in [model, *model.modules(), *model.parameters(), *model.buffers(), *hooks]}
+
+    def copy_state(self, state: dict[str, Any]):
+        return copy.deepcopy(state, dict(self._shared))
+
+    def get_explainer(self, explainer_type: ExplainerType, log: bool):
+        key = (explainer_type, log)
+        if key not in self.explainers:
+            # Not on the state a previous call left behind, which would be restored on every later use
+            self.state.restore()
+            explainer = explainers[explainer_type](self.model, log=log)
+            self.explainers[key] = (explainer, self.copy_state(explainer.__dict__), ModelState(self.model))
+            return explainer
+        explainer, initial_state, model_state = self.explainers[key]
+        model_state.restore()
+        explainer.__dict__.clear()
+        explainer.__dict__.update(self.copy_state(initial_state))
+        return explainer
+
+
+class ModelLease:
+    replica: ModelReplica
+    explainers_log: bool
+
+    def __init__(self, replica: ModelReplica, explainers_log: bool):
+        self.replica = replica
+        self.explainers_log = explainers_log
+
+    @property
+    def model(self):
+        return self.replica.model
+
+    def get_explainer(self, explainer_type: ExplainerType):
+        return self.replica.get_explainer(explainer_type, self.explainers_log)
+
+
+class ModelWorkerPool:
+    # Explainers register hooks and change parameters of the model they wrap,
+    # so every worker gets its own replica and holds it exclusively while running
+    replicas: queue.Queue[ModelReplica]
+    workers: int
+    bytes: int
+
+    def __init__(self, model: ZeroShotModel, workers: int, warm_explainers: Iterable[tuple[ExplainerType, bool]] = ()):
+        self.workers = max(1, workers)
+        self.replicas = queue.Queue()
+        # All replicas are copied before explainers are built, which register hooks on the model
+        replicas = [ModelReplica(model if i == 0 else copy.deepcopy(model)) for i in range(self.workers)]
+        for replica in replicas:
+            for explainer_type, log in warm_explainers:
+                replica.get_explainer(explainer_type, log)
+            self.replicas.put(replica)
+        self.bytes = self.workers * sum(t.element_size() * t.nelement() for t in [*model.parameters(), *model.buffers()])
+
+    @contextmanager
+    def acquire(self):
+        replica = self.replicas.get()
+        try:
+            yield replica
+        finally:
+            self.replicas.put(replica)
+
+
+class InferenceScheduler:
+    registry: "ModelRegistry"
+    explainers_log: bool
+
+    def __init__(self, registry: "ModelRegistry", explainers_log: bool = False):
+        self.registry = registry
+        self.explainers_log = explainers_log
+
+    @property
+    def models(self):
+        return list(self.registry.model_keys)
+
+    @property
+    def default_model_key(self):
+        return self.registry.model_keys[0] if len(self.registry.model_keys) > 0 else None
+
+    def resolve_model_key(self, model_key: str | None = None):
+        if model_key not in self.registry.model_keys:
+            if model_key is not None:
+                print(f"WARNING: {model_key} does not exist, default model is used")
+            return self.default_model_key
+        return model_key
+
+    def get_pool(self, model_key: str | None = None):
+        return self.registry.get_pool(self.resolve_model_key(model_key))
+
+    @contextmanager
+    def lease(self, model_key: str | None = None):
+        with self.get_pool(model_key).acquire() as replica:
+            yield ModelLease(replica, self.explainers_log)
+
+    def shutdown(self):
+        self.registry.shutdown()
@@ -0,0 +1,89 @@
+import glob
+import hashlib
+import os
+import pickle
+import threading
+
+from sklearn.pipeline import Pipeline
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from query.db import Session
+from query.models import DatabaseStats, Plan, WorkloadRun, WorkloadRunSummary
+from zero_shot_learned_db.explanations.data_models.workload_run import DatabaseStats as PydanticDatabaseStats
+from zero_shot_learned_db.explanations.load import get_label_norm_runtimes
+
+# Increase when the content of MLSnapshot changes
+ML_SNAPSHOT_FORMAT_VERSION = 1
+
+
+class MLSnapshot:
+    """Objects derived from all ingested workload runs, which only change when runs are ingested"""
+
+    label_norm: Pipeline
+    database_stats: dict[int, PydanticDatabaseStats]
+
+    def __init__(self, label_norm: Pipeline, database_stats: dict[int, PydanticDatabaseStats]):
+        self.label_norm = label_norm
+        self.database_stats = database_stats
+
+
+def get_ml_snapshot_key(loss_class_name: str, db: Session):
+    """
+    Hash of the ingested workload runs instead of their plans, which is cheap to compute.
+    Runs are stored in a single transaction and never change afterwards, so the same runs mean the same plans and statistics.
+    """
+    key = hashlib.sha256()
+    key.update(f"{ML_SNAPSHOT_FORMAT_VERSION}:{loss_class_name}".encode())
+    runs = db.execute(select(WorkloadRun.id, WorkloadRun.database_stats_id, WorkloadRunSummary.queries_count).outerjoin(WorkloadRunSummary, WorkloadRunSummary.workload_run_id == WorkloadRun.id).order_by(WorkloadRun.id)).all()
+    for run in runs:
+        key.update(f"{run.id}:{run.database_stats_id}:{run.queries_count};".encode())
+    return key.hexdigest()[:16]
+
+
+def compute_ml_snapshot(loss_class_name: str, db: Session):
+    label_norm = get_label_norm_runtimes(list(db.scalars(select(Plan.plan_runtime).where(Plan.sql.is_not(None)))), loss_class_name)
+    runs = db.execute(select(WorkloadRun.id, DatabaseStats).join(DatabaseStats, DatabaseStats.id == WorkloadRun.database_stats_id).options(selectinload(DatabaseStats.column_stats), selectinload(DatabaseStats.table_stats))).all()
+    return MLSnapshot(label_norm, {workload_run_id: db_stats.to_pydantic() for workload_run_id, db_stats in runs})
+
+
+def get_ml_snapshot_path(directory: str, key: str):
+    return os.path.join(directory, f"ml_snapshot_{key}.pkl")
+
+
+def load_ml_snapshot(directory: str, key: str) -> MLSnapshot | None:
+    path = get_ml_snapshot_path(directory, key)
+    if not os.path.isfile(path):
+        return None
+    try:
+        with open(path, "rb") as file:
+            return pickle.load(file)
+    except Exception as e:
+        print(f"WARNING: snapshot {path} can't be loaded and is ignored: {e}")
+        return None
+
+
+def save_ml_snapshot(directory: str, key: str, snapshot: MLSnapshot):
+    path = get_ml_snapshot_path(directory, key)
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as file:
+        pickle.dump(snapshot, file)
+    os.replace(tmp_path, path)
+    # Snapshots of previous ingestions are never used again
+    for old_path in glob.glob(os.path.join(directory, "ml_snapshot_*.pkl")):
+        if old_path != path:
+            os.remove(old_path)
+
+
+def get_ml_snapshot(directory: str | None, loss_class_name: str, db: Session):
+    """Loads the snapshot of the current ingestion or computes and saves it"""
+    if directory is None:
+        return compute_ml_snapshot(loss_class_name, db)
+    key = get_ml_snapshot_key(loss_class_name, db)
+    snapshot = load_ml_snapshot(directory, key)
+    if snapshot is None:
+        snapshot = compute_ml_snapshot(loss_class_name, db)
+        save_ml_snapshot(directory, key, snapshot)
+        print(f"Saved ML snapshot {key}")
+    return snapshot
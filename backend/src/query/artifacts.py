@@ -0,0 +1,64 @@
+import shutil
+import subprocess
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from query.db import Session
+from query.models import PlanArtifact
+from query.schemas import FullQueryResponse, GraphNodeResponse
+from zero_shot_learned_db.explanations.load import ParsedPlan
+
+# Increase when FullQueryResponse or the rendering changes
+PLAN_ARTIFACTS_FORMAT_VERSION = 1
+
+
+def get_plan_artifacts_version(ml_version: str, render_svg: bool):
+    return f"{PLAN_ARTIFACTS_FORMAT_VERSION}:{ml_version}:{'svg' if render_svg else 'dot'}"
+
+
+def render_svg(dot_graph: str, timeout: float) -> str | None:
+    """Lays out the graph with the graphviz dot binary, returns None if graphviz is not installed or fails"""
+    if shutil.which("dot") is None:
+        return None
+    try:
+        result = subprocess.run(["dot", "-Tsvg"], input=dot_graph, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        print(f"WARNING: graphviz layout timed out after {timeout}s")
+        return None
+    if result.returncode != 0:
+        print(f"WARNING: graphviz layout failed: {result.stderr}")
+        return None
+    return result.stdout
+
+
+def create_full_query_response(parsed_plan: ParsedPlan, svg_timeout: float | None):
+    dot_graph = parsed_plan.get_dot()
+    return FullQueryResponse(
+        id=parsed_plan.id,
+        id_in_run=parsed_plan.id_in_run,
+        plan_runtime=parsed_plan.plan.plan_runtime,
+        query_stats=parsed_plan.graph_nodes_stats,
+        dot_graph=dot_graph,
+        svg=render_svg(dot_graph, svg_timeout) if svg_timeout is not None else None,
+        graph_nodes=[
+            GraphNodeResponse(
+                node_id=n.id_in_nx_graph,
+                label=n.node.get_label(),
+                node_info=n.node,
+            )
+            for n in parsed_plan.graph_nodes
+        ],
+        sql=parsed_plan.plan.sql,
+    )
+
+
+def get_plan_artifact(plan_id: int, version: str, db: Session) -> str | None:
+    return db.scalar(select(PlanArtifact.response).where(PlanArtifact.plan_id == plan_id, PlanArtifact.version == version))
+
+
+def store_plan_artifact(plan_id: int, version: str, response: str, db: Session):
+    statement = insert(PlanArtifact).values(plan_id=plan_id, version=version, response=response)
+    statement = statement.on_conflict_do_update(index_elements=[PlanArtifact.plan_id], set_={"version": statement.excluded.version, "response": statement.excluded.response})
+    db.execute(statement)
+    db.commit()
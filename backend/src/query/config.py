@@ -7,4 +7,13 @@ class QuerySettings(BaseModel):
     saved_runs_config_file: str = "saved_runs_config.json"
     datasets_runs_dir: str = "runs/parsed_plans"
     datasets_runs_raw_dir: str = "runs/raw"
+    max_batch_predictions: int = 100
+    ingestion_chunk_size: int = 1000
+    ingestion_workers: int | None = None
+    plan_artifacts_svg: bool = False
+    plan_artifacts_svg_timeout: float = 30
+    plan_artifacts_prebuild: bool = False
+    http_cache_max_size: int = 10000
+    http_cache_max_bytes: int = 256 * 1024**2
+    http_cache_control: str = "private, no-cache"
     pass
@@ -3,7 +3,7 @@ from fastapi import Depends
 from sqlalchemy import create_engine
 from sqlalchemy.orm import Session, sessionmaker, DeclarativeBase
 from config import Settings
-from db_utils import create_db, get_db_connection_string
+from db_utils import create_db, get_db_connection_string, get_missing_columns, upgrade_db
 
 SessionLocal = None
 engine = None
@@ -11,12 +11,22 @@ engine = None
 
 def setup_db_connection(settings: Settings):
     create_db(settings, settings.query.db_name, settings.query.db_init_backup_file)
+    setup_db_engine(settings)
+    Base.metadata.create_all(bind=engine)
+    # create_all doesn't add columns to existing tables, e.g. of a restored backup, migrations are idempotent after create_all
+    upgrade_db()
+    # Every query of a model with a missing column fails, so the server doesn't start without them
+    missing_columns = get_missing_columns(engine, Base.metadata)
+    if len(missing_columns) > 0:
+        raise Exception(f"Database {settings.query.db_name} lacks the columns {', '.join(missing_columns)}, run alembic upgrade head (from ./src)")
+
+
+def setup_db_engine(settings: Settings):
     connection_string = get_db_connection_string(settings, settings.query.db_name)
     global engine
     engine = create_engine(connection_string)
     global SessionLocal
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    Base.metadata.create_all(bind=engine)
 
 
 class Base(DeclarativeBase):
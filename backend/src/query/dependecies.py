@@ -2,64 +2,65 @@ import threading
 from typing import Annotated
 from fastapi import Depends, HTTPException
 from ml.dependencies import MLHelper
+from ml.scheduler import ModelLease
 from ml.service import ExplainerType
-from query.db import db_depends
-from query.models import Plan, WorkloadRun, ZeroShotModelConfig
+from query.db import Session, db_depends
+from query.loader import decode_plan_snapshot, load_plan_tree
+from query.models import Dataset, Plan, WorkloadRun, ZeroShotModelConfig
 from zero_shot_learned_db.explanations.load import ParsedPlan
 
-_inference_mutex = threading.Lock()
 
-
-def inference_mutex():
-    try:
-        _inference_mutex.acquire()
-        yield
-    finally:
-        _inference_mutex.release()
-
-
-class InferenceMutex:
-    def __enter__(self):
-        _inference_mutex.acquire()
-
-    def __exit__(self, *args):
-        _inference_mutex.release()
+def load_parsed_plan(query_id: int, db: Session, ml: MLHelper):
+    # Only top-level plans belong to a workload run. The snapshot is fetched right away, so a plan store miss needs no second query
+    query = db.query(Plan.id, Plan.id_in_run, Plan.workload_run_id, Plan.plan_snapshot, Dataset.name.label("dataset_name")).join(Plan.workload_run).join(WorkloadRun.dataset).filter(Plan.id == query_id).first()
+    if query is None:
+        return None
+
+    # The plan store only caches featurization of plans that exist in the database
+    parsed_plan = ml.load_stored_plan(query.workload_run_id, query.id)
+    if parsed_plan is None:
+        # Plans stored before snapshots were introduced are loaded from the normalized tables until they are backfilled
+        plan = decode_plan_snapshot(query.plan_snapshot) if query.plan_snapshot is not None else load_plan_tree(query.id, db).to_pydantic()
+        parsed_plan = ParsedPlan(
+            plan,
+            ml.database_stats[query.workload_run_id],
+            ml.hyperparameters,
+            ml.feature_statistics,
+            dataset_name=query.dataset_name,
+        )
+        parsed_plan.id = query.id
+        parsed_plan.id_in_run = query.id_in_run
+        parsed_plan.workload_run_id = query.workload_run_id
+        parsed_plan.prepare_plan_for_view()
+
+    # Guards preparation of the shared (cached) plan, masking is only done on views (see ParsedPlanView)
+    parsed_plan.lock = threading.Lock()
+    return parsed_plan
 
 
 def get_parsed_plan(
     query_id: int,
     db: db_depends,
     ml: Annotated[MLHelper, Depends()],
-    inference_mutex: Annotated[None, Depends(inference_mutex)],
 ):
     parsed_plan = ml.cache_get_plan(query_id)
     if parsed_plan is not None:
         return parsed_plan
 
-    query = db.query(Plan).join(Plan.workload_run).join(WorkloadRun.dataset).filter(Plan.id == query_id).first()
-    if query is None:
+    parsed_plan = load_parsed_plan(query_id, db, ml)
+    if parsed_plan is None:
         raise HTTPException(422, f"Query with id == {query_id} was not found")
 
-    plan = query.to_pydantic()
-    parsed_plan = ParsedPlan(
-        plan,
-        ml.database_stats[query.workload_run_id],
-        ml.hyperparameters,
-        ml.feature_statistics,
-        dataset_name=query.workload_run.dataset.name,
-    )
-    parsed_plan.id = query.id
-    parsed_plan.id_in_run = query.id_in_run
-    parsed_plan.prepare_plan_for_view()
-
     ml.cache_store_plan(parsed_plan)
 
     return parsed_plan
 
 
-def get_parsed_plan_for_inference(parsed_plan: Annotated[ParsedPlan, Depends(get_parsed_plan)]):
-    parsed_plan.prepare_plan_for_inference()
-    return parsed_plan
+def get_parsed_plan_for_inference(
+    parsed_plan: Annotated[ParsedPlan, Depends(get_parsed_plan)],
+    ml: Annotated[MLHelper, Depends()],
+):
+    return ml.get_plan_view(parsed_plan)
 
 
 def get_zero_shot_model_key_for_query(
@@ -78,24 +79,16 @@ def get_zero_shot_model_key_for_query(
     return None
 
 
-def get_explainer_for_parsed_plan(
-    explainer_type: ExplainerType,
+def get_model_lease(
     ml: Annotated[MLHelper, Depends()],
     model_key: Annotated[str, Depends(get_zero_shot_model_key_for_query)],
 ):
-    return ml.get_explainer(explainer_type, model_key=model_key)
+    with ml.lease_model(model_key) as lease:
+        yield lease
 
 
 def get_explainer_optional_for_parsed_plan(
-    ml: Annotated[MLHelper, Depends()],
-    parsed_plan: Annotated[ParsedPlan, Depends(get_parsed_plan_for_inference)],
+    lease: Annotated[ModelLease, Depends(get_model_lease)],
     explainer_type: ExplainerType | None = None,
 ):
-    return ml.get_explainer(explainer_type, dataset_name=parsed_plan.dataset_name) if explainer_type is not None else None
-
-
-def get_predictor(
-    ml: Annotated[MLHelper, Depends()],
-    model_key: Annotated[str, Depends(get_zero_shot_model_key_for_query)],
-):
-    return ml.get_explainer(ExplainerType.BASE, model_key=model_key)
+    return lease.get_explainer(explainer_type) if explainer_type is not None else None
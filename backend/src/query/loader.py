@@ -0,0 +1,73 @@
+import zlib
+from collections import defaultdict
+from sqlalchemy import or_, select
+from sqlalchemy.orm.attributes import set_committed_value
+
+from query.db import Session
+from query.models import ColumnStats, LogicalPredicate, OutputColumn, OutputColumnColumn, Plan, PlanOutputColumn, PlanParameters
+from zero_shot_learned_db.explanations.data_models import nodes
+
+
+def load_plan_trees(plan_ids: list[int], db: Session):
+    """
+    Loads top-level plans with all their nodes in a constant number of queries (using the top_plan_id columns filled by ingestion).
+    Relationships are set as already loaded, so Plan.to_pydantic does not issue lazy loads.
+    """
+    root_ids = set(plan_ids)
+    in_plan_trees = or_(Plan.id.in_(plan_ids), Plan.top_plan_id.in_(plan_ids))
+    plans = db.scalars(select(Plan).where(in_plan_trees).order_by(Plan.id)).all()
+
+    plan_parameters = {p.id: p for p in db.scalars(select(PlanParameters).join(Plan, Plan.plan_parameters_id == PlanParameters.id).where(in_plan_trees)).all()}
+
+    output_columns: dict[int, list[OutputColumn]] = defaultdict(list)
+    output_columns_rows = db.execute(select(PlanOutputColumn.plan_parameters_id, OutputColumn).join(OutputColumn, OutputColumn.id == PlanOutputColumn.output_column_id).where(OutputColumn.top_plan_id.in_(plan_ids)).order_by(OutputColumn.id)).all()
+    for plan_parameters_id, output_column in output_columns_rows:
+        output_columns[plan_parameters_id].append(output_column)
+
+    columns: dict[int, list[ColumnStats]] = defaultdict(list)
+    columns_rows = db.execute(select(OutputColumnColumn.output_column_id, ColumnStats).join(ColumnStats, ColumnStats.id == OutputColumnColumn.column_id).join(OutputColumn, OutputColumn.id == OutputColumnColumn.output_column_id).where(OutputColumn.top_plan_id.in_(plan_ids))).all()
+    for output_column_id, column in columns_rows:
+        columns[output_column_id].append(column)
+
+    logical_nodes = db.scalars(select(LogicalPredicate).where(LogicalPredicate.top_plan_id.in_(plan_ids)).order_by(LogicalPredicate.id)).all()
+    link_plan_trees(plans, plan_parameters, output_columns, columns, logical_nodes)
+
+    return {plan.id: plan for plan in plans if plan.id in root_ids}
+
+
+def link_plan_trees(plans: list[Plan], plan_parameters: dict[int, PlanParameters], output_columns: dict[int, list[OutputColumn]], columns: dict[int, list[ColumnStats]], logical_nodes: list[LogicalPredicate]):
+    """Sets the relationships between the nodes of plan trees as already loaded, nodes and children are expected in the order of their ids"""
+    logical_nodes_by_id = {node.id: node for node in logical_nodes}
+    logical_nodes_children: dict[int, list[LogicalPredicate]] = defaultdict(list)
+    for node in logical_nodes:
+        if node.parent_id is not None:
+            logical_nodes_children[node.parent_id].append(node)
+
+    plans_children: dict[int, list[Plan]] = defaultdict(list)
+    for plan in plans:
+        if plan.parent_id is not None:
+            plans_children[plan.parent_id].append(plan)
+
+    for plan in plans:
+        set_committed_value(plan, "children", plans_children[plan.id])
+        set_committed_value(plan, "plan_parameters", plan_parameters[plan.plan_parameters_id])
+    for parameters in plan_parameters.values():
+        set_committed_value(parameters, "output_columns", output_columns.get(parameters.id, []))
+        set_committed_value(parameters, "filter_columns", logical_nodes_by_id.get(parameters.logical_node_id))
+    for output_column_list in output_columns.values():
+        for output_column in output_column_list:
+            set_committed_value(output_column, "columns", columns.get(output_column.id, []))
+    for node in logical_nodes:
+        set_committed_value(node, "children", logical_nodes_children[node.id])
+
+
+def load_plan_tree(plan_id: int, db: Session):
+    return load_plan_trees([plan_id], db).get(plan_id)
+
+
+def encode_plan_snapshot(plan: nodes.Plan):
+    return zlib.compress(plan.model_dump_json().encode())
+
+
+def decode_plan_snapshot(snapshot: bytes):
+    return nodes.Plan.model_validate_json(zlib.decompress(snapshot))
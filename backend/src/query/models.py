@@ -1,5 +1,6 @@
-from typing import Optional
-from sqlalchemy import ForeignKey
+from typing import Any, Optional
+from sqlalchemy import ForeignKey, Index, LargeBinary, Text, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import mapped_column, Mapped, relationship
 from sqlalchemy.orm.attributes import InstrumentedAttribute
 from query.db import Base
@@ -68,6 +69,7 @@ class ColumnStats(Base):
 
 class OutputColumn(Base):
     __tablename__ = "output_columns"
+    __table_args__ = (Index("ix_output_columns_top_plan_id", "top_plan_id"),)
 
     id: Mapped[int] = mapped_column(primary_key=True)
     aggregation: Mapped[str | None]
@@ -83,6 +85,7 @@ class OutputColumn(Base):
 
 class OutputColumnColumn(Base):
     __tablename__ = "output_columns_columns"
+    __table_args__ = (Index("ix_output_columns_columns_output_column_id", "output_column_id"),)
 
     column_id: Mapped[int] = mapped_column(ForeignKey(ColumnStats.id), primary_key=True)
     output_column_id: Mapped[int] = mapped_column(ForeignKey(OutputColumn.id), primary_key=True)
@@ -90,6 +93,10 @@ class OutputColumnColumn(Base):
 
 class LogicalPredicate(Base):
     __tablename__ = "logical_nodes"
+    __table_args__ = (
+        Index("ix_logical_nodes_top_plan_id", "top_plan_id"),
+        Index("ix_logical_nodes_parent_id", "parent_id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     type: Mapped[str]
@@ -201,6 +208,7 @@ class PlanParameters(Base):
 
 class PlanOutputColumn(Base):
     __tablename__ = "plan_output_columns"
+    __table_args__ = (Index("ix_plan_output_columns_output_column_id", "output_column_id"),)
 
     plan_parameters_id: Mapped[int] = mapped_column(ForeignKey(PlanParameters.id), primary_key=True)
     output_column_id: Mapped[int] = mapped_column(ForeignKey(OutputColumn.id), primary_key=True)
@@ -208,7 +216,12 @@ class PlanOutputColumn(Base):
 
 class PlanStats(Base):
     __tablename__ = "plan_stats"
+    # Listing sorts by plan stats within a workload run, see OrderByArg in query/service.py
+    __table_args__ = tuple(Index(f"ix_plan_stats_workload_run_id_{column}", "workload_run_id", column, "id") for column in ["nodes", "plans", "joins", "tables", "columns", "predicates"])
+
     id: Mapped[int] = mapped_column(primary_key=True)
+    # Same as workload_run_id of the plan, so queries of a run can be filtered and sorted with one index
+    workload_run_id: Mapped[int | None] = mapped_column(ForeignKey("workload_runs.id"))
 
     tables: Mapped[int]
     columns: Mapped[int]
@@ -235,6 +248,13 @@ class PlanStats(Base):
 
 class Plan(Base):
     __tablename__ = "plans"
+    __table_args__ = (
+        Index("ix_plans_workload_run_id_id_in_run", "workload_run_id", "id_in_run", "id"),
+        Index("ix_plans_workload_run_id_plan_runtime", "workload_run_id", "plan_runtime", "id"),
+        Index("ix_plans_top_plan_id", "top_plan_id"),
+        Index("ix_plans_parent_id", "parent_id"),
+        Index("ix_plans_plan_stats_id", "plan_stats_id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     id_in_run: Mapped[int | None]
@@ -253,6 +273,8 @@ class Plan(Base):
     top_plan: Mapped[Optional["Plan"]] = relationship(foreign_keys=[top_plan_id], remote_side=[id])
     plan_stats_id: Mapped[int | None] = mapped_column(ForeignKey(PlanStats.id))
     plan_stats: Mapped[PlanStats | None] = relationship()
+    # Compressed pydantic plan of a top-level plan, see query/loader.py
+    plan_snapshot: Mapped[bytes | None] = mapped_column(LargeBinary, deferred=True)
 
     # plain_content: list
     # join_conds: list[str]
@@ -320,3 +342,45 @@ class ZeroShotModelConfig(Base):
     file_name: Mapped[str]
     dataset_id: Mapped[int | None] = mapped_column(ForeignKey(Dataset.id))
     dataset: Mapped[Dataset | None] = relationship()
+
+
+class InferenceResult(Base):
+    __tablename__ = "inference_results"
+    __table_args__ = (UniqueConstraint("plan_id", "model_file_name", "result_type"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    plan_id: Mapped[int] = mapped_column(ForeignKey(Plan.id))
+    model_file_name: Mapped[str]
+    model_hash: Mapped[str]
+    result_type: Mapped[str]
+    result: Mapped[dict[str, Any]] = mapped_column(JSONB)
+
+
+class WorkloadRunSummary(Base):
+    """Aggregates of a workload run, filled in at ingestion (see query/summary.py), since plans never change afterwards"""
+
+    __tablename__ = "workload_run_summaries"
+
+    workload_run_id: Mapped[int] = mapped_column(ForeignKey(WorkloadRun.id), primary_key=True)
+    queries_count: Mapped[int]
+    runtime_min: Mapped[float | None]
+    runtime_max: Mapped[float | None]
+    runtime_mean: Mapped[float | None]
+    # {"bin_edges": [...], "counts": [...]}
+    runtime_histogram: Mapped[dict[str, Any]] = mapped_column(JSONB)
+    # {value: count} of the PlanStats columns
+    joins_histogram: Mapped[dict[str, int]] = mapped_column(JSONB)
+    tables_histogram: Mapped[dict[str, int]] = mapped_column(JSONB)
+    nodes_histogram: Mapped[dict[str, int]] = mapped_column(JSONB)
+
+
+class PlanArtifact(Base):
+    """Rendered query view of a plan, stored on the first request (see query/artifacts.py)"""
+
+    __tablename__ = "plan_artifacts"
+
+    plan_id: Mapped[int] = mapped_column(ForeignKey(Plan.id), primary_key=True)
+    # Artifacts rendered with another version are stale and rendered again
+    version: Mapped[str]
+    # Serialized FullQueryResponse with the DOT graph, graph nodes and the optional SVG layout
+    response: Mapped[str] = mapped_column(Text)
@@ -0,0 +1,74 @@
+from typing import Callable, TypeVar
+from pydantic import BaseModel
+from sqlalchemy.dialects.postgresql import insert
+
+from cache_utils import LRUCache
+from query.db import Session
+from query.models import InferenceResult
+
+PREDICTION_RESULT_TYPE = "prediction"
+
+T = TypeVar("T", bound=BaseModel)
+
+
+class ResultCache:
+    """
+    Read-through cache of predictions and explanations.
+    Results are kept in an in-memory LRU in front of the inference_results table
+    and are only valid for the model file they were computed with.
+    """
+
+    memory: LRUCache[tuple[int, str, str, str], BaseModel]
+    db_hits: int
+    db_misses: int
+
+    def __init__(self, max_size: int):
+        self.memory = LRUCache(max_size)
+        self.db_hits = 0
+        self.db_misses = 0
+
+    def get(self, db: Session, response_type: type[T], plan_id: int, model_key: str, model_hash: str, result_type: str) -> T | None:
+        result = self.memory.get((plan_id, model_key, model_hash, result_type))
+        if result is not None:
+            return result
+
+        db_result = db.query(InferenceResult).filter(InferenceResult.plan_id == plan_id, InferenceResult.model_file_name == model_key, InferenceResult.result_type == result_type).first()
+        if db_result is None or db_result.model_hash != model_hash:
+            self.db_misses += 1
+            return None
+        self.db_hits += 1
+        result = response_type.model_validate(db_result.result)
+        self.memory.put((plan_id, model_key, model_hash, result_type), result)
+        return result
+
+    def store(self, db: Session, result: BaseModel, plan_id: int, model_key: str, model_hash: str, result_type: str):
+        self.memory.put((plan_id, model_key, model_hash, result_type), result)
+        statement = insert(InferenceResult).values(
+            plan_id=plan_id,
+            model_file_name=model_key,
+            model_hash=model_hash,
+            result_type=result_type,
+            result=result.model_dump(),
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[InferenceResult.plan_id, InferenceResult.model_file_name, InferenceResult.result_type],
+            set_={"model_hash": statement.excluded.model_hash, "result": statement.excluded.result},
+        )
+        # Written with its own session, so a cache write never commits pending changes of the caller's session
+        with Session(db.get_bind()) as session:
+            session.execute(statement)
+            session.commit()
+
+    def get_or_compute(self, db: Session, response_type: type[T], plan_id: int, model_key: str, model_hash: str, result_type: str, compute: Callable[[], T]) -> T:
+        result = self.get(db, response_type, plan_id, model_key, model_hash, result_type)
+        if result is None:
+            result = compute()
+            self.store(db, result, plan_id, model_key, model_hash, result_type)
+        return result
+
+    def stats(self):
+        return {
+            "memory": self.memory.stats(),
+            "db_hits": self.db_hits,
+            "db_misses": self.db_misses,
+        }
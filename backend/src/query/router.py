@@ -1,16 +1,17 @@
-from enum import StrEnum
 import time
 from typing import Annotated
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import Column
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import func, select
 
+from config import Settings, get_settings
 from ml.dependencies import MLHelper
 from query.db import db_depends
-from query.dependecies import get_explainer_for_parsed_plan, get_parsed_plan, get_parsed_plan_for_inference, get_predictor, inference_mutex
-from query.models import Dataset, Plan, PlanStats, WorkloadRun, ZeroShotModelConfig
-from query.schemas import DatasetResponse, ExplanationResponse, FullQueryResponse, GraphNodeResponse, PredictionResponse, QueriesPageResponse, QueryResponse, WorkloadRunResponse
-from query.service import get_workload_run_queries_count
-from zero_shot_learned_db.explanations.explainers.base_explainer import BaseExplainer
+from ml.service import ExplainerType
+from query.dependecies import get_parsed_plan, get_zero_shot_model_key_for_query
+from query.models import Dataset, WorkloadRun, WorkloadRunSummary, ZeroShotModelConfig
+from query.schemas import CacheStatsResponse, DatasetResponse, ExplanationResponse, FullQueryResponse, PredictionResponse, PredictionResponseBase, PredictionsRequest, PredictionsResponse, QueriesPageResponse, QueryPredictionResponse, QueryResponse, WorkloadRunResponse, WorkloadRunSummaryResponse
+from query.service import OrderByArg, QueriesCursor, explain_query, get_cached_prediction, get_missing_query_ids, get_query_response, get_workload_queries_page, get_workload_run_queries_count, get_zero_shot_models_for_queries, predict_query, store_prediction
+from query.summary import compute_workload_run_summary
 from zero_shot_learned_db.explanations.load import ParsedPlan
 from pydantic.alias_generators import to_camel
 
@@ -20,17 +21,19 @@ router = APIRouter(tags=["query"])
 
 @router.get("/datasets", response_model=list[DatasetResponse])
 def get_datasets(db: db_depends):
-    datasets: list[DatasetResponse] = []
-    for dataset in db.query(Dataset).all():
-        default_model = db.query(ZeroShotModelConfig).filter(ZeroShotModelConfig.dataset_id == dataset.id).first()
-        datasets.append(
-            DatasetResponse(
-                id=dataset.id,
-                name=dataset.name,
-                default_zero_shot_model_id=default_model.id if default_model is not None else None,
-            )
+    default_models = select(ZeroShotModelConfig.dataset_id, func.min(ZeroShotModelConfig.id).label("id")).group_by(ZeroShotModelConfig.dataset_id).subquery()
+    workloads = select(WorkloadRun.dataset_id, func.count(WorkloadRun.id).label("workloads_count"), func.sum(WorkloadRunSummary.queries_count).label("queries_count")).outerjoin(WorkloadRunSummary, WorkloadRunSummary.workload_run_id == WorkloadRun.id).group_by(WorkloadRun.dataset_id).subquery()
+    rows = db.execute(select(Dataset.id, Dataset.name, default_models.c.id, workloads.c.workloads_count, workloads.c.queries_count).outerjoin(default_models, default_models.c.dataset_id == Dataset.id).outerjoin(workloads, workloads.c.dataset_id == Dataset.id).order_by(Dataset.id)).all()
+    return [
+        DatasetResponse(
+            id=dataset_id,
+            name=name,
+            default_zero_shot_model_id=default_model_id,
+            workloads_count=workloads_count or 0,
+            queries_count=queries_count or 0,
         )
-    return datasets
+        for dataset_id, name, default_model_id, workloads_count, queries_count in rows
+    ]
 
 
 @router.get("/datasets/{dataset_id}/workloads", response_model=list[WorkloadRunResponse])
@@ -38,50 +41,44 @@ def get_workloads(dataset_id: int, db: db_depends):
     dataset = db.query(Dataset).filter(Dataset.id == dataset_id).first()
     if dataset is None:
         raise HTTPException(422, f"Dataset with id == {dataset_id} was not found")
-    runs = db.query(WorkloadRun).filter(WorkloadRun.dataset_id == dataset_id).all()
+    rows = db.execute(select(WorkloadRun, WorkloadRunSummary.queries_count).outerjoin(WorkloadRunSummary, WorkloadRunSummary.workload_run_id == WorkloadRun.id).where(WorkloadRun.dataset_id == dataset_id).order_by(WorkloadRun.id)).tuples().all()
     return [
         WorkloadRunResponse(
             id=run.id,
             file_path=run.file_path,
             file_name=run.file_name,
-            queries_count=get_workload_run_queries_count(run.id, db),
+            # Runs are only missing a summary until it is backfilled on startup
+            queries_count=queries_count if queries_count is not None else get_workload_run_queries_count(run.id, db),
         )
-        for run in runs
+        for run, queries_count in rows
     ]
 
 
-class OrderByArg(StrEnum):
-    ID = "id"
-    NODES = "nodes"
-    PLANS = "plans"
-    JOINS = "joins"
-    TABLES = "tables"
-    COLUMNS = "columns"
-    PREDICATES = "predicates"
-    RUNTIME = "runtime"
-
-
-order_by_columns: dict[OrderByArg, Column] = {
-    OrderByArg.ID: Plan.id_in_run,
-    OrderByArg.RUNTIME: Plan.plan_runtime,
-    OrderByArg.NODES: PlanStats.nodes,
-    OrderByArg.PLANS: PlanStats.plans,
-    OrderByArg.JOINS: PlanStats.joins,
-    OrderByArg.TABLES: PlanStats.tables,
-    OrderByArg.COLUMNS: PlanStats.columns,
-    OrderByArg.PREDICATES: PlanStats.predicates,
-}
+@router.get("/workloads/{workload_id}/summary", response_model=WorkloadRunSummaryResponse)
+def get_workload_summary(workload_id: int, db: db_depends):
+    summary = db.get(WorkloadRunSummary, workload_id)
+    if summary is None:
+        if db.get(WorkloadRun, workload_id) is None:
+            raise HTTPException(422, f"Workload with id == {workload_id} was not found")
+        # Only until the summary is backfilled on startup, GET never writes
+        summary = WorkloadRunSummary(**compute_workload_run_summary(workload_id, db))
+    return WorkloadRunSummaryResponse.model_validate(summary)
 
 
 @router.get("/workloads/{workload_id}/queries", response_model=QueriesPageResponse)
-def get_workload_queries(workload_id: int, db: db_depends, offset: int = 0, limit: int = 20, order_by: OrderByArg = OrderByArg.ID, ascending: bool = True):
+def get_workload_queries(workload_id: int, db: db_depends, offset: int = 0, limit: int = 20, order_by: OrderByArg = OrderByArg.ID, ascending: bool = True, cursor: str | None = None):
     workload_run = db.query(WorkloadRun).filter(WorkloadRun.id == workload_id).first()
     if workload_run is None:
         raise HTTPException(422, f"Workload with id == {workload_id} was not found")
-    order_by_column = order_by_columns[order_by]
-    if not ascending:
-        order_by_column = order_by_column.desc()
-    plans = db.query(Plan, PlanStats).join(Plan.plan_stats).filter(Plan.workload_run_id == workload_id, Plan.id_in_run.is_not(None)).order_by(order_by_column).offset(offset).limit(limit).tuples().all()
+    queries_cursor = None
+    if cursor is not None:
+        try:
+            queries_cursor = QueriesCursor.decode(cursor)
+        except ValueError:
+            raise HTTPException(422, "Invalid cursor")
+        if queries_cursor.order_by != order_by or queries_cursor.ascending != ascending:
+            raise HTTPException(422, "Cursor does not match the requested order")
+    plans, next_cursor, prev_cursor = get_workload_queries_page(workload_id, order_by, ascending, limit, offset, queries_cursor, db)
     return QueriesPageResponse(
         queries=[
             QueryResponse(
@@ -96,59 +93,96 @@ def get_workload_queries(workload_id: int, db: db_depends, offset: int = 0, limi
         offset=offset,
         limit=limit,
         total_count=get_workload_run_queries_count(workload_run.id, db),
+        next_cursor=next_cursor,
+        prev_cursor=prev_cursor,
     )
 
 
 @router.get("/queries/{query_id}", response_model=FullQueryResponse)
-def get_query(parsed_plan: Annotated[ParsedPlan, Depends(get_parsed_plan)]):
-    response = FullQueryResponse(
-        id=parsed_plan.id,
-        id_in_run=parsed_plan.id_in_run,
-        plan_runtime=parsed_plan.plan.plan_runtime,
-        query_stats=parsed_plan.graph_nodes_stats,
-        dot_graph=parsed_plan.get_dot(),
-        graph_nodes=[
-            GraphNodeResponse(
-                node_id=n.id_in_nx_graph,
-                label=n.node.get_label(),
-                node_info=n.node,
-            )
-            for n in parsed_plan.graph_nodes
-        ],
-        sql=parsed_plan.plan.sql,
-    )
-
-    return response
+def get_query(query_id: int, db: db_depends, ml: Annotated[MLHelper, Depends()]):
+    # The stored response is already serialized
+    return Response(get_query_response(query_id, db, ml), media_type="application/json")
 
 
 @router.get("/queries/{query_id}/prediction", response_model=PredictionResponse)
 def get_prediction(
-    parsed_plan: Annotated[ParsedPlan, Depends(get_parsed_plan_for_inference)],
-    base_explainer: Annotated[BaseExplainer, Depends(get_predictor)],
-    inference_mutex: Annotated[None, Depends(inference_mutex)],
+    query_id: int,
+    db: db_depends,
+    ml: Annotated[MLHelper, Depends()],
+    model_key: Annotated[str, Depends(get_zero_shot_model_key_for_query)],
 ):
     start = time.time()
-    prediction = base_explainer.predict(parsed_plan)
+    prediction = predict_query(query_id, model_key, db, ml)
     return PredictionResponse(
         **prediction.model_dump(),
         execution_time=time.time() - start,
     )
 
 
+@router.post("/queries/predictions", response_model=PredictionsResponse)
+def get_predictions(
+    request: PredictionsRequest,
+    db: db_depends,
+    ml: Annotated[MLHelper, Depends()],
+    settings: Annotated[Settings, Depends(get_settings)],
+):
+    if len(request.query_ids) > settings.query.max_batch_predictions:
+        raise HTTPException(422, f"At most {settings.query.max_batch_predictions} queries can be predicted at once")
+    missing_query_ids = get_missing_query_ids(request.query_ids, db)
+    if len(missing_query_ids) > 0:
+        raise HTTPException(404, f"Queries with ids {missing_query_ids} were not found")
+    start = time.time()
+    zs_models = get_zero_shot_models_for_queries(request.query_ids, db, request.model_id)
+    predictions: dict[int, PredictionResponseBase] = {}
+    plans_per_model: dict[str | None, list[ParsedPlan]] = {}
+    for query_id in dict.fromkeys(request.query_ids):
+        zs_model = zs_models[query_id]
+        model_key = zs_model.file_name if zs_model is not None else None
+        prediction = get_cached_prediction(query_id, model_key, db, ml)
+        if prediction is not None:
+            predictions[query_id] = prediction
+        else:
+            plans_per_model.setdefault(model_key, []).append(get_parsed_plan(query_id, db, ml))
+
+    for model_key, parsed_plans in plans_per_model.items():
+        for parsed_plan, prediction in zip(parsed_plans, ml.predict_plans(parsed_plans, model_key)):
+            predictions[parsed_plan.id] = PredictionResponseBase(**prediction.model_dump())
+            store_prediction(predictions[parsed_plan.id], parsed_plan.id, model_key, db, ml)
+
+    return PredictionsResponse(
+        predictions=[
+            QueryPredictionResponse(
+                **predictions[query_id].model_dump(),
+                query_id=query_id,
+                model_id=zs_models[query_id].id if zs_models[query_id] is not None else ml.default_model_id,
+            )
+            for query_id in request.query_ids
+        ],
+        execution_time=time.time() - start,
+    )
+
+
 @router.get("/queries/{query_id}/explanation/{explainer_type}", response_model=ExplanationResponse)
 def get_explanation(
-    parsed_plan: Annotated[ParsedPlan, Depends(get_parsed_plan_for_inference)],
-    explainer: Annotated[BaseExplainer, Depends(get_explainer_for_parsed_plan)],
-    inference_mutex: Annotated[None, Depends(inference_mutex)],
+    query_id: int,
+    explainer_type: ExplainerType,
+    db: db_depends,
+    ml: Annotated[MLHelper, Depends()],
+    model_key: Annotated[str, Depends(get_zero_shot_model_key_for_query)],
 ):
     start = time.time()
-    explanation = explainer.explain(parsed_plan)
+    explanation = explain_query(query_id, explainer_type, model_key, db, ml)
     return ExplanationResponse(
         **explanation.model_dump(),
         execution_time=time.time() - start,
     )
 
 
+@router.get("/general/cache-stats", response_model=CacheStatsResponse)
+def get_cache_stats(request: Request, ml: Annotated[MLHelper, Depends()]):
+    return CacheStatsResponse(plans_cache=ml.plans_cache.stats(), result_cache=ml.result_cache.stats(), http_cache=request.app.state.http_cache.stats())
+
+
 @router.get("/general/features", response_model=list[str])
 def get_features(ml: Annotated[MLHelper, Depends()]):
     features = [to_camel(feature) for feature_list in ml.hyperparameters.node_type_featurization.values() for feature in feature_list]
@@ -9,6 +9,23 @@ class WorkloadRunResponse(CustomModel):
     queries_count: int
 
 
+class RuntimeHistogramResponse(CustomModel):
+    bin_edges: list[float]
+    counts: list[int]
+
+
+class WorkloadRunSummaryResponse(CustomModel):
+    workload_run_id: int
+    queries_count: int
+    runtime_min: float | None
+    runtime_max: float | None
+    runtime_mean: float | None
+    runtime_histogram: RuntimeHistogramResponse
+    joins_histogram: dict[int, int]
+    tables_histogram: dict[int, int]
+    nodes_histogram: dict[int, int]
+
+
 class ParsedPlanStatsResponse(CustomModel):
     tables: int
     columns: int
@@ -32,6 +49,8 @@ class QueriesPageResponse(CustomModel):
     limit: int
     offset: int
     total_count: int
+    next_cursor: str | None = None
+    prev_cursor: str | None = None
 
 
 class GraphNodeResponse(CustomModel):
@@ -42,6 +61,8 @@ class GraphNodeResponse(CustomModel):
 
 class FullQueryResponse(QueryResponse):
     dot_graph: str
+    # Graphviz layout of dot_graph, if rendered on the server
+    svg: str | None = None
     graph_nodes: list[GraphNodeResponse]
 
 
@@ -50,6 +71,8 @@ class DatasetResponse(CustomModel):
     name: str
 
     default_zero_shot_model_id: int | None
+    workloads_count: int
+    queries_count: int
 
 
 class PredictionResponseBase(CustomModel):
@@ -62,6 +85,21 @@ class PredictionResponse(PredictionResponseBase):
     execution_time: float
 
 
+class PredictionsRequest(CustomModel):
+    query_ids: list[int]
+    model_id: int | None = None
+
+
+class QueryPredictionResponse(PredictionResponseBase):
+    query_id: int
+    model_id: int | None
+
+
+class PredictionsResponse(CustomModel):
+    predictions: list[QueryPredictionResponse]
+    execution_time: float
+
+
 class NodeScore(CustomModel):
     node_id: int
     score: float
@@ -74,3 +112,25 @@ class ExplanationResponseBase(CustomModel):
 
 class ExplanationResponse(ExplanationResponseBase):
     execution_time: float
+
+
+class LRUCacheStatsResponse(CustomModel):
+    size: int
+    max_size: int
+    bytes: int
+    max_bytes: int | None
+    hits: int
+    misses: int
+    evictions: int
+
+
+class ResultCacheStatsResponse(CustomModel):
+    memory: LRUCacheStatsResponse
+    db_hits: int
+    db_misses: int
+
+
+class CacheStatsResponse(CustomModel):
+    plans_cache: LRUCacheStatsResponse
+    result_cache: ResultCacheStatsResponse
+    http_cache: LRUCacheStatsResponse
@@ -1,10 +1,195 @@
+import base64
+from enum import StrEnum
+from typing import Any
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import InstrumentedAttribute
+from tqdm import tqdm
+from custom_model import CustomModel
+from ml.dependencies import MLHelper
+from ml.service import ExplainerType
 from query.db import Session
-from query.models import Plan, PlanStats
+from query.artifacts import create_full_query_response, get_plan_artifact, get_plan_artifacts_version, store_plan_artifact
+from query.dependecies import get_parsed_plan, load_parsed_plan
+from query.models import Plan, PlanArtifact, PlanStats, WorkloadRun, WorkloadRunSummary, ZeroShotModelConfig
+from query.result_cache import PREDICTION_RESULT_TYPE
+from query.schemas import ExplanationResponseBase, PredictionResponseBase
+
+
+class OrderByArg(StrEnum):
+    ID = "id"
+    NODES = "nodes"
+    PLANS = "plans"
+    JOINS = "joins"
+    TABLES = "tables"
+    COLUMNS = "columns"
+    PREDICATES = "predicates"
+    RUNTIME = "runtime"
+
+
+order_by_columns: dict[OrderByArg, InstrumentedAttribute] = {
+    OrderByArg.ID: Plan.id_in_run,
+    OrderByArg.RUNTIME: Plan.plan_runtime,
+    OrderByArg.NODES: PlanStats.nodes,
+    OrderByArg.PLANS: PlanStats.plans,
+    OrderByArg.JOINS: PlanStats.joins,
+    OrderByArg.TABLES: PlanStats.tables,
+    OrderByArg.COLUMNS: PlanStats.columns,
+    OrderByArg.PREDICATES: PlanStats.predicates,
+}
+
+
+def get_order_by_columns(order_by: OrderByArg):
+    # Filter, sort and tie-break columns come from the same table, so every sort is served by one index on (workload_run_id, column, id)
+    order_by_column = order_by_columns[order_by]
+    if order_by_column.class_ is PlanStats:
+        return order_by_column, PlanStats.id, PlanStats.workload_run_id
+    return order_by_column, Plan.id, Plan.workload_run_id
+
+
+def get_workload_queries_query(workload_run_id: int, order_by: OrderByArg, ascending: bool, db: Session):
+    order_by_column, tie_break_column, workload_run_id_column = get_order_by_columns(order_by)
+    order_by_clauses = [order_by_column, tie_break_column] if ascending else [order_by_column.desc(), tie_break_column.desc()]
+    return db.query(Plan, PlanStats).join(Plan.plan_stats).filter(workload_run_id_column == workload_run_id, Plan.id_in_run.is_not(None)).order_by(*order_by_clauses)
+
+
+class QueriesCursor(CustomModel):
+    """
+    Position of a row in a listing, the order by value and the id of the tie-break column of the row.
+    Sorts by PlanStats columns tie-break on PlanStats.id instead of Plan.id, so ties of those sorts are listed in plan stats id order
+    and their cursors store a PlanStats id.
+    """
+
+    order_by: OrderByArg
+    ascending: bool
+    backward: bool
+    value: Any
+    id: int
+
+    def encode(self):
+        return base64.urlsafe_b64encode(self.model_dump_json().encode()).decode()
+
+    @staticmethod
+    def decode(cursor: str):
+        return QueriesCursor.model_validate_json(base64.urlsafe_b64decode(cursor.encode()))
+
+
+def get_workload_queries_page(workload_run_id: int, order_by: OrderByArg, ascending: bool, limit: int, offset: int, cursor: QueriesCursor | None, db: Session):
+    """
+    Returns a page of queries and cursors of the next and previous pages.
+    With a cursor, the page starts right after (or, going backward, right before) the cursor row, so deep pages are as fast as the first one.
+    """
+    order_by_column, tie_break_column, _ = get_order_by_columns(order_by)
+    backward = cursor is not None and cursor.backward
+    query = get_workload_queries_query(workload_run_id, order_by, ascending != backward, db)
+    if cursor is None:
+        query = query.offset(offset)
+    elif ascending != backward:
+        query = query.filter(tuple_(order_by_column, tie_break_column) > tuple_(cursor.value, cursor.id))
+    else:
+        query = query.filter(tuple_(order_by_column, tie_break_column) < tuple_(cursor.value, cursor.id))
+    # One additional row shows whether there is a page after this one in reading direction
+    rows: list[tuple[Plan, PlanStats]] = query.limit(limit + 1).tuples().all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if backward:
+        rows.reverse()
+    has_next, has_prev = (True, has_more) if backward else (has_more, cursor is not None or offset > 0)
+
+    def get_cursor(row: tuple[Plan, PlanStats], backward: bool):
+        plan, plan_stats = row
+        value_row, id_row = (plan_stats, plan_stats) if tie_break_column.class_ is PlanStats else (plan, plan)
+        return QueriesCursor(order_by=order_by, ascending=ascending, backward=backward, value=getattr(value_row, order_by_column.key), id=id_row.id).encode()
+
+    next_cursor = get_cursor(rows[-1], False) if has_next and len(rows) > 0 else None
+    prev_cursor = get_cursor(rows[0], True) if has_prev and len(rows) > 0 else None
+    return rows, next_cursor, prev_cursor
 
 
 def get_workload_run_queries_count(workload_run_id: int, db: Session):
-    return db.query(Plan).filter(Plan.workload_run_id == workload_run_id).count()
+    # Read from the summary stored at ingestion on every call, so the count follows re-ingestions and restored databases
+    queries_count = db.scalar(select(WorkloadRunSummary.queries_count).where(WorkloadRunSummary.workload_run_id == workload_run_id))
+    if queries_count is None:
+        queries_count = db.query(Plan).filter(Plan.workload_run_id == workload_run_id).count()
+    return queries_count
 
 
 def get_query_stats(plan_id: int, db: Session):
     return db.query(PlanStats).join(Plan.plan_stats).filter(Plan.id == plan_id).first()
+
+
+def get_zero_shot_models_for_queries(query_ids: list[int], db: Session, model_id: int | None = None):
+    zs_model = db.query(ZeroShotModelConfig).filter(ZeroShotModelConfig.id == model_id).first()
+    if zs_model is not None:
+        return {query_id: zs_model for query_id in query_ids}
+    dataset_ids = dict(db.query(Plan.id, WorkloadRun.dataset_id).join(Plan.workload_run).filter(Plan.id.in_(query_ids)).all())
+    default_models: dict[int, ZeroShotModelConfig] = {}
+    for zs_model in db.query(ZeroShotModelConfig).filter(ZeroShotModelConfig.dataset_id.in_(set(dataset_ids.values()))).order_by(ZeroShotModelConfig.id).all():
+        default_models.setdefault(zs_model.dataset_id, zs_model)
+    return {query_id: default_models.get(dataset_ids.get(query_id)) for query_id in query_ids}
+
+
+def get_missing_query_ids(query_ids: list[int], db: Session):
+    """Ids that are not queries of a workload run, i.e. unknown ids and sub plans"""
+    existing = set(db.scalars(select(Plan.id).where(Plan.id.in_(query_ids), Plan.workload_run_id.is_not(None))))
+    return [query_id for query_id in dict.fromkeys(query_ids) if query_id not in existing]
+
+
+def get_cached_prediction(query_id: int, model_key: str | None, db: Session, ml: MLHelper):
+    model_key = ml.resolve_model_key(model_key)
+    return ml.result_cache.get(db, PredictionResponseBase, query_id, model_key, ml.model_hashes[model_key], PREDICTION_RESULT_TYPE)
+
+
+def store_prediction(prediction: PredictionResponseBase, query_id: int, model_key: str | None, db: Session, ml: MLHelper):
+    model_key = ml.resolve_model_key(model_key)
+    ml.result_cache.store(db, prediction, query_id, model_key, ml.model_hashes[model_key], PREDICTION_RESULT_TYPE)
+
+
+def predict_query(query_id: int, model_key: str | None, db: Session, ml: MLHelper):
+    prediction = get_cached_prediction(query_id, model_key, db, ml)
+    if prediction is None:
+        parsed_plan = get_parsed_plan(query_id, db, ml)
+        prediction = PredictionResponseBase(**ml.predict_plans([parsed_plan], model_key)[0].model_dump())
+        store_prediction(prediction, query_id, model_key, db, ml)
+    return prediction
+
+
+def explain_query(query_id: int, explainer_type: ExplainerType, model_key: str | None, db: Session, ml: MLHelper):
+    def explain():
+        explanation = ml.explain_plan(get_parsed_plan(query_id, db, ml), explainer_type, model_key)
+        return ExplanationResponseBase(**explanation.model_dump())
+
+    model_key = ml.resolve_model_key(model_key)
+    return ml.result_cache.get_or_compute(db, ExplanationResponseBase, query_id, model_key, ml.model_hashes[model_key], explainer_type, explain)
+
+
+def build_plan_store(ml: MLHelper, db: Session):
+    queries = db.query(Plan.id, Plan.workload_run_id).filter(Plan.workload_run_id.is_not(None)).order_by(Plan.id).all()
+    missing_queries = [query for query in queries if not ml.plan_store.contains(query.workload_run_id, query.id)]
+    print(f"Building plan store for {len(missing_queries)} of {len(queries)} queries in {ml.plan_store.directory}")
+    for query in tqdm(missing_queries):
+        ml.prepare_plan_for_inference(load_parsed_plan(query.id, db, ml))
+
+
+def get_query_response(query_id: int, db: Session, ml: MLHelper):
+    """Returns the serialized FullQueryResponse, which is rendered once per plan and version and stored in the plan_artifacts table"""
+    settings = ml.settings.query
+    version = get_plan_artifacts_version(ml.version, settings.plan_artifacts_svg)
+    response = get_plan_artifact(query_id, version, db)
+    if response is None:
+        parsed_plan = get_parsed_plan(query_id, db, ml)
+        response = create_full_query_response(parsed_plan, settings.plan_artifacts_svg_timeout if settings.plan_artifacts_svg else None).model_dump_json(by_alias=True)
+        store_plan_artifact(query_id, version, response, db)
+    return response
+
+
+def build_plan_artifacts(ml: MLHelper, db: Session):
+    settings = ml.settings.query
+    version = get_plan_artifacts_version(ml.version, settings.plan_artifacts_svg)
+    stored_ids = set(db.scalars(select(PlanArtifact.plan_id).where(PlanArtifact.version == version)))
+    missing_ids = [i for i in db.scalars(select(Plan.id).where(Plan.workload_run_id.is_not(None)).order_by(Plan.id)) if i not in stored_ids]
+    print(f"Rendering plan artifacts for {len(missing_ids)} queries")
+    for query_id in tqdm(missing_ids):
+        # Plans are not cached, so rendering all of them does not evict plans of recent requests
+        parsed_plan = load_parsed_plan(query_id, db, ml)
+        response = create_full_query_response(parsed_plan, settings.plan_artifacts_svg_timeout if settings.plan_artifacts_svg else None).model_dump_json(by_alias=True)
+        store_plan_artifact(query_id, version, response, db)
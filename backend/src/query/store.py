@@ -1,18 +1,30 @@
+import multiprocessing
 import os.path
+import pickle
+import re
+import tempfile
 import time
-from typing import Type, TypeVar
+import traceback
+from array import array
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator, NamedTuple, Type, TypeVar
 
 from tqdm import tqdm
 from config import Settings
 from saved_runs_models import SavedDataset, SavedRunsConfig
 from utils import load_model_from_file
-from query.db import get_db
+from query.db import Base, Session, get_db
+from query.loader import encode_plan_snapshot, link_plan_trees, load_plan_trees
+from query.stream import RawPlan, iter_raw_run_plans, iter_workload_run_plans, load_workload_run_header
+from query.summary import store_missing_workload_run_summaries, store_workload_run_summary
+from sqlalchemy import Table, bindparam, insert, text, update
 from sqlalchemy.orm import class_mapper
 from pydantic import BaseModel as PydanticBaseModel
-from query.models import ColumnStats, DatabaseStats, Dataset, OutputColumn, Plan, PlanParameters, PlanStats, TableStats, RunKwargs, LogicalPredicate, FilterColumn, WorkloadRun, ZeroShotModelConfig
+from query.models import ColumnStats, DatabaseStats, Dataset, OutputColumn, OutputColumnColumn, Plan, PlanOutputColumn, PlanParameters, PlanStats, TableStats, RunKwargs, LogicalPredicate, FilterColumn, WorkloadRun, ZeroShotModelConfig
 from zero_shot_learned_db.explanations.data_models.nodes import FilterColumn as PydanticFilterColumn, LogicalPredicate as PydanticLogicalPredicate, NodeType, Plan as PydanticPlan, TableStats as PydanticTableStats
-from zero_shot_learned_db.explanations.data_models.workload_run import WorkloadRun as PydanticWorkloadRun, load_workload_run
-from zero_shot_learned_db.explanations.load import ParsedPlan
+from zero_shot_learned_db.explanations.data_models.workload_run import WorkloadRun as PydanticWorkloadRun
+from zero_shot_learned_db.explanations.load import ParsedPlan, ParsedPlanStats
 
 T = TypeVar("T")
 
@@ -23,15 +35,6 @@ def create_db_model(model_type: Type[T], data: PydanticBaseModel, **kwargs):
     return model_type(**valid_fields, **kwargs)
 
 
-class RawPlan(PydanticBaseModel):
-    analyze_plans: list[list[list[str]]] | None
-    sql: str
-
-
-class RawRun(PydanticBaseModel):
-    query_list: list[RawPlan]
-
-
 class SQLSearchFeatures:
     filter_literals: list[str]
     tables: list[str]
@@ -62,14 +65,111 @@ class SQLSearchFeatures:
         sql = raw_plan.sql.replace('"', "")
         analyze_plans = "".join([i[0] for i in raw_plan.analyze_plans[0]])
 
-        return all([i in sql for i in self.filter_literals]) and all([i in sql for i in self.tables]) and all([i in analyze_plans for i in self.runtimes])
+        return self.check(sql, analyze_plans)
+
+    def check(self, sql: str, analyze_plans: str):
+        return all(i in sql for i in self.filter_literals) and all(i in sql for i in self.tables) and all(i in analyze_plans for i in self.runtimes)
+
+
+number_pattern = re.compile(r"\d+(?:\.\d+)?")
+
+
+def normalize_number(number: str):
+    return str(float(number))
+
+
+class SQLIndex:
+    """
+    Inverted index from numbers in analyze plans (e.g. actual times) to raw plans.
+    A parsed plan is only checked against the raw plans that contain its rarest runtime as a whole number, instead of against all raw plans.
+    Unlike checking all raw plans, a raw plan that contains that runtime only as part of a longer number (e.g. 1.5 in 11.5) is not a candidate,
+    so find_sql returns the first match in raw run order among the candidates. Runtimes that are not a whole number in any analyze plan
+    fall back to checking all raw plans with the substring check.
+    Only hashes of the numbers and positions of the raw plans are kept in memory, their sql and analyze plans are spooled to a temporary file.
+    """
+
+    def __init__(self, raw_plans: Iterable[RawPlan]):
+        self.file = tempfile.TemporaryFile(prefix="zs_sql_index_")
+        self.offsets = array("q")
+        # Most numbers only occur in one raw plan, so single postings are stored as plain ids
+        self.index: dict[int, int | array] = {}
+        for raw_plan in raw_plans:
+            if raw_plan.analyze_plans is None or len(raw_plan.analyze_plans) == 0:
+                continue
+            analyze_plans = "".join([i[0] for i in raw_plan.analyze_plans[0]])
+            for number in set(normalize_number(i) for i in number_pattern.findall(analyze_plans)):
+                key = hash(number)
+                posting = self.index.get(key)
+                if posting is None:
+                    self.index[key] = len(self.offsets)
+                elif isinstance(posting, int):
+                    self.index[key] = array("I", [posting, len(self.offsets)])
+                else:
+                    posting.append(len(self.offsets))
+            self.offsets.append(self.file.tell())
+            pickle.dump((raw_plan.sql, analyze_plans), self.file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.matched = 0
+        self.ambiguous = 0
+        self.unmatched = 0
+        self.full_scans = 0
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def read(self, i: int) -> tuple[str, str]:
+        """Raw sql and joined analyze plans of the i-th raw plan"""
+        self.file.seek(self.offsets[i])
+        return pickle.load(self.file)
+
+    def get_candidates(self, sql_search: SQLSearchFeatures):
+        # Hash collisions only add candidates, which are still checked
+        postings = [self.index.get(hash(normalize_number(runtime))) for runtime in sql_search.runtimes]
+        if len(postings) == 0 or any(i is None for i in postings):
+            self.full_scans += 1
+            return range(len(self))
+        return min(([i] if isinstance(i, int) else i for i in postings), key=len)
 
+    def find_sql(self, sql_search: SQLSearchFeatures):
+        matches = []
+        for i in self.get_candidates(sql_search):
+            raw_sql, analyze_plans = self.read(i)
+            if sql_search.check(raw_sql.replace('"', ""), analyze_plans):
+                matches.append(raw_sql)
+        if len(matches) == 0:
+            self.unmatched += 1
+            return None
+        self.matched += 1
+        if len(matches) > 1:
+            self.ambiguous += 1
+        return matches[0]
 
-def store_all_workload_queries_in_db(settings: Settings):
+    def close(self):
+        self.file.close()
+
+    def stats(self):
+        return f"matched {self.matched} (ambiguous {self.ambiguous}), unmatched {self.unmatched}, full scans {self.full_scans}"
+
+
+class PreparedPlan(NamedTuple):
+    plan: PydanticPlan
+    plan_stats: ParsedPlanStats
+    sql: str | None
+
+
+class WorkloadRunFile(PydanticBaseModel):
+    dataset: SavedDataset
+    run_file_path: str
+    run_file_name: str
+    run_file: str
+    raw_run_file: str
+
+
+def store_all_workload_queries_in_db(settings: Settings, on_progress: Callable[[int, int], None] | None = None):
     runs_config = load_model_from_file(SavedRunsConfig, settings.query.saved_runs_config_file)
     base_runs_dir = os.path.join(settings.ml.base_data_dir, settings.query.datasets_runs_dir)
     base_runs_raw_dir = os.path.join(settings.ml.base_data_dir, settings.query.datasets_runs_raw_dir)
     base_model_dir = os.path.join(settings.ml.base_data_dir, settings.ml.zs_model_dir)
+    run_files: list[WorkloadRunFile] = []
     for saved_dataset in runs_config.datasets:
         for run_file_path, run_file_name in zip(saved_dataset.runs, saved_dataset.runs_names):
             with next(get_db()) as db:
@@ -82,11 +182,16 @@ def store_all_workload_queries_in_db(settings: Settings):
                 print(f"Workload not found: {run_file}")
                 continue
             raw_run_file = os.path.join(base_runs_raw_dir, saved_dataset.directory, run_file_path)
-            print(f"Store Started {saved_dataset.name} for workload {run_file_name} at {run_file} and {raw_run_file}")
-            start_time = time.time()
-            store_workload_queries_in_db(load_workload_run(run_file), saved_dataset, run_file_path, run_file_name, load_model_from_file(RawRun, raw_run_file))
-            store_time = time.time() - start_time
-            print("Store Finished", saved_dataset.name, run_file_name, "in", "{0:.2f}".format(store_time) + "s")
+            run_files.append(WorkloadRunFile(dataset=saved_dataset, run_file_path=run_file_path, run_file_name=run_file_name, run_file=run_file, raw_run_file=raw_run_file))
+
+    failed_runs: list[str] = []
+    if len(run_files) > 0:
+        failed_runs = store_workload_run_files(settings, run_files, on_progress)
+
+    with next(get_db()) as db:
+        backfilled_count = store_missing_workload_run_summaries(db)
+        if backfilled_count > 0:
+            print(f"Stored summaries of {backfilled_count} workload runs")
 
     with next(get_db()) as db:
         for zs_model in runs_config.zs_models:
@@ -103,83 +208,302 @@ def store_all_workload_queries_in_db(settings: Settings):
             db.add(zs_model_db)
         db.commit()
 
+    # Raised after the other runs are stored, so the ingestion stage fails instead of missing the runs silently
+    if len(failed_runs) > 0:
+        raise Exception(f"Workload runs couldn't be stored: {', '.join(failed_runs)}")
 
-def store_workload_queries_in_db(json_workload_run: PydanticWorkloadRun, saved_dataset: SavedDataset, run_file_path: str, run_file_name: str, raw_run: RawRun):
+
+def store_workload_run_files(settings: Settings, run_files: list[WorkloadRunFile], on_progress: Callable[[int, int], None] | None = None) -> list[str]:
+    """Stores the runs and returns the files of the runs that failed, a failed run doesn't stop the other runs"""
+    # Datasets are shared by runs, so they are created before runs are stored concurrently
     with next(get_db()) as db:
-        dataset = db.query(Dataset).filter(Dataset.directory == saved_dataset.directory).first()
-    if dataset is None:
-        dataset = Dataset(name=saved_dataset.name, directory=saved_dataset.directory)
-    db_workload_run = create_db_model(WorkloadRun, json_workload_run, file_name=run_file_name, file_path=run_file_path)
-    db_workload_run.dataset = dataset
-    run_kwargs = create_db_model(RunKwargs, json_workload_run.run_kwargs)
-    db_workload_run.run_kwargs = run_kwargs
-
-    db_stats = DatabaseStats()
-    if json_workload_run.database_stats.run_kwargs is None or json_workload_run.database_stats.run_kwargs.hardware != run_kwargs.hardware:
-        raise Exception("Unexpected value")
-    db_stats.run_kwargs = run_kwargs
-    for i, stat in enumerate(json_workload_run.database_stats.table_stats):
-        db_stats.table_stats.append(create_db_model(TableStats, stat, id_in_run=i))
-    for i, stat in enumerate(json_workload_run.database_stats.column_stats):
-        db_stats.column_stats.append(create_db_model(ColumnStats, stat, id_in_run=i, table=next(filter(lambda t: t.relname == stat.tablename, db_stats.table_stats))))
-    db_workload_run.database_stats = db_stats
-
-    raw_plans = [] if raw_run is None else [raw_plan for raw_plan in raw_run.query_list if raw_plan.analyze_plans is not None and len(raw_plan.analyze_plans) > 0]
-    for i, plan in enumerate(tqdm(json_workload_run.parsed_plans)):
-        db_plan = create_plan_db_model(plan, db_stats)
-
-        db_plan.id_in_run = i
-        parsed_plan = ParsedPlan(plan, json_workload_run.database_stats)
-        db_plan.plan_stats = create_db_model(PlanStats, parsed_plan.graph_nodes_stats)
-
-        sql_search = SQLSearchFeatures(parsed_plan)
-        sql = next((i.sql for i in raw_plans if sql_search.check_sql(i)), None)
-        if sql is None:
-            print(f"Sql query is not available for plan {i} in {saved_dataset.name} in {run_file_name}")
-
-        db_plan.sql = sql
-        db_workload_run.parsed_plans.append(db_plan)
+        for saved_dataset in {run_file.dataset.directory: run_file.dataset for run_file in run_files}.values():
+            if db.query(Dataset).filter(Dataset.directory == saved_dataset.directory).first() is None:
+                db.add(Dataset(name=saved_dataset.name, directory=saved_dataset.directory))
+        db.commit()
+
+    workers = min(settings.query.ingestion_workers or os.cpu_count() or 1, len(run_files))
+    print(f"Storing {len(run_files)} workload runs with {workers} workers")
+    start_time = time.time()
+    total_plans_count = 0
+    failed_runs: list[str] = []
+    if workers <= 1:
+        for finished, run_file in enumerate(run_files, start=1):
+            try:
+                total_plans_count += store_workload_run_file(run_file, settings.query.ingestion_chunk_size, True)
+            except Exception:
+                traceback.print_exc()
+                failed_runs.append(run_file.run_file)
+            if on_progress is not None:
+                on_progress(finished, len(run_files))
+    else:
+        # Workers parse runs and match their sql queries, which is most of the work. Runs are written by this process in the order of run_files,
+        # so ids of runs and plans don't depend on which worker finishes first
+        with tempfile.TemporaryDirectory(prefix="zs_ingestion_") as spool_dir, ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            futures = [executor.submit(spool_workload_run_file, run_file, os.path.join(spool_dir, f"{i}.pkl")) for i, run_file in enumerate(run_files)]
+            for finished, (run_file, future) in enumerate(zip(run_files, futures), start=1):
+                try:
+                    json_workload_run, spool_file = future.result()
+                    total_plans_count += store_workload_queries_in_db(json_workload_run, run_file.dataset, run_file.run_file_path, run_file.run_file_name, iter_spooled_plans(spool_file), settings.query.ingestion_chunk_size)
+                    os.remove(spool_file)
+                except Exception:
+                    traceback.print_exc()
+                    failed_runs.append(run_file.run_file)
+                print(f"Stored {finished}/{len(run_files)} workload runs")
+                if on_progress is not None:
+                    on_progress(finished, len(run_files))
+    store_time = time.time() - start_time
+    print("Store of all workload runs finished in", "{0:.2f}".format(store_time) + "s", f"({total_plans_count} plans, {total_plans_count / max(store_time, 1e-9):.1f} plans/s)")
+    return failed_runs
+
 
+def store_workload_run_file(run_file: WorkloadRunFile, chunk_size: int, show_progress: bool):
+    print(f"Store Started {run_file.dataset.name} for workload {run_file.run_file_name} at {run_file.run_file} and {run_file.raw_run_file}")
+    start_time = time.time()
+    json_workload_run = load_workload_run_header(run_file.run_file)
+    prepared_plans = prepare_workload_run_plans(json_workload_run, iter_workload_run_plans(run_file.run_file), iter_raw_run_plans(run_file.raw_run_file), f"{run_file.dataset.name} in {run_file.run_file_name}", show_progress)
+    plans_count = store_workload_queries_in_db(json_workload_run, run_file.dataset, run_file.run_file_path, run_file.run_file_name, prepared_plans, chunk_size)
+    store_time = time.time() - start_time
+    print("Store Finished", run_file.dataset.name, run_file.run_file_name, "in", "{0:.2f}".format(store_time) + "s", f"({plans_count} plans, {plans_count / max(store_time, 1e-9):.1f} plans/s)")
+    return plans_count
+
+
+def spool_workload_run_file(run_file: WorkloadRunFile, spool_file: str):
+    """Prepares the plans of a run in a worker process and writes them to spool_file, so the run can be stored without keeping it in memory"""
+    print(f"Prepare Started {run_file.dataset.name} for workload {run_file.run_file_name} at {run_file.run_file} and {run_file.raw_run_file}")
+    json_workload_run = load_workload_run_header(run_file.run_file)
+    prepared_plans = prepare_workload_run_plans(json_workload_run, iter_workload_run_plans(run_file.run_file), iter_raw_run_plans(run_file.raw_run_file), f"{run_file.dataset.name} in {run_file.run_file_name}", False)
+    with open(spool_file, "wb") as file:
+        for prepared_plan in prepared_plans:
+            pickle.dump(prepared_plan, file, protocol=pickle.HIGHEST_PROTOCOL)
+    return json_workload_run, spool_file
+
+
+def iter_spooled_plans(spool_file: str) -> Iterator[PreparedPlan]:
+    with open(spool_file, "rb") as file:
+        while True:
+            try:
+                yield pickle.load(file)
+            except EOFError:
+                return
+
+
+def prepare_workload_run_plans(json_workload_run: PydanticWorkloadRun, json_plans: Iterable[PydanticPlan], raw_plans: Iterable[RawPlan], run_name: str, show_progress: bool = True) -> Iterator[PreparedPlan]:
+    """Computes the stats of every plan and matches it with its sql query, in the order of the plans"""
+    sql_index = SQLIndex(raw_plans)
+    try:
+        for i, plan in enumerate(tqdm(json_plans, disable=not show_progress)):
+            parsed_plan = ParsedPlan(plan, json_workload_run.database_stats)
+
+            sql = sql_index.find_sql(SQLSearchFeatures(parsed_plan))
+            if sql is None:
+                print(f"Sql query is not available for plan {i} in {run_name}")
+
+            yield PreparedPlan(plan, parsed_plan.graph_nodes_stats, sql)
+        print(f"Sql queries for {run_name}: {sql_index.stats()}")
+    finally:
+        sql_index.close()
+
+
+def store_workload_queries_in_db(json_workload_run: PydanticWorkloadRun, saved_dataset: SavedDataset, run_file_path: str, run_file_name: str, prepared_plans: Iterable[PreparedPlan], chunk_size: int):
     with next(get_db()) as db:
+        dataset = db.query(Dataset).filter(Dataset.directory == saved_dataset.directory).first()
+        if dataset is None:
+            dataset = Dataset(name=saved_dataset.name, directory=saved_dataset.directory)
+        db_workload_run = create_db_model(WorkloadRun, json_workload_run, file_name=run_file_name, file_path=run_file_path)
+        db_workload_run.dataset = dataset
+        run_kwargs = create_db_model(RunKwargs, json_workload_run.run_kwargs)
+        db_workload_run.run_kwargs = run_kwargs
+
+        db_stats = DatabaseStats()
+        if json_workload_run.database_stats.run_kwargs is None or json_workload_run.database_stats.run_kwargs.hardware != run_kwargs.hardware:
+            raise Exception("Unexpected value")
+        db_stats.run_kwargs = run_kwargs
+        for i, stat in enumerate(json_workload_run.database_stats.table_stats):
+            db_stats.table_stats.append(create_db_model(TableStats, stat, id_in_run=i))
+        for i, stat in enumerate(json_workload_run.database_stats.column_stats):
+            db_stats.column_stats.append(create_db_model(ColumnStats, stat, id_in_run=i, table=next(filter(lambda t: t.relname == stat.tablename, db_stats.table_stats))))
+        db_workload_run.database_stats = db_stats
         db.add(db_workload_run)
+        db.flush()
+
+        writer = BulkPlanWriter(db, db_workload_run.id, [c.id for c in db_stats.column_stats], chunk_size)
+        for i, prepared_plan in enumerate(prepared_plans):
+            writer.add_plan(prepared_plan.plan, i, prepared_plan.plan_stats, prepared_plan.sql)
+        writer.flush()
+        store_workload_run_summary(db_workload_run.id, db)
+        # The whole workload run is stored in one transaction, so a failed ingestion leaves no partial run behind
         db.commit()
+    return writer.plans_count
 
 
-def create_plan_db_model(json_plan: PydanticPlan, db_stats: DatabaseStats, top_plan: Plan | None = None):
-    plan = create_db_model(Plan, json_plan)
-    if top_plan is None:
-        top_plan = plan
-    else:
-        plan.top_plan = top_plan
-    plan.plan_parameters = create_db_model(PlanParameters, json_plan.plan_parameters)
-    for json_output_column in json_plan.plan_parameters.output_columns:
-        output_column = create_db_model(OutputColumn, json_output_column)
-        output_column.top_plan = top_plan
-        plan.plan_parameters.output_columns.append(output_column)
-        for json_column in json_output_column.columns:
-            output_column.columns.append(db_stats.column_stats[json_column])
-    if json_plan.plan_parameters.filter_columns is not None:
-        plan.plan_parameters.filter_columns = create_logical_node(json_plan.plan_parameters.filter_columns, db_stats, top_plan)
-    for json_child_plan in json_plan.children:
-        plan.children.append(create_plan_db_model(json_child_plan, db_stats, top_plan))
-    return plan
-
-
-def create_logical_node(json_node: PydanticLogicalPredicate | PydanticFilterColumn, db_stats: DatabaseStats, top_plan: Plan):
-    if json_node.node_type == NodeType.LOGICAL_PRED:
-        logical_predicate = create_db_model(LogicalPredicate, json_node)
-        logical_predicate.top_plan = top_plan
-        for child in json_node.children:
-            logical_predicate.children.append(create_logical_node(child, db_stats, top_plan))
-        return logical_predicate
-    elif json_node.node_type == NodeType.FILTER_COLUMN:
-        filter_column = create_db_model(FilterColumn, json_node)
-        filter_column.top_plan = top_plan
-        filter_column.column_stats = db_stats.column_stats[json_node.column]
-        literal = str(json_node.literal)
-        if literal.endswith(".0"):
-            literal = literal[:-2]
-        filter_column.literal = literal
-        return filter_column
-    else:
-        raise Exception("Node should be either LogicalPredicate or FilterColumn")
+class IdAllocator:
+    """Reserves primary keys from the sequence of a table in blocks, so rows can reference each other before they are inserted"""
+
+    def __init__(self, db: Session, table: Table, block_size: int):
+        self.db = db
+        self.table = table
+        self.block_size = block_size
+        self._ids: deque[int] = deque()
+
+    def __call__(self) -> int:
+        if len(self._ids) == 0:
+            ids = self.db.execute(
+                text("SELECT nextval(pg_get_serial_sequence(:table, 'id')) FROM generate_series(1, :count)"),
+                {"table": self.table.name, "count": self.block_size},
+            )
+            self._ids.extend(i[0] for i in ids)
+        return self._ids.popleft()
+
+
+_column_keys: dict[type, list[str]] = {}
+_logical_predicate_keys = class_mapper(LogicalPredicate).column_attrs.keys()
+
+
+def get_row(model_type: type[Base], data: PydanticBaseModel, **kwargs):
+    """Same fields as create_db_model, but as a plain row for Core inserts and without dumping nested models"""
+    if model_type not in _column_keys:
+        _column_keys[model_type] = class_mapper(model_type).column_attrs.keys()
+    row = {}
+    for key in _column_keys[model_type]:
+        value = getattr(data, key, None)
+        row[key] = None if isinstance(value, (list, dict, PydanticBaseModel)) else value
+    row.update(kwargs)
+    return row
+
+
+class BulkPlanWriter:
+    """
+    Writes plans of a workload run with executemany Core inserts instead of building an ORM object graph.
+    Ids are assigned up front, rows are buffered per table and inserted in dependency order every chunk_size plans.
+    """
+
+    def __init__(self, db: Session, workload_run_id: int, column_ids: list[int], chunk_size: int):
+        self.db = db
+        self.workload_run_id = workload_run_id
+        self.column_ids = column_ids
+        # Only what to_pydantic of plans needs, snapshots are built from the buffered rows without loading columns
+        self.columns = {column_id: ColumnStats(id=column_id, id_in_run=i) for i, column_id in enumerate(column_ids)}
+        self.chunk_size = chunk_size
+        self.plans_count = 0
+        self.plan_id = IdAllocator(db, Plan.__table__, chunk_size * 16)
+        self.plan_parameters_id = IdAllocator(db, PlanParameters.__table__, chunk_size * 16)
+        self.plan_stats_id = IdAllocator(db, PlanStats.__table__, chunk_size)
+        self.logical_node_id = IdAllocator(db, LogicalPredicate.__table__, chunk_size * 16)
+        self.output_column_id = IdAllocator(db, OutputColumn.__table__, chunk_size * 16)
+        self._clear()
+
+    def _clear(self):
+        self.plan_stats: list[dict] = []
+        self.plan_parameters: list[dict] = []
+        self.plans: list[dict] = []
+        self.logical_nodes: list[dict] = []
+        self.plan_parameters_logical_nodes: list[dict] = []
+        self.output_columns: list[dict] = []
+        self.plan_output_columns: list[dict] = []
+        self.output_columns_columns: list[dict] = []
+        self.top_plan_ids: list[int] = []
+
+    def add_plan(self, json_plan: PydanticPlan, id_in_run: int, plan_stats: ParsedPlanStats, sql: str | None):
+        plan_stats_id = self.plan_stats_id()
+        self.plan_stats.append(get_row(PlanStats, plan_stats, id=plan_stats_id, workload_run_id=self.workload_run_id))
+        self.top_plan_ids.append(self._add_plan_node(json_plan, None, None, id_in_run=id_in_run, workload_run_id=self.workload_run_id, plan_stats_id=plan_stats_id, sql=sql))
+        self.plans_count += 1
+        if self.plans_count % self.chunk_size == 0:
+            self.flush()
+
+    def _add_plan_node(self, json_plan: PydanticPlan, top_plan_id: int | None, parent_id: int | None, **kwargs):
+        plan_id = self.plan_id()
+        plan_parameters_id = self.plan_parameters_id()
+        # Like in the ORM model, the root plan has no top plan and only the root plan belongs to the workload run
+        nodes_top_plan_id = top_plan_id if top_plan_id is not None else plan_id
+        self.plan_parameters.append(get_row(PlanParameters, json_plan.plan_parameters, id=plan_parameters_id, logical_node_id=None))
+        self.plans.append(
+            get_row(
+                Plan,
+                json_plan,
+                **{"id_in_run": None, "workload_run_id": None, "plan_stats_id": None, "sql": None, "plan_snapshot": None, **kwargs},
+                id=plan_id,
+                plan_parameters_id=plan_parameters_id,
+                parent_id=parent_id,
+                top_plan_id=top_plan_id,
+            )
+        )
+        for json_output_column in json_plan.plan_parameters.output_columns:
+            output_column_id = self.output_column_id()
+            self.output_columns.append(get_row(OutputColumn, json_output_column, id=output_column_id, top_plan_id=nodes_top_plan_id))
+            self.plan_output_columns.append({"plan_parameters_id": plan_parameters_id, "output_column_id": output_column_id})
+            for json_column in json_output_column.columns:
+                self.output_columns_columns.append({"column_id": self.column_ids[json_column], "output_column_id": output_column_id})
+        if json_plan.plan_parameters.filter_columns is not None:
+            logical_node_id = self._add_logical_node(json_plan.plan_parameters.filter_columns, nodes_top_plan_id, None)
+            self.plan_parameters_logical_nodes.append({"b_id": plan_parameters_id, "b_logical_node_id": logical_node_id})
+        for json_child_plan in json_plan.children:
+            self._add_plan_node(json_child_plan, nodes_top_plan_id, plan_id)
+        return plan_id
+
+    def _add_logical_node(self, json_node: PydanticLogicalPredicate | PydanticFilterColumn, top_plan_id: int, parent_id: int | None):
+        logical_node_id = self.logical_node_id()
+        if json_node.node_type == NodeType.LOGICAL_PRED:
+            self.logical_nodes.append(get_row(FilterColumn, json_node, id=logical_node_id, type="logical_predicate", parent_id=parent_id, top_plan_id=top_plan_id, column_id=None, column=None, literal=None, literal_feature=None))
+            for child in json_node.children:
+                self._add_logical_node(child, top_plan_id, logical_node_id)
+        elif json_node.node_type == NodeType.FILTER_COLUMN:
+            literal = str(json_node.literal)
+            if literal.endswith(".0"):
+                literal = literal[:-2]
+            self.logical_nodes.append(get_row(FilterColumn, json_node, id=logical_node_id, type="filter_column", parent_id=parent_id, top_plan_id=top_plan_id, column_id=self.column_ids[json_node.column], literal=literal))
+        else:
+            raise Exception("Node should be either LogicalPredicate or FilterColumn")
+        return logical_node_id
+
+    def get_plan_snapshots(self):
+        """Snapshots of the buffered top-level plans, built from their rows like load_plan_trees builds them from the stored rows"""
+        plans = [Plan(**row) for row in self.plans]
+        logical_node_ids = {row["b_id"]: row["b_logical_node_id"] for row in self.plan_parameters_logical_nodes}
+        plan_parameters = {row["id"]: PlanParameters(**{**row, "logical_node_id": logical_node_ids.get(row["id"])}) for row in self.plan_parameters}
+        output_columns_by_id = {row["id"]: OutputColumn(**row) for row in self.output_columns}
+        output_columns: dict[int, list[OutputColumn]] = defaultdict(list)
+        for row in self.plan_output_columns:
+            output_columns[row["plan_parameters_id"]].append(output_columns_by_id[row["output_column_id"]])
+        columns: dict[int, list[ColumnStats]] = defaultdict(list)
+        for row in self.output_columns_columns:
+            columns[row["output_column_id"]].append(self.columns[row["column_id"]])
+        logical_nodes = [FilterColumn(**row) if row["type"] == "filter_column" else LogicalPredicate(**{key: row[key] for key in _logical_predicate_keys}) for row in self.logical_nodes]
+        link_plan_trees(plans, plan_parameters, output_columns, columns, logical_nodes)
+        top_plan_ids = set(self.top_plan_ids)
+        return {plan.id: encode_plan_snapshot(plan.to_pydantic()) for plan in plans if plan.id in top_plan_ids}
+
+    def flush(self):
+        if len(self.top_plan_ids) > 0:
+            snapshots = self.get_plan_snapshots()
+            for row in self.plans:
+                row["plan_snapshot"] = snapshots.get(row["id"])
+        # plan_parameters -> logical_nodes -> plans -> plan_parameters is a cycle, so logical nodes are linked after both are inserted
+        for table, rows in [
+            (PlanStats.__table__, self.plan_stats),
+            (PlanParameters.__table__, self.plan_parameters),
+            (Plan.__table__, self.plans),
+            (LogicalPredicate.__table__, self.logical_nodes),
+            (OutputColumn.__table__, self.output_columns),
+            (PlanOutputColumn.__table__, self.plan_output_columns),
+            (OutputColumnColumn.__table__, self.output_columns_columns),
+        ]:
+            if len(rows) > 0:
+                self.db.execute(insert(table), rows)
+        if len(self.plan_parameters_logical_nodes) > 0:
+            self.db.execute(
+                update(PlanParameters.__table__).where(PlanParameters.__table__.c.id == bindparam("b_id")).values(logical_node_id=bindparam("b_logical_node_id")),
+                self.plan_parameters_logical_nodes,
+            )
+        self._clear()
+
+
+def store_plan_snapshots(plan_ids: list[int], db: Session):
+    """Stores snapshots of plans that were ingested without them, built from the stored rows"""
+    plans = load_plan_trees(plan_ids, db)
+    db.execute(
+        update(Plan.__table__).where(Plan.__table__.c.id == bindparam("b_id")).values(plan_snapshot=bindparam("b_plan_snapshot")),
+        [{"b_id": plan_id, "b_plan_snapshot": encode_plan_snapshot(plan.to_pydantic())} for plan_id, plan in plans.items()],
+    )
+    db.expunge_all()
@@ -0,0 +1,52 @@
+import os.path
+from typing import Any, Iterator
+
+import ijson
+from pydantic import BaseModel
+
+from zero_shot_learned_db.explanations.data_models.nodes import Plan as PydanticPlan
+from zero_shot_learned_db.explanations.data_models.workload_run import WorkloadRun as PydanticWorkloadRun
+
+
+class RawPlan(BaseModel):
+    analyze_plans: list[list[list[str]]] | None
+    sql: str
+
+
+def load_json_header(file_name: str, skipped_key: str) -> dict[str, Any]:
+    """Loads all top-level values of a JSON object except skipped_key, whose events are parsed but never materialized"""
+    header: dict[str, Any] = {}
+    key: str | None = None
+    builder: ijson.ObjectBuilder | None = None
+    with open(file_name, mode="rb") as file:
+        for prefix, event, value in ijson.parse(file, use_float=True):
+            if prefix == "":
+                if builder is not None:
+                    header[key] = builder.value
+                    builder = None
+                if event == "map_key":
+                    key = value
+                    if key != skipped_key:
+                        builder = ijson.ObjectBuilder()
+            elif builder is not None:
+                builder.event(event, value)
+    return header
+
+
+def load_workload_run_header(file_name: str):
+    """Workload run with empty parsed_plans, the plans are read with iter_workload_run_plans"""
+    return PydanticWorkloadRun.model_validate({**load_json_header(file_name, "parsed_plans"), "parsed_plans": []})
+
+
+def iter_workload_run_plans(file_name: str) -> Iterator[PydanticPlan]:
+    with open(file_name, mode="rb") as file:
+        for plan in ijson.items(file, "parsed_plans.item", use_float=True):
+            yield PydanticPlan.model_validate(plan)
+
+
+def iter_raw_run_plans(file_name: str) -> Iterator[RawPlan]:
+    if not os.path.isfile(file_name):
+        return
+    with open(file_name, mode="rb") as file:
+        for raw_plan in ijson.items(file, "query_list.item", use_float=True):
+            yield RawPlan.model_validate(raw_plan)
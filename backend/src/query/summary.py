@@ -0,0 +1,56 @@
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from query.db import Session
+from query.models import Plan, PlanStats, WorkloadRun, WorkloadRunSummary
+
+RUNTIME_HISTOGRAM_BINS = 20
+
+
+def get_runtime_histogram(runtimes: list[float], bins: int = RUNTIME_HISTOGRAM_BINS):
+    if len(runtimes) == 0:
+        return {"bin_edges": [], "counts": []}
+    low, high = min(runtimes), max(runtimes)
+    if low == high:
+        return {"bin_edges": [low, high], "counts": [len(runtimes)]}
+    width = (high - low) / bins
+    counts = [0] * bins
+    for runtime in runtimes:
+        # The maximum belongs to the last bin
+        counts[min(int((runtime - low) / width), bins - 1)] += 1
+    return {"bin_edges": [low + i * width for i in range(bins)] + [high], "counts": counts}
+
+
+def compute_workload_run_summary(workload_run_id: int, db: Session):
+    """Computes the column values of the summary of a workload run from its stored plans without storing them"""
+    runtimes = list(db.scalars(select(Plan.plan_runtime).where(Plan.workload_run_id == workload_run_id)))
+    histograms: dict[str, dict[str, int]] = {}
+    for column in [PlanStats.joins, PlanStats.tables, PlanStats.nodes]:
+        rows = db.execute(select(column, func.count()).where(PlanStats.workload_run_id == workload_run_id).group_by(column).order_by(column)).all()
+        histograms[f"{column.key}_histogram"] = {str(value): count for value, count in rows}
+
+    return dict(
+        workload_run_id=workload_run_id,
+        queries_count=len(runtimes),
+        runtime_min=min(runtimes) if len(runtimes) > 0 else None,
+        runtime_max=max(runtimes) if len(runtimes) > 0 else None,
+        runtime_mean=sum(runtimes) / len(runtimes) if len(runtimes) > 0 else None,
+        runtime_histogram=get_runtime_histogram(runtimes),
+        **histograms,
+    )
+
+
+def store_workload_run_summary(workload_run_id: int, db: Session):
+    """Computes the summary of a workload run from its stored plans and inserts (or replaces) it, the caller commits"""
+    values = compute_workload_run_summary(workload_run_id, db)
+    statement = pg_insert(WorkloadRunSummary).values(values)
+    db.execute(statement.on_conflict_do_update(index_elements=[WorkloadRunSummary.workload_run_id], set_={k: statement.excluded[k] for k in values if k != "workload_run_id"}))
+
+
+def store_missing_workload_run_summaries(db: Session):
+    """Backfills summaries of workload runs stored before summaries existed"""
+    missing_ids = db.scalars(select(WorkloadRun.id).outerjoin(WorkloadRunSummary, WorkloadRunSummary.workload_run_id == WorkloadRun.id).where(WorkloadRunSummary.workload_run_id.is_(None)).order_by(WorkloadRun.id)).all()
+    for workload_run_id in missing_ids:
+        store_workload_run_summary(workload_run_id, db)
+    db.commit()
+    return len(missing_ids)
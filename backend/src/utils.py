@@ -1,3 +1,4 @@
+import hashlib
 import os.path
 from typing import TypeVar
 from pydantic import BaseModel
@@ -16,3 +17,11 @@ T = TypeVar("T", bound=BaseModel)
 def load_model_from_file(model: type[T], file_name: str):
     if os.path.isfile(file_name):
         return model.model_validate_json(load_json_str(file_name))
+
+
+def get_file_hash(file_name: str):
+    file_hash = hashlib.sha256()
+    with open(file_name, mode="rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
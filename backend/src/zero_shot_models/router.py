@@ -5,7 +5,7 @@ from ml.dependencies import MLHelper
 from query.db import db_depends
 from query.models import ZeroShotModelConfig
 import shutil
-from zero_shot_models.schemas import ZeroShotModelResponse, ZeroShotModelsResponse
+from zero_shot_models.schemas import ModelLoadStatsResponse, ZeroShotModelResponse, ZeroShotModelsResponse
 import os.path
 from pathlib import Path
 
@@ -19,6 +19,11 @@ def get_all_zero_shot_models(db: db_depends, ml: Annotated[MLHelper, Depends()])
         default_model_id=ml.default_model_id,
     )
 
+
+@router.get("/load-stats", response_model=list[ModelLoadStatsResponse])
+def get_zero_shot_models_load_stats(ml: Annotated[MLHelper, Depends()]):
+    return ml.registry.stats()
+
 """
 @router.post("", response_model=ZeroShotModelResponse)
 def add_zero_shot_model(
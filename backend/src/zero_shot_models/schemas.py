@@ -10,3 +10,14 @@ class ZeroShotModelResponse(CustomModel):
 class ZeroShotModelsResponse(CustomModel):
     zero_shot_models: list[ZeroShotModelResponse]
     default_model_id: int
+
+
+class ModelLoadStatsResponse(CustomModel):
+    model_key: str
+    resident: bool
+    loading: bool
+    loads: int
+    last_load_time: float | None
+    total_load_time: float
+    failures: int
+    last_error: str | None
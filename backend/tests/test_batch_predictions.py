@@ -0,0 +1,150 @@
+from types import SimpleNamespace
+
+import dgl
+import pytest
+import torch
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import query.router
+from config import get_settings
+from ml.batching import predict_batched
+from ml.dependencies import MLHelper
+from query.db import get_db
+from query.schemas import PredictionResponseBase
+
+
+class SumModel(torch.nn.Module):
+    def __init__(self, per_graph: bool = True):
+        super().__init__()
+        self.linear = torch.nn.Linear(3, 1)
+        self.per_graph = per_graph
+        self.calls = 0
+
+    def forward(self, graph: dgl.DGLGraph, features: dict[str, torch.Tensor]):
+        self.calls += 1
+        graph.ndata["h"] = features["node"]
+        if self.per_graph:
+            return self.linear(dgl.sum_nodes(graph, "h"))
+        # Mixes all plans of a batch, so batched predictions differ
+        return self.linear(graph.ndata["h"].sum(dim=0, keepdim=True))
+
+
+class SumExplainer:
+    def __init__(self, model: SumModel):
+        self.model = model
+
+    def predict(self, plan):
+        return float(self.model(plan.graph, {"node": plan.features}).squeeze()) * 2 + plan.offset
+
+
+def create_plan(nodes: int, offset: float = 0.0):
+    graph = dgl.graph((list(range(nodes - 1)), list(range(1, nodes))), num_nodes=nodes)
+    return SimpleNamespace(graph=graph, features=torch.rand(nodes, 3), offset=offset)
+
+
+@pytest.mark.parametrize("max_nodes", [1, 7, 1000])
+def test_predict_batched_equals_single_predictions(max_nodes: int):
+    torch.manual_seed(0)
+    model = SumModel()
+    explainer = SumExplainer(model)
+    plans = [create_plan(nodes, offset) for nodes, offset in [(3, 0.0), (5, 1.0), (1, 2.0), (4, 3.0)]]
+    expected = [explainer.predict(plan) for plan in plans]
+
+    model.calls = 0
+    with torch.no_grad():
+        predictions = predict_batched(explainer, model, plans, max_nodes)
+
+    assert predictions == pytest.approx(expected, rel=1e-5)
+    if max_nodes == 1000:
+        # One batched forward pass plus the single passes verifying the chains and the single node without edges
+        assert model.calls == 3
+    assert "forward" not in model.__dict__
+
+
+def test_predict_batched_falls_back_to_single_predictions():
+    torch.manual_seed(0)
+    model = SumModel(per_graph=False)
+    explainer = SumExplainer(model)
+    plans = [create_plan(nodes) for nodes in [3, 5, 4]]
+    expected = [explainer.predict(plan) for plan in plans]
+
+    with torch.no_grad():
+        assert predict_batched(explainer, model, plans, 1000) == pytest.approx(expected, rel=1e-5)
+        model.calls = 0
+        # Models that can't be batched are not tried again
+        assert predict_batched(explainer, model, plans, 1000) == pytest.approx(expected, rel=1e-5)
+    assert model.calls == len(plans)
+
+
+def test_predict_batched_verifies_new_shapes():
+    torch.manual_seed(0)
+    model = SumModel()
+    explainer = SumExplainer(model)
+    plans = [create_plan(nodes) for nodes in [3, 5, 1]]
+    chains = plans[:2]
+    expected = [explainer.predict(plan) for plan in plans]
+
+    with torch.no_grad():
+        predict_batched(explainer, model, chains, 1000)
+        model.calls = 0
+        # Chains are verified, the single node without edges is a new shape
+        predictions = predict_batched(explainer, model, plans, 1000)
+        assert model.calls == 2
+        model.calls = 0
+        predict_batched(explainer, model, chains, 1000)
+        assert model.calls == 1
+        predict_batched(explainer, model, chains[:1], 1000)
+        assert model.calls == 2
+    assert predictions == pytest.approx(expected, rel=1e-5)
+
+
+class FakeML:
+    default_model_id = 1
+
+    def __init__(self):
+        self.batches: list[list[int]] = []
+
+    def predict_plans(self, parsed_plans, model_key=None):
+        self.batches.append([parsed_plan.id for parsed_plan in parsed_plans])
+        return [PredictionResponseBase(prediction=parsed_plan.id * 10, label=1, qerror=1) for parsed_plan in parsed_plans]
+
+
+@pytest.fixture
+def client(monkeypatch: pytest.MonkeyPatch):
+    existing_query_ids = {1, 2, 3}
+    monkeypatch.setattr(query.router, "get_missing_query_ids", lambda query_ids, db: [query_id for query_id in query_ids if query_id not in existing_query_ids])
+    monkeypatch.setattr(query.router, "get_zero_shot_models_for_queries", lambda query_ids, db, model_id=None: {query_id: None for query_id in query_ids})
+    monkeypatch.setattr(query.router, "get_cached_prediction", lambda query_id, model_key, db, ml: None)
+    monkeypatch.setattr(query.router, "get_parsed_plan", lambda query_id, db, ml: SimpleNamespace(id=query_id))
+    monkeypatch.setattr(query.router, "store_prediction", lambda prediction, query_id, model_key, db, ml: None)
+
+    ml = FakeML()
+    app = FastAPI()
+    app.include_router(query.router.router)
+    app.dependency_overrides[get_db] = lambda: None
+    app.dependency_overrides[MLHelper] = lambda: ml
+    app.dependency_overrides[get_settings] = lambda: get_settings()
+    return TestClient(app), ml
+
+
+def test_get_predictions(client):
+    client, ml = client
+    response = client.post("/queries/predictions", json={"queryIds": [3, 1, 2, 1]})
+
+    assert response.status_code == 200
+    predictions = response.json()["predictions"]
+    assert [prediction["queryId"] for prediction in predictions] == [3, 1, 2, 1]
+    assert [prediction["prediction"] for prediction in predictions] == [30, 10, 20, 10]
+    assert all(set(prediction) == {"queryId", "modelId", "prediction", "label", "qerror"} for prediction in predictions)
+    # All plans of a model are predicted together
+    assert ml.batches == [[3, 1, 2]]
+
+
+def test_get_predictions_unknown_ids(client):
+    client, ml = client
+    response = client.post("/queries/predictions", json={"queryIds": [1, 42, 2, 43]})
+
+    assert response.status_code == 404
+    assert "42" in response.json()["detail"] and "43" in response.json()["detail"]
+    assert ml.batches == []
@@ -0,0 +1,247 @@
+import json
+import os.path
+
+import pytest
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import Session, sessionmaker
+
+import query.db
+from config import Settings
+from db_utils import create_db, get_db_connection_string, is_db_exists
+from query.db import Base
+from query.loader import decode_plan_snapshot, load_plan_trees
+from query.models import ColumnStats, DatabaseStats, Dataset, FilterColumn, LogicalPredicate, OutputColumn, Plan, PlanParameters, PlanStats, RunKwargs, TableStats, WorkloadRun
+from query.store import WorkloadRunFile, create_db_model, prepare_workload_run_plans, store_workload_queries_in_db, store_workload_run_files
+from saved_runs_models import SavedDataset
+from zero_shot_learned_db.explanations.data_models.nodes import FilterColumn as PydanticFilterColumn, LogicalPredicate as PydanticLogicalPredicate, NodeType, Plan as PydanticPlan
+from zero_shot_learned_db.explanations.data_models.workload_run import WorkloadRun as PydanticWorkloadRun, load_workload_run
+from zero_shot_learned_db.explanations.load import ParsedPlan
+
+test_db_name = "zs_queries_test_ingestion"
+dataset = SavedDataset(name="test", directory="test", runs=[], runs_names=[])
+
+
+# Reference: plans stored as an ORM object graph, like before bulk ingestion
+def create_plan_orm(json_plan: PydanticPlan, db_stats: DatabaseStats, top_plan: Plan | None = None):
+    plan = create_db_model(Plan, json_plan)
+    if top_plan is None:
+        top_plan = plan
+    else:
+        plan.top_plan = top_plan
+    plan.plan_parameters = create_db_model(PlanParameters, json_plan.plan_parameters)
+    for json_output_column in json_plan.plan_parameters.output_columns:
+        output_column = create_db_model(OutputColumn, json_output_column)
+        output_column.top_plan = top_plan
+        plan.plan_parameters.output_columns.append(output_column)
+        for json_column in json_output_column.columns:
+            output_column.columns.append(db_stats.column_stats[json_column])
+    if json_plan.plan_parameters.filter_columns is not None:
+        plan.plan_parameters.filter_columns = create_logical_node_orm(json_plan.plan_parameters.filter_columns, db_stats, top_plan)
+    for json_child_plan in json_plan.children:
+        plan.children.append(create_plan_orm(json_child_plan, db_stats, top_plan))
+    return plan
+
+
+def create_logical_node_orm(json_node: PydanticLogicalPredicate | PydanticFilterColumn, db_stats: DatabaseStats, top_plan: Plan):
+    if json_node.node_type == NodeType.LOGICAL_PRED:
+        logical_predicate = create_db_model(LogicalPredicate, json_node)
+        logical_predicate.top_plan = top_plan
+        for child in json_node.children:
+            logical_predicate.children.append(create_logical_node_orm(child, db_stats, top_plan))
+        return logical_predicate
+    filter_column = create_db_model(FilterColumn, json_node)
+    filter_column.top_plan = top_plan
+    filter_column.column_stats = db_stats.column_stats[json_node.column]
+    literal = str(json_node.literal)
+    if literal.endswith(".0"):
+        literal = literal[:-2]
+    filter_column.literal = literal
+    return filter_column
+
+
+def store_workload_run_orm(json_workload_run: PydanticWorkloadRun, db: Session):
+    db_dataset = db.scalars(select(Dataset).where(Dataset.directory == dataset.directory)).one()
+    db_workload_run = create_db_model(WorkloadRun, json_workload_run, file_name="orm", file_path="orm.json", dataset=db_dataset)
+    run_kwargs = create_db_model(RunKwargs, json_workload_run.run_kwargs)
+    db_workload_run.run_kwargs = run_kwargs
+    db_stats = DatabaseStats(run_kwargs=run_kwargs)
+    for i, stat in enumerate(json_workload_run.database_stats.table_stats):
+        db_stats.table_stats.append(create_db_model(TableStats, stat, id_in_run=i))
+    for i, stat in enumerate(json_workload_run.database_stats.column_stats):
+        db_stats.column_stats.append(create_db_model(ColumnStats, stat, id_in_run=i, table=next(filter(lambda t: t.relname == stat.tablename, db_stats.table_stats))))
+    db_workload_run.database_stats = db_stats
+    for i, json_plan in enumerate(json_workload_run.parsed_plans):
+        db_plan = create_plan_orm(json_plan, db_stats)
+        db_plan.id_in_run = i
+        db_plan.plan_stats = create_db_model(PlanStats, ParsedPlan(json_plan, json_workload_run.database_stats).graph_nodes_stats)
+        db_workload_run.parsed_plans.append(db_plan)
+    db.add(db_workload_run)
+    db.commit()
+    return db_workload_run.id
+
+
+@pytest.fixture(scope="module")
+def ingested_db():
+    settings = Settings()
+    if not is_db_exists(settings, "postgres"):
+        pytest.skip("Postgres is not available")
+    settings.query.db_name = test_db_name
+    create_db(settings, test_db_name)
+    engine = create_engine(get_db_connection_string(settings, test_db_name))
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    json_workload_run = load_workload_run(os.path.join(os.path.dirname(__file__), "data", "job-light_c8220.json"))
+    json_workload_run.parsed_plans = json_workload_run.parsed_plans[:20]
+    json_workload_run.database_stats.run_kwargs = json_workload_run.run_kwargs
+
+    engine_before, session_before = query.db.engine, query.db.SessionLocal
+    query.db.engine, query.db.SessionLocal = engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    try:
+        with Session(engine) as db:
+            db.add(Dataset(name=dataset.name, directory=dataset.directory))
+            db.commit()
+            orm_run_id = store_workload_run_orm(json_workload_run, db)
+        # A chunk size that doesn't divide the plans count, so the last chunk is partial
+        store_workload_queries_in_db(json_workload_run, dataset, "bulk.json", "bulk", prepare_workload_run_plans(json_workload_run, json_workload_run.parsed_plans, [], "bulk", False), chunk_size=3)
+        with Session(engine) as db:
+            bulk_run_id = db.scalars(select(WorkloadRun.id).where(WorkloadRun.file_path == "bulk.json")).one()
+            yield db, orm_run_id, bulk_run_id
+    finally:
+        query.db.engine, query.db.SessionLocal = engine_before, session_before
+        Base.metadata.drop_all(engine)
+        engine.dispose()
+
+
+def get_values(row: Base, exclude: set[str]):
+    return {key: getattr(row, key) for key in row.__mapper__.column_attrs.keys() if key not in exclude}
+
+
+def get_column_ids_in_run(columns: list[ColumnStats], database_stats_id: int):
+    # Columns are compared by their position in the run, ids differ between runs
+    assert all(column.database_stats_id == database_stats_id for column in columns)
+    return [column.id_in_run for column in columns]
+
+
+def describe_logical_node(node: LogicalPredicate, top_plan_id: int, database_stats_id: int):
+    assert node.top_plan_id == top_plan_id
+    description = get_values(node, {"id", "parent_id", "top_plan_id", "column_id"})
+    if node.type == "filter_column":
+        description["column_id"] = get_column_ids_in_run([node.column_stats], database_stats_id)
+    description["children"] = sorted((describe_logical_node(child, top_plan_id, database_stats_id) for child in node.children), key=json.dumps)
+    return description
+
+
+def describe_plan(plan: Plan, top_plan_id: int, workload_run_id: int, database_stats_id: int):
+    # Only the root belongs to the workload run and has no top plan, all other nodes point to the root
+    if plan.id == top_plan_id:
+        assert plan.top_plan_id is None and plan.workload_run_id == workload_run_id
+    else:
+        assert plan.top_plan_id == top_plan_id and plan.workload_run_id is None and plan.id_in_run is None
+    description = get_values(plan, {"id", "parent_id", "top_plan_id", "workload_run_id", "plan_parameters_id", "plan_stats_id", "plan_snapshot"})
+    parameters = plan.plan_parameters
+    description["plan_parameters"] = get_values(parameters, {"id", "logical_node_id"})
+    output_columns = []
+    for output_column in parameters.output_columns:
+        assert output_column.top_plan_id == top_plan_id
+        output_columns.append({**get_values(output_column, {"id", "top_plan_id"}), "columns": sorted(get_column_ids_in_run(output_column.columns, database_stats_id))})
+    description["output_columns"] = sorted(output_columns, key=json.dumps)
+    description["filter_columns"] = describe_logical_node(parameters.filter_columns, top_plan_id, database_stats_id) if parameters.filter_columns is not None else None
+    description["plan_stats"] = get_values(plan.plan_stats, {"id", "workload_run_id"}) if plan.plan_stats is not None else None
+    description["children"] = sorted((describe_plan(child, top_plan_id, workload_run_id, database_stats_id) for child in plan.children), key=lambda child: json.dumps(child, default=str))
+    return description
+
+
+def describe_run(db: Session, workload_run_id: int):
+    database_stats_id = db.scalars(select(WorkloadRun.database_stats_id).where(WorkloadRun.id == workload_run_id)).one()
+    plans = db.scalars(select(Plan).where(Plan.workload_run_id == workload_run_id).order_by(Plan.id_in_run)).all()
+    return [describe_plan(plan, plan.id, workload_run_id, database_stats_id) for plan in plans]
+
+
+def test_bulk_ingestion_equals_orm_ingestion(ingested_db):
+    db, orm_run_id, bulk_run_id = ingested_db
+
+    orm_plans = describe_run(db, orm_run_id)
+    bulk_plans = describe_run(db, bulk_run_id)
+
+    assert len(bulk_plans) == 20
+    assert bulk_plans == orm_plans
+    # Plan stats of bulk ingested plans also reference the run, so queries can be listed with one index
+    plan_stats = db.scalars(select(PlanStats).join(Plan, Plan.plan_stats_id == PlanStats.id).where(Plan.workload_run_id == bulk_run_id)).all()
+    assert len(plan_stats) == 20 and all(stats.workload_run_id == bulk_run_id for stats in plan_stats)
+
+
+def test_concurrent_ingestion_assigns_ids_in_input_order(ingested_db, tmp_path):
+    db, _, _ = ingested_db
+    with open(os.path.join(os.path.dirname(__file__), "data", "job-light_c8220.json")) as file:
+        run = json.load(file)
+    run["database_stats"]["run_kwargs"] = run["run_kwargs"]
+    run_files = []
+    # The first run is the largest, so its worker finishes last
+    for i, plans_count in enumerate([50, 2, 5]):
+        run_file = tmp_path / f"order_{i}.json"
+        run_file.write_text(json.dumps({**run, "parsed_plans": run["parsed_plans"][:plans_count]}))
+        run_files.append(WorkloadRunFile(dataset=dataset, run_file_path=f"order_{i}.json", run_file_name=f"order_{i}", run_file=str(run_file), raw_run_file=str(tmp_path / "missing.json")))
+    settings = Settings()
+    settings.query.ingestion_workers = 3
+    settings.query.ingestion_chunk_size = 3
+
+    store_workload_run_files(settings, run_files)
+
+    runs = db.execute(select(WorkloadRun.id, WorkloadRun.file_path).where(WorkloadRun.file_path.like("order_%")).order_by(WorkloadRun.id)).all()
+    assert [run.file_path for run in runs] == ["order_0.json", "order_1.json", "order_2.json"]
+    plan_ids = [db.scalars(select(Plan.id).where(Plan.workload_run_id == run.id).order_by(Plan.id_in_run)).all() for run in runs]
+    assert [len(ids) for ids in plan_ids] == [50, 2, 5]
+    assert all(ids == sorted(ids) for ids in plan_ids)
+    assert plan_ids[0][-1] < plan_ids[1][0] and plan_ids[1][-1] < plan_ids[2][0]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_failed_runs_are_returned_in_both_ingestion_paths(ingested_db, tmp_path, workers: int):
+    db, _, _ = ingested_db
+    with open(os.path.join(os.path.dirname(__file__), "data", "job-light_c8220.json")) as file:
+        run = json.load(file)
+    run["database_stats"]["run_kwargs"] = run["run_kwargs"]
+    broken_run_file = tmp_path / "broken.json"
+    broken_run_file.write_text("{")
+    run_file = tmp_path / f"stored_{workers}.json"
+    run_file.write_text(json.dumps({**run, "parsed_plans": run["parsed_plans"][:2]}))
+    run_files = [
+        WorkloadRunFile(dataset=dataset, run_file_path=f"broken_{workers}.json", run_file_name="broken", run_file=str(broken_run_file), raw_run_file=str(tmp_path / "missing.json")),
+        WorkloadRunFile(dataset=dataset, run_file_path=f"stored_{workers}.json", run_file_name="stored", run_file=str(run_file), raw_run_file=str(tmp_path / "missing.json")),
+    ]
+    settings = Settings()
+    settings.query.ingestion_workers = workers
+
+    assert store_workload_run_files(settings, run_files) == [str(broken_run_file)]
+    assert db.scalars(select(WorkloadRun.file_path).where(WorkloadRun.file_path.in_([f"broken_{workers}.json", f"stored_{workers}.json"]))).all() == [f"stored_{workers}.json"]
+
+
+def test_load_plan_trees_uses_constant_number_of_queries(ingested_db):
+    db, orm_run_id, bulk_run_id = ingested_db
+    plan_ids = db.scalars(select(Plan.id).where(Plan.workload_run_id.in_([orm_run_id, bulk_run_id])).order_by(Plan.id)).all()
+    statements = []
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with Session(db.get_bind()) as load_db:
+        event.listen(load_db.get_bind(), "before_cursor_execute", count_statement)
+        try:
+            plans = load_plan_trees(plan_ids, load_db)
+            loaded = {plan_id: plan.to_pydantic() for plan_id, plan in plans.items()}
+        finally:
+            event.remove(load_db.get_bind(), "before_cursor_execute", count_statement)
+    assert len(statements) == 5
+
+    # Same trees as loading through the relationships one plan at a time
+    with Session(db.get_bind()) as lazy_db:
+        assert loaded == {plan_id: lazy_db.get(Plan, plan_id).to_pydantic() for plan_id in plan_ids}
+
+
+def test_bulk_ingestion_snapshots_equal_stored_plans(ingested_db):
+    db, _, bulk_run_id = ingested_db
+    plans = db.execute(select(Plan.id, Plan.plan_snapshot).where(Plan.workload_run_id == bulk_run_id)).all()
+
+    loaded = load_plan_trees([plan.id for plan in plans], db)
+    assert all(plan.plan_snapshot is not None and decode_plan_snapshot(plan.plan_snapshot) == loaded[plan.id].to_pydantic() for plan in plans)
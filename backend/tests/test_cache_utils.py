@@ -0,0 +1,46 @@
+from cache_utils import EvictionPolicy, LRUCache, estimate_size
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache[str, int](2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert "b" not in cache
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats() == {"size": 2, "max_size": 2, "bytes": 0, "max_bytes": None, "hits": 3, "misses": 1, "evictions": 1}
+
+
+def test_lru_cache_byte_budget():
+    cache = LRUCache[str, list[int]](10, max_bytes=5, size_fn=len)
+    cache.put("a", [1, 2])
+    cache.put("b", [1, 2])
+    assert cache.bytes == 4
+    cache.put("c", [1, 2])
+    assert "a" not in cache
+    assert cache.bytes == 4
+    value = cache.get("b")
+    value.extend([3, 4])
+    cache.refresh("b")
+    assert "c" not in cache
+    assert cache.bytes == 4
+    assert cache.stats()["evictions"] == 2
+
+
+def test_fifo_cache_ignores_access_order():
+    cache = LRUCache[str, int](2, eviction_policy=EvictionPolicy.FIFO)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert "a" not in cache
+    assert "b" in cache
+
+
+def test_estimate_size_excludes_shared_objects():
+    shared = list(range(1000))
+    plan = {"nodes": list(range(10)), "stats": shared}
+    assert estimate_size(plan, [shared]) < estimate_size(plan)
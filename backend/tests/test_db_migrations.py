@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, MetaData, Table, create_engine, text
+
+from db_utils import get_missing_columns
+
+
+def test_missing_columns_of_existing_tables():
+    metadata = MetaData()
+    Table("plan_stats", metadata, Column("id", Integer, primary_key=True), Column("workload_run_id", Integer))
+    Table("workload_run_summaries", metadata, Column("workload_run_id", Integer, primary_key=True))
+    engine = create_engine("sqlite://")
+    # A table of a restored backup from before the column was added
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE plan_stats (id INTEGER PRIMARY KEY)"))
+
+    assert get_missing_columns(engine, metadata) == ["plan_stats.workload_run_id"]
+    # create_all only creates missing tables
+    metadata.create_all(engine)
+    assert get_missing_columns(engine, metadata) == ["plan_stats.workload_run_id"]
+    with engine.begin() as connection:
+        connection.execute(text("ALTER TABLE plan_stats ADD COLUMN workload_run_id INTEGER"))
+    assert get_missing_columns(engine, metadata) == []
@@ -1,5 +1,13 @@
 import pytest
-from zero_shot_learned_db.explanations.evaluation import _get_fidelity_evaluation_internal
+from evaluation_fns.dependencies import EvaluationBaseParams
+from evaluation_fns.router import all_evaluations, fidelity_plus, pearson_cardinality
+from evaluation_fns.schemas import EvaluationFnType
+from ml.dependencies import MLHelperOld
+from ml.perturbation import MemoizedExplainer
+from ml.plan_view import ParsedPlanView
+from ml.service import ExplainerType
+from zero_shot_learned_db.explanations.data_models.explanation import Explanation
+from zero_shot_learned_db.explanations.evaluation import _get_fidelity_evaluation_internal, evaluation_fidelity_minus, evaluation_fidelity_plus
 from zero_shot_learned_db.explanations.utils import filter_cumulative, harmonic_mean, relative_change
 
 
@@ -68,3 +76,64 @@ def test_filter_cumulative_test():
     assert filter_cumulative([(4, 0.1), (1, 0.3), (2, 0.5), (3, 0.1)], key_fn) == [(2, 0.5), (1, 0.3), (4, 0.1)]
     assert filter_cumulative([(4, 0.1), (1, 0.3), (2, 0.5), (3, 0.1)], key_fn, 0.95) == [(2, 0.5), (1, 0.3), (4, 0.1), (3, 0.1)]
     assert filter_cumulative([(4, 0.08), (1, 0.3), (5, 0.03), (2, 0.5), (3, 0.09)], key_fn) == [(2, 0.5), (1, 0.3), (3, 0.09), (4, 0.08)]
+
+
+def test_memoized_explainer_reuses_masked_predictions(ml: MLHelperOld):
+    base_explainer = ml.get_explainer(ExplainerType.BASE)
+    explainer = MemoizedExplainer(base_explainer)
+    view = ParsedPlanView(ml.get_plan(0))
+    node_ids = [node.id_in_nx_graph for node in view.graph_nodes][:2]
+
+    prediction = explainer.predict(view)
+    view.set_node_mask(node_ids)
+    masked_prediction = explainer.predict(view)
+    view.set_node_mask(list(reversed(node_ids)))
+    assert explainer.predict(view) is masked_prediction
+    view.set_node_mask(None)
+    assert explainer.predict(view) is prediction
+    assert explainer.misses == 2
+    assert explainer.hits == 2
+
+    masked_view = ParsedPlanView(ml.get_plan(0))
+    masked_view.set_node_mask(node_ids)
+    assert masked_prediction.prediction == base_explainer.predict(masked_view).prediction
+
+
+@pytest.mark.parametrize("fn", [evaluation_fidelity_plus, evaluation_fidelity_minus])
+def test_memoized_fidelity_equals_fidelity(ml: MLHelperOld, fn):
+    plan = ml.get_plan(0)
+    base_explainer = ml.get_explainer(ExplainerType.BASE)
+    explanation = ml.get_explainer(ExplainerType.DIFFERENCE_EXPLAINER).explain(ParsedPlanView(plan))
+    explanation = Explanation(node_count=len(plan.graph_nodes), **explanation.model_dump(exclude=["node_count"]))
+
+    expected = fn(base_explainer, explanation, ParsedPlanView(plan))
+    predictions = {}
+    for _ in range(2):
+        assert fn(MemoizedExplainer(base_explainer, predictions), explanation, ParsedPlanView(plan)).score == expected.score
+
+
+class OldLease:
+    def __init__(self, ml: MLHelperOld):
+        self.ml = ml
+
+    def get_explainer(self, explainer_type: ExplainerType):
+        return self.ml.get_explainer(explainer_type)
+
+
+def create_base_params(ml: MLHelperOld):
+    plan = ml.get_plan(0)
+    explanation = ml.get_explainer(ExplainerType.DIFFERENCE_EXPLAINER).explain(ParsedPlanView(plan))
+    explanation = Explanation(node_count=len(plan.graph_nodes), **explanation.model_dump(exclude=["node_count"]))
+    return EvaluationBaseParams(ParsedPlanView(plan), MemoizedExplainer(ml.get_explainer(ExplainerType.BASE)), ml, explanation, OldLease(ml))
+
+
+def test_all_evaluations_equal_single_evaluations(ml: MLHelperOld):
+    params = create_base_params(ml)
+    types = [EvaluationFnType.FIDELITY_PLUS, EvaluationFnType.CHARACTERIZATION_SCORE, EvaluationFnType.PEARSON_CARDINALITY, EvaluationFnType.SPEARMAN_CARDINALITY]
+    evaluations = all_evaluations(params, types).evaluations
+
+    assert list(evaluations) == types
+    assert evaluations[EvaluationFnType.FIDELITY_PLUS].score == fidelity_plus(create_base_params(ml)).score
+    assert evaluations[EvaluationFnType.PEARSON_CARDINALITY].score == pearson_cardinality(create_base_params(ml)).score
+    assert params.base_explainer.hits > 0
+    assert len(all_evaluations(create_base_params(ml)).evaluations) == len(EvaluationFnType)
@@ -0,0 +1,105 @@
+import torch
+
+import ml.scheduler
+from ml.scheduler import ModelWorkerPool
+from ml.service import ExplainerType
+
+
+class RecordingExplainer:
+    """Registers a hook on every module when it is built and changes its own and the model's state while it predicts"""
+
+    inits = 0
+
+    def __init__(self, model: torch.nn.Module, log: bool):
+        RecordingExplainer.inits += 1
+        self.model = model
+        self.log = log
+        self.hooks = [module.register_forward_hook(lambda *_: None) for module in model.modules()]
+        self.predicted_plans: list[int] = []
+        self.cache: dict[int, torch.Tensor] = {}
+
+    def predict(self, plan: int):
+        self.predicted_plans.append(plan)
+        self.cache[plan] = torch.zeros(1)
+        self.last_plan = plan
+        self.model.register_forward_pre_hook(lambda *_: None)
+        self.model.eval()
+        for parameter in self.model.parameters():
+            parameter.requires_grad_(False)
+        return plan
+
+
+def create_model():
+    return torch.nn.Sequential(torch.nn.Linear(4, 4), torch.nn.Linear(4, 4))
+
+
+def create_pool(monkeypatch, workers: int):
+    monkeypatch.setitem(ml.scheduler.explainers, ExplainerType.BASE, RecordingExplainer)
+    RecordingExplainer.inits = 0
+    return ModelWorkerPool(create_model(), workers, [(ExplainerType.BASE, False)])
+
+
+def test_explainers_are_built_once_per_replica(monkeypatch):
+    pool = create_pool(monkeypatch, 2)
+    assert RecordingExplainer.inits == 2
+
+    with pool.acquire() as replica:
+        explainer = replica.get_explainer(ExplainerType.BASE, False)
+        explainer.predict(1)
+        with pool.acquire() as other_replica:
+            assert other_replica is not replica
+            assert other_replica.get_explainer(ExplainerType.BASE, False) is not explainer
+    for _ in range(3):
+        with pool.acquire() as first_replica, pool.acquire() as second_replica:
+            assert explainer in (first_replica.get_explainer(ExplainerType.BASE, False), second_replica.get_explainer(ExplainerType.BASE, False))
+    assert RecordingExplainer.inits == 2
+
+
+def test_leases_do_not_see_state_of_previous_calls(monkeypatch):
+    pool = create_pool(monkeypatch, 1)
+
+    with pool.acquire() as replica:
+        explainer = replica.get_explainer(ExplainerType.BASE, False)
+        initial_hooks = explainer.hooks
+        explainer.predict(1)
+        predicted_plans = explainer.predicted_plans
+
+    with pool.acquire() as replica:
+        explainer = replica.get_explainer(ExplainerType.BASE, False)
+        assert explainer.predicted_plans == [] and explainer.cache == {}
+        assert not hasattr(explainer, "last_plan")
+        assert predicted_plans == [1]
+        # The model is shared with the explainer state and never copied
+        assert explainer.model is replica.model
+        assert [hook.id for hook in explainer.hooks] == [hook.id for hook in initial_hooks]
+        assert len(replica.model._forward_pre_hooks) == 0
+        assert all(len(module._forward_hooks) == 1 for module in replica.model.modules())
+        assert replica.model.training
+        assert all(parameter.requires_grad for parameter in replica.model.parameters())
+
+
+def test_explainers_built_on_demand_get_the_pristine_model(monkeypatch):
+    pool = create_pool(monkeypatch, 1)
+    monkeypatch.setitem(ml.scheduler.explainers, ExplainerType.GRADIENT, RecordingExplainer)
+
+    with pool.acquire() as replica:
+        replica.get_explainer(ExplainerType.BASE, False).predict(1)
+    for _ in range(2):
+        with pool.acquire() as replica:
+            explainer = replica.get_explainer(ExplainerType.GRADIENT, False)
+            # Only the hooks of this explainer, none of the state left behind by the base explainer
+            assert len(replica.model._forward_pre_hooks) == 0
+            assert all(len(module._forward_hooks) == 1 for module in replica.model.modules())
+            assert replica.model.training
+            assert all(parameter.requires_grad for parameter in replica.model.parameters())
+            explainer.predict(2)
+    assert RecordingExplainer.inits == 2
+
+
+def test_replicas_are_copied_before_explainers_are_built(monkeypatch):
+    pool = create_pool(monkeypatch, 3)
+
+    replicas = [pool.replicas.get() for _ in range(3)]
+    assert len({id(replica.model) for replica in replicas}) == 3
+    # Copies of a model with explainer hooks would carry the hooks of the first replica's explainer
+    assert all(len(module._forward_hooks) == 1 for replica in replicas for module in replica.model.modules())
@@ -0,0 +1,28 @@
+import pytest
+from fastapi import HTTPException
+
+from health.schemas import StageStatus, StartupStage
+from health.service import StartupState
+
+
+def test_startup_state():
+    startup = StartupState(retry_after=3)
+    with pytest.raises(HTTPException) as e:
+        startup.get_ml_helper()
+    assert e.value.status_code == 503
+    assert e.value.headers == {"Retry-After": "3"}
+
+    with startup.stage(StartupStage.INGESTION):
+        startup.set_progress(StartupStage.INGESTION, 1, 2)
+        assert startup.stages[StartupStage.INGESTION].status == StageStatus.RUNNING
+    with pytest.raises(ValueError), startup.stage(StartupStage.ML):
+        raise ValueError("failed")
+    stages = {stage.name: stage for stage in startup.stages_response()}
+    assert stages[StartupStage.INGESTION].status == StageStatus.DONE
+    assert stages[StartupStage.INGESTION].progress == 1 and stages[StartupStage.INGESTION].total == 2
+    assert stages[StartupStage.ML].status == StageStatus.FAILED and stages[StartupStage.ML].error == "failed"
+    assert not startup.ready
+
+    for stage in [StartupStage.ML, StartupStage.PLAN_STORE, StartupStage.PLAN_ARTIFACTS, StartupStage.VALIDATION]:
+        startup.skip(stage)
+    assert startup.ready
@@ -0,0 +1,63 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from http_cache import HTTPCache
+
+
+def create_app(http_cache: HTTPCache):
+    app = FastAPI()
+    app.middleware("http")(http_cache)
+    calls = {"count": 0}
+
+    @app.get("/queries/{query_id}")
+    def get_query(query_id: int):
+        calls["count"] += 1
+        return {"id": query_id}
+
+    @app.get("/other")
+    def get_other():
+        calls["count"] += 1
+        return {}
+
+    return app, calls
+
+
+def test_http_cache():
+    http_cache = HTTPCache([r"/queries/\d+"], 10, 1024, "private, no-cache")
+    app, calls = create_app(http_cache)
+    client = TestClient(app)
+
+    # Passed through until a version is set
+    assert "etag" not in client.get("/queries/1").headers
+    http_cache.set_version("v1")
+
+    response = client.get("/queries/1")
+    assert response.json() == {"id": 1}
+    assert response.headers["cache-control"] == "private, no-cache"
+    etag = response.headers["etag"]
+    assert client.get("/queries/1").json() == {"id": 1}
+    assert calls["count"] == 2
+
+    assert client.get("/queries/1", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/queries/2", headers={"If-None-Match": etag}).status_code == 200
+    assert client.get("/other").status_code == 200
+    assert "etag" not in client.get("/other").headers
+    assert calls["count"] == 5
+
+    http_cache.set_version("v2")
+    response = client.get("/queries/1", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert calls["count"] == 6
+
+
+def test_http_cache_errors_are_not_cached():
+    http_cache = HTTPCache([r"/queries/.+"], 10, 1024, "no-cache")
+    http_cache.set_version("v1")
+    app, calls = create_app(http_cache)
+    client = TestClient(app)
+
+    assert client.get("/queries/abc").status_code == 422
+    assert client.get("/queries/abc").status_code == 422
+    assert calls["count"] == 0
+    assert http_cache.stats()["size"] == 0
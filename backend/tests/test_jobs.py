@@ -0,0 +1,73 @@
+import time
+
+import pytest
+from fastapi import HTTPException
+
+import jobs.router
+from jobs.router import run_explanation_job
+from jobs.schemas import JobStatus
+from jobs.service import JobManager
+from query.schemas import ExplanationResponseBase
+
+
+def wait_for_job(job_manager: JobManager, job_id: str):
+    for _ in range(100):
+        job = job_manager.get(job_id)
+        if job.status in (JobStatus.SUCCEEDED, JobStatus.FAILED):
+            return job
+        time.sleep(0.01)
+    raise TimeoutError()
+
+
+def test_failed_job_records_error_detail():
+    def fail():
+        raise HTTPException(503, "Model test_model is loading")
+
+    job_manager = JobManager(1, 10)
+    job = wait_for_job(job_manager, job_manager.submit(fail).id)
+    job_manager.shutdown()
+
+    assert job.status == JobStatus.FAILED
+    assert job.error == "HTTPException: Model test_model is loading"
+
+
+class FakeML:
+    def __init__(self):
+        self.waits = 0
+
+    def wait_for_model(self, model_key=None):
+        self.waits += 1
+
+
+@pytest.fixture
+def explain_results(monkeypatch: pytest.MonkeyPatch):
+    results: list[Exception | ExplanationResponseBase] = []
+
+    def explain_query(query_id, explainer_type, model_key, db, ml):
+        result = results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    monkeypatch.setattr(jobs.router, "explain_query", explain_query)
+    monkeypatch.setattr(jobs.router, "get_db", lambda: iter([None]))
+    return results
+
+
+def test_explanation_job_waits_again_for_unloaded_model(explain_results):
+    explain_results.extend([HTTPException(503, "Model test_model is loading"), ExplanationResponseBase(base_scores=[], scaled_importance=[])])
+    ml = FakeML()
+
+    response = run_explanation_job(ml, 1, "BaseExplainer", "test_model", 3)
+
+    assert response.base_scores == []
+    assert ml.waits == 2
+
+
+def test_explanation_job_fails_after_retries(explain_results):
+    explain_results.extend([HTTPException(503, "Model test_model is loading") for _ in range(3)])
+    ml = FakeML()
+
+    with pytest.raises(HTTPException):
+        run_explanation_job(ml, 1, "BaseExplainer", "test_model", 2)
+    assert ml.waits == 3
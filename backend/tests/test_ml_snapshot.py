@@ -0,0 +1,14 @@
+import os
+
+from ml.snapshot import MLSnapshot, get_ml_snapshot_path, load_ml_snapshot, save_ml_snapshot
+
+
+def test_ml_snapshot_roundtrip(tmp_path):
+    directory = str(tmp_path)
+    save_ml_snapshot(directory, "a", MLSnapshot(None, {1: None}))
+    assert load_ml_snapshot(directory, "a").database_stats == {1: None}
+    assert load_ml_snapshot(directory, "b") is None
+
+    save_ml_snapshot(directory, "b", MLSnapshot(None, {}))
+    assert not os.path.isfile(get_ml_snapshot_path(directory, "a"))
+    assert load_ml_snapshot(directory, "b").database_stats == {}
@@ -0,0 +1,111 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import torch
+from fastapi import HTTPException
+
+from config import Settings
+from ml.dependencies import MLHelper
+from ml.registry import ModelRegistry
+from ml.scheduler import InferenceScheduler
+
+
+def test_model_registry_loads_once():
+    loads: list[str] = []
+
+    def load_model(model_key: str):
+        loads.append(model_key)
+        time.sleep(0.1)
+        return torch.nn.Linear(4, 4)
+
+    registry = ModelRegistry(load_model, workers_per_model=2, max_models=1)
+    registry.register("a")
+    registry.register("b")
+    with ThreadPoolExecutor(8) as executor:
+        pools = list(executor.map(registry.get_pool, ["a"] * 8))
+    assert loads == ["a"]
+    assert all(pool is pools[0] for pool in pools)
+    assert pools[0].bytes == 2 * (4 * 4 + 4) * 4
+
+    registry.get_pool("b")
+    assert loads == ["a", "b"]
+    stats = {s["model_key"]: s for s in registry.stats()}
+    assert not stats["a"]["resident"] and stats["b"]["resident"]
+    assert stats["a"]["loads"] == 1 and stats["a"]["last_load_time"] >= 0.1
+    registry.shutdown()
+
+
+def test_model_registry_failed_load_is_retried():
+    fail = threading.Event()
+    fail.set()
+
+    def load_model(model_key: str):
+        if fail.is_set():
+            raise ValueError(model_key)
+        return torch.nn.Linear(1, 1)
+
+    registry = ModelRegistry(load_model, workers_per_model=1, max_models=1)
+    registry.register("a")
+    try:
+        registry.get_pool("a")
+        assert False
+    except ValueError:
+        pass
+    fail.clear()
+    assert registry.get_pool("a") is not None
+    registry.shutdown()
+
+
+def test_model_registry_keeps_failed_load():
+    loads: list[str] = []
+
+    def load_model(model_key: str):
+        loads.append(model_key)
+        raise ValueError(f"{model_key} is corrupt")
+
+    registry = ModelRegistry(load_model, workers_per_model=1, max_models=1, retry_failed_after=60)
+    registry.register("a")
+    future = registry.load("a")
+    assert isinstance(future.exception(), ValueError)
+
+    # The failed load is returned instead of being started again
+    assert registry.load("a") is future
+    assert loads == ["a"]
+    stats = registry.stats()[0]
+    assert stats["failures"] == 1 and stats["last_error"] == "a is corrupt"
+    assert not stats["loading"] and not stats["resident"]
+
+    registry.retry_failed_after = 0
+    assert isinstance(registry.load("a").exception(), ValueError)
+    assert loads == ["a", "a"]
+    registry.shutdown()
+
+
+def test_require_model_reports_failed_load():
+    release = threading.Event()
+
+    def load_model(model_key: str):
+        release.wait()
+        raise ValueError(f"{model_key} is corrupt")
+
+    registry = ModelRegistry(load_model, workers_per_model=1, max_models=1, retry_failed_after=60)
+    registry.register("a")
+    ml = MLHelper()
+    ml.settings = Settings()
+    ml.registry = registry
+    ml.scheduler = InferenceScheduler(registry)
+
+    with pytest.raises(HTTPException) as e:
+        ml.require_model("a")
+    assert e.value.status_code == 503
+    release.set()
+    registry.load("a").exception()
+
+    # Requests get the load error instead of waiting for a model that never becomes resident
+    for _ in range(2):
+        with pytest.raises(HTTPException) as e:
+            ml.require_model("a")
+        assert e.value.status_code == 422 and "a is corrupt" in e.value.detail
+    ml.scheduler.shutdown()
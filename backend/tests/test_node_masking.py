@@ -1,5 +1,7 @@
 import torch
+from concurrent.futures import ThreadPoolExecutor
 from ml.dependencies import MLHelperOld
+from ml.plan_view import ParsedPlanView
 from ml.service import ExplainerType
 
 masked_node = 27
@@ -76,3 +78,34 @@ def test_soft_masked_prediction_different(ml: MLHelperOld):
     assert masked_prediction2.prediction != masked_prediction3.prediction
     assert masked_prediction2.prediction == masked_prediction_hard.prediction
     assert prediction.prediction == prediction_reset.prediction
+
+
+def test_masked_view_does_not_change_plan(ml: MLHelperOld):
+    plan = ml.get_plan(0)
+    base_explainer = ml.get_explainer(ExplainerType.BASE)
+    prediction = base_explainer.predict(plan)
+
+    view = ParsedPlanView(plan)
+    view.set_node_mask([masked_node])
+    assert view.mask_key == ("hard", (masked_node,))
+    masked_prediction = base_explainer.predict(view)
+    assert masked_prediction.prediction != prediction.prediction
+    assert base_explainer.predict(plan).prediction == prediction.prediction
+
+    plan.set_node_mask([masked_node])
+    assert base_explainer.predict(plan).prediction == masked_prediction.prediction
+    plan.set_node_mask(None)
+
+
+def test_masked_views_in_parallel(ml: MLHelperOld):
+    plan = ml.get_plan(0)
+    node_ids = [node.id_in_nx_graph for node in plan.graph_nodes][:8]
+
+    def predict(node_id: int | None):
+        view = ParsedPlanView(plan)
+        view.set_node_mask([node_id] if node_id is not None else None)
+        return ml.get_explainer(ExplainerType.BASE).predict(view).prediction
+
+    expected = [predict(node_id) for node_id in [None, *node_ids]]
+    with ThreadPoolExecutor(4) as executor:
+        assert list(executor.map(predict, [None, *node_ids])) == expected
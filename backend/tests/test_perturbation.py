@@ -0,0 +1,53 @@
+import pytest
+import torch
+
+from ml.dependencies import MLHelperOld
+from ml.perturbation import PERTURBATION_EXPLAINERS, get_perturbed_node_ids, get_prediction_key, memoize_predictions, prefetch_perturbations
+from ml.plan_view import ParsedPlanView
+from ml.service import ExplainerType
+
+
+@pytest.mark.parametrize("explainer_type", list(PERTURBATION_EXPLAINERS))
+def test_prefetched_perturbations_keep_scores(ml: MLHelperOld, explainer_type: ExplainerType):
+    plan = ml.get_plan(0)
+    expected = ml.get_explainer(explainer_type).explain(ParsedPlanView(plan))
+
+    predictions = prefetch_perturbations(ml.get_explainer(ExplainerType.BASE), ml.model, plan, PERTURBATION_EXPLAINERS[explainer_type], 20000)
+    assert len(predictions) == len(get_perturbed_node_ids(plan, PERTURBATION_EXPLAINERS[explainer_type])) + 1
+    explainer = ml.get_explainer(explainer_type)
+    memoized = memoize_predictions(explainer, predictions)
+    explanation = explainer.explain(ParsedPlanView(plan))
+
+    assert [(s.node_id, s.score) for s in explanation.base_scores] == [(s.node_id, s.score) for s in expected.base_scores]
+    assert memoized.hits > 0
+
+
+def test_only_plans_perturbs_plan_operators(ml: MLHelperOld):
+    plan = ml.get_plan(0)
+    plan_node_ids = get_perturbed_node_ids(plan, True)
+    assert 0 < len(plan_node_ids) < len(get_perturbed_node_ids(plan, False))
+
+
+def test_equivalent_soft_masks_share_key(ml: MLHelperOld):
+    view = ParsedPlanView(ml.get_plan(0))
+    view.set_soft_node_mask([(27, 0), (22, 1)])
+    assert view.mask_key == ("hard", (27,))
+    view.set_soft_node_mask([(27, 1)])
+    assert view.mask_key is None
+    view.set_soft_node_mask([(27, 0.5)])
+    assert view.mask_key == ("soft", ((27, 0.5),))
+
+
+def test_changed_features_get_new_prediction_keys(ml: MLHelperOld):
+    plan = ml.get_plan(0)
+    view = ParsedPlanView(plan)
+    assert get_prediction_key(view) == get_prediction_key(ParsedPlanView(plan))
+
+    keys = [get_prediction_key(view)]
+    for _ in range(2):
+        # Replaced tensors may get the ids of freed ones, versions are never reused
+        view.features = {"feature": torch.zeros(1)}
+        keys.append(get_prediction_key(view))
+        view.features["feature"] = torch.ones(1)
+        keys.append(get_prediction_key(view))
+    assert len(set(keys)) == len(keys)
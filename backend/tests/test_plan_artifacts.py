@@ -0,0 +1,16 @@
+import shutil
+import pytest
+
+from query.artifacts import get_plan_artifacts_version, render_svg
+
+
+def test_plan_artifacts_version():
+    assert get_plan_artifacts_version("a", False) != get_plan_artifacts_version("a", True)
+    assert get_plan_artifacts_version("a", False) != get_plan_artifacts_version("b", False)
+
+
+@pytest.mark.skipif(shutil.which("dot") is None, reason="graphviz is not installed")
+def test_render_svg():
+    svg = render_svg('digraph { 0 [label="a"]; 1 [label="b"]; 0 -> 1 }', 30)
+    assert svg is not None and "<svg" in svg
+    assert render_svg("digraph {", 30) is None
@@ -0,0 +1,58 @@
+import os
+
+import torch
+
+from ml.plan_store import PlanStore
+from zero_shot_learned_db.explanations.load import ParsedPlan
+
+
+def create_store(tmp_path, database_key: str):
+    hyperparameters_file = tmp_path / "hyperparameters.json"
+    statistics_file = tmp_path / "statistics.json"
+    hyperparameters_file.write_text("{}")
+    statistics_file.write_text("{}")
+    return PlanStore(str(tmp_path / "plan_store"), str(hyperparameters_file), str(statistics_file), database_key)
+
+
+def create_plan(plan_id: int, shared: object):
+    parsed_plan = ParsedPlan.__new__(ParsedPlan)
+    parsed_plan.__dict__.update({"id": plan_id, "features": torch.arange(4), "database_stats": shared, "lock": object()})
+    return parsed_plan
+
+
+def test_plan_store_roundtrip(tmp_path):
+    store = create_store(tmp_path, "a")
+    shared = object()
+    store.save(create_plan(1, shared), 7, {"database_stats": shared})
+
+    parsed_plan = store.load(7, 1, {"database_stats": shared})
+    assert torch.equal(parsed_plan.features, torch.arange(4))
+    assert parsed_plan.database_stats is shared
+    assert "lock" not in parsed_plan.__dict__
+    assert store.load(7, 2, {"database_stats": shared}) is None
+
+
+def test_plan_store_is_invalidated_by_ingestion(tmp_path):
+    store = create_store(tmp_path, "a")
+    shared = object()
+    store.save(create_plan(1, shared), 7, {"database_stats": shared})
+
+    # The same plan ids of another ingestion must not return the stored plans
+    new_store = create_store(tmp_path, "b")
+    assert new_store.version != store.version
+    assert not new_store.contains(7, 1)
+    assert not os.path.isdir(store.directory)
+    assert create_store(tmp_path, "b").version == new_store.version
+
+
+def test_plan_store_keeps_unrelated_entries(tmp_path):
+    store = create_store(tmp_path, "a")
+    store.save(create_plan(1, object()), 7, {})
+    base_directory = tmp_path / "plan_store"
+    (base_directory / "data").mkdir()
+    (base_directory / "0123456789abcdef.json").write_text("{}")
+
+    # Only the version directory of the previous ingestion is deleted
+    new_store = create_store(tmp_path, "b")
+    assert sorted(os.listdir(base_directory)) == sorted(["data", "0123456789abcdef.json"])
+    assert not os.path.isdir(store.directory) and new_store.version != store.version
@@ -0,0 +1,79 @@
+import random
+import pytest
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+from config import Settings
+from db_utils import create_db, get_db_connection_string, is_db_exists
+from query.db import Base
+from query.models import Dataset, DatabaseStats, Plan, PlanParameters, PlanStats, RunKwargs, WorkloadRun
+from query.service import OrderByArg, QueriesCursor, get_workload_queries_page, get_workload_queries_query
+
+test_db_name = "zs_queries_test_indexes"
+plans_per_run = 20000
+
+
+@pytest.fixture(scope="module")
+def indexed_db():
+    settings = Settings()
+    if not is_db_exists(settings, "postgres"):
+        pytest.skip("Postgres is not available")
+    create_db(settings, test_db_name)
+    engine = create_engine(get_db_connection_string(settings, test_db_name))
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    rng = random.Random(0)
+    with Session(engine) as db:
+        db.execute(insert(RunKwargs), [{"id": 1, "hardware": "test"}])
+        db.execute(insert(DatabaseStats), [{"id": 1, "run_kwargs_id": 1}])
+        db.execute(insert(Dataset), [{"id": 1, "name": "test", "directory": "test"}])
+        db.execute(insert(WorkloadRun), [{"id": run_id, "file_path": f"run_{run_id}", "file_name": f"run_{run_id}", "dataset_id": 1, "database_stats_id": 1, "run_kwargs_id": 1} for run_id in [1, 2]])
+        for run_id in [1, 2]:
+            ids = range((run_id - 1) * plans_per_run + 1, run_id * plans_per_run + 1)
+            db.execute(
+                insert(PlanParameters),
+                [{"id": i, "op_name": "Seq Scan", "est_startup_cost": 0, "est_cost": 0, "est_card": 0, "est_width": 0, "act_startup_cost": 0, "act_time": 0, "act_card": 0, "act_children_card": 0, "est_children_card": 0, "workers_planned": 0} for i in ids],
+            )
+            db.execute(
+                insert(PlanStats),
+                [{"id": i, "workload_run_id": run_id, "tables": rng.randint(1, 6), "columns": rng.randint(1, 20), "plans": rng.randint(1, 15), "joins": rng.randint(0, 5), "predicates": rng.randint(0, 10), "nodes": rng.randint(1, 60), "order_by": False} for i in ids],
+            )
+            db.execute(
+                insert(Plan),
+                [{"id": i, "id_in_run": n, "plan_parameters_id": i, "plan_runtime": rng.random() * 1000, "database_id": 0, "node_type": "plan", "workload_run_id": run_id, "plan_stats_id": i} for n, i in enumerate(ids)],
+            )
+        db.commit()
+        db.execute(text("ANALYZE"))
+        yield db
+    Base.metadata.drop_all(engine)
+    engine.dispose()
+
+
+@pytest.mark.parametrize("ascending", [True, False])
+@pytest.mark.parametrize("order_by", list(OrderByArg))
+def test_workload_queries_are_sorted_by_index(indexed_db: Session, order_by: OrderByArg, ascending: bool):
+    query = get_workload_queries_query(1, order_by, ascending, indexed_db).offset(100).limit(20)
+    sql = query.statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+    plan = "\n".join(row[0] for row in indexed_db.execute(text(f"EXPLAIN {sql}")))
+    assert "Index" in plan
+    assert "Sort" not in plan
+
+
+@pytest.mark.parametrize("ascending", [True, False])
+@pytest.mark.parametrize("order_by", [OrderByArg.JOINS, OrderByArg.RUNTIME])
+def test_cursor_pages_match_offset_pages(indexed_db: Session, order_by: OrderByArg, ascending: bool):
+    limit = 500
+    expected = [plan.id for plan, _ in get_workload_queries_query(1, order_by, ascending, indexed_db).limit(3 * limit).all()]
+
+    pages = []
+    rows, next_cursor, prev_cursor = get_workload_queries_page(1, order_by, ascending, limit, 0, None, indexed_db)
+    assert prev_cursor is None
+    for _ in range(3):
+        pages.append([plan.id for plan, _ in rows])
+        rows, next_cursor, prev_cursor = get_workload_queries_page(1, order_by, ascending, limit, 0, QueriesCursor.decode(next_cursor), indexed_db)
+    assert sum(pages, []) == expected
+
+    rows, _, _ = get_workload_queries_page(1, order_by, ascending, limit, 0, QueriesCursor.decode(prev_cursor), indexed_db)
+    assert [plan.id for plan, _ in rows] == pages[2]
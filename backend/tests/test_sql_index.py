@@ -0,0 +1,64 @@
+from query.store import SQLIndex, SQLSearchFeatures
+from query.stream import RawPlan
+
+
+def create_raw_plan(sql: str, analyze_plan: str | None):
+    return RawPlan(sql=sql, analyze_plans=[[[line] for line in analyze_plan.split("\n")]] if analyze_plan is not None else None)
+
+
+def create_search_features(runtimes: list[str], tables: list[str] = [], filter_literals: list[str] = []):
+    sql_search = SQLSearchFeatures.__new__(SQLSearchFeatures)
+    sql_search.runtimes = runtimes
+    sql_search.tables = tables
+    sql_search.filter_literals = filter_literals
+    return sql_search
+
+
+def test_sql_index_matches_indexed_runtimes():
+    sql_index = SQLIndex(
+        [
+            create_raw_plan('SELECT * FROM "title" WHERE id = 5;', "Seq Scan on title (actual time=0.010..1.500 rows=1)"),
+            create_raw_plan("SELECT 1;", None),
+            create_raw_plan('SELECT * FROM "title" WHERE id = 6;', "Seq Scan on title (actual time=0.010..2.250 rows=1)\nFilter: (id = 6)"),
+            create_raw_plan('SELECT * FROM "movie" WHERE id = 6;', "Seq Scan on movie (actual time=0.010..2.250 rows=1)"),
+        ]
+    )
+
+    assert len(sql_index) == 3
+    # The original sql is returned, quotes are only removed for matching
+    assert sql_index.find_sql(create_search_features(["1.5"], ["title"], ["5"])) == 'SELECT * FROM "title" WHERE id = 5;'
+    assert sql_index.find_sql(create_search_features(["2.25"], ["movie"])) == 'SELECT * FROM "movie" WHERE id = 6;'
+    assert sql_index.find_sql(create_search_features(["1.5"], ["movie"])) is None
+    assert (sql_index.matched, sql_index.unmatched, sql_index.full_scans) == (2, 1, 0)
+    sql_index.close()
+
+
+def test_sql_index_returns_first_match_in_raw_run_order():
+    sql_index = SQLIndex(
+        [
+            create_raw_plan("SELECT * FROM title;", "Seq Scan on title (actual time=0.010..3.000 rows=1)"),
+            create_raw_plan("SELECT * FROM title WHERE id > 0;", "Seq Scan on title (actual time=0.010..3.000 rows=1)"),
+        ]
+    )
+
+    assert sql_index.find_sql(create_search_features(["3.0"], ["title"])) == "SELECT * FROM title;"
+    assert (sql_index.matched, sql_index.ambiguous) == (1, 1)
+    sql_index.close()
+
+
+def test_sql_index_runtimes_are_matched_as_whole_numbers():
+    sql_index = SQLIndex(
+        [
+            create_raw_plan("SELECT * FROM title;", "Seq Scan on title (actual time=0.010..11.5 rows=1)"),
+            create_raw_plan("SELECT * FROM title WHERE id > 0;", "Seq Scan on title (actual time=0.010..1.5 rows=1)"),
+        ]
+    )
+
+    # 1.5 is a whole number in the second plan, so the first plan (which only contains it in 11.5) is no candidate
+    assert sql_index.find_sql(create_search_features(["1.5"], ["title"])) == "SELECT * FROM title WHERE id > 0;"
+    assert sql_index.full_scans == 0
+    # 2.0 and 11 are no whole numbers in any plan, so all plans are checked with the substring check
+    assert sql_index.find_sql(create_search_features(["2.0"], ["title"])) is None
+    assert sql_index.find_sql(create_search_features(["11"], ["title"])) == "SELECT * FROM title;"
+    assert sql_index.full_scans == 2
+    sql_index.close()
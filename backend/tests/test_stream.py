@@ -0,0 +1,33 @@
+import json
+import os.path
+
+from query.stream import RawPlan, iter_raw_run_plans, iter_workload_run_plans, load_json_header, load_workload_run_header
+from zero_shot_learned_db.explanations.data_models.nodes import Plan as PydanticPlan
+from zero_shot_learned_db.explanations.data_models.workload_run import WorkloadRun as PydanticWorkloadRun
+
+run_file = os.path.join(os.path.dirname(__file__), "data", "job-light_c8220.json")
+
+
+def test_streamed_workload_run_equals_loaded_run():
+    with open(run_file) as file:
+        run = json.load(file)
+
+    assert load_json_header(run_file, "parsed_plans") == {key: value for key, value in run.items() if key != "parsed_plans"}
+    assert load_workload_run_header(run_file) == PydanticWorkloadRun.model_validate({**run, "parsed_plans": []})
+    assert list(iter_workload_run_plans(run_file)) == [PydanticPlan.model_validate(plan) for plan in run["parsed_plans"]]
+
+
+def test_streamed_raw_plans_equal_loaded_plans(tmp_path):
+    raw_run = {
+        "query_list": [
+            {"sql": 'SELECT * FROM "title" WHERE id = 1;', "analyze_plans": [[["Seq Scan (actual time=0.01..1.5 rows=1)"]]]},
+            {"sql": "SELECT 1;", "analyze_plans": None},
+            {"sql": "SELECT 2;", "analyze_plans": []},
+        ],
+        "database_stats": {"ignored": [1, 2.5]},
+    }
+    raw_run_file = tmp_path / "raw.json"
+    raw_run_file.write_text(json.dumps(raw_run))
+
+    assert list(iter_raw_run_plans(str(raw_run_file))) == [RawPlan.model_validate(raw_plan) for raw_plan in raw_run["query_list"]]
+    assert list(iter_raw_run_plans(str(tmp_path / "missing.json"))) == []
@@ -0,0 +1,75 @@
+import random
+
+import pytest
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from config import Settings
+from db_utils import create_db, get_db_connection_string, is_db_exists
+from query.db import Base
+from query.models import Dataset, DatabaseStats, Plan, PlanParameters, PlanStats, RunKwargs, WorkloadRun, WorkloadRunSummary
+from query.summary import compute_workload_run_summary, get_runtime_histogram, store_missing_workload_run_summaries
+
+test_db_name = "zs_queries_test_summaries"
+plans_per_run = 200
+
+
+@pytest.fixture(scope="module")
+def summaries_db():
+    settings = Settings()
+    if not is_db_exists(settings, "postgres"):
+        pytest.skip("Postgres is not available")
+    create_db(settings, test_db_name)
+    engine = create_engine(get_db_connection_string(settings, test_db_name))
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    rng = random.Random(0)
+    with Session(engine) as db:
+        db.execute(insert(RunKwargs), [{"id": 1, "hardware": "test"}])
+        db.execute(insert(DatabaseStats), [{"id": 1, "run_kwargs_id": 1}])
+        db.execute(insert(Dataset), [{"id": 1, "name": "test", "directory": "test"}])
+        db.execute(insert(WorkloadRun), [{"id": run_id, "file_path": f"run_{run_id}", "file_name": f"run_{run_id}", "dataset_id": 1, "database_stats_id": 1, "run_kwargs_id": 1} for run_id in [1, 2]])
+        for run_id in [1, 2]:
+            ids = range((run_id - 1) * plans_per_run + 1, run_id * plans_per_run + 1)
+            db.execute(
+                insert(PlanParameters),
+                [{"id": i, "op_name": "Seq Scan", "est_startup_cost": 0, "est_cost": 0, "est_card": 0, "est_width": 0, "act_startup_cost": 0, "act_time": 0, "act_card": 0, "act_children_card": 0, "est_children_card": 0, "workers_planned": 0} for i in ids],
+            )
+            db.execute(
+                insert(PlanStats),
+                [{"id": i, "workload_run_id": run_id, "tables": rng.randint(1, 6), "columns": rng.randint(1, 20), "plans": rng.randint(1, 15), "joins": rng.randint(0, 5), "predicates": rng.randint(0, 10), "nodes": rng.randint(1, 60), "order_by": False} for i in ids],
+            )
+            db.execute(
+                insert(Plan),
+                [{"id": i, "id_in_run": n, "plan_parameters_id": i, "plan_runtime": rng.random() * 1000, "database_id": 0, "node_type": "plan", "workload_run_id": run_id, "plan_stats_id": i} for n, i in enumerate(ids)],
+            )
+        db.commit()
+        yield db
+    Base.metadata.drop_all(engine)
+    engine.dispose()
+
+
+def test_runtime_histogram():
+    assert get_runtime_histogram([], 4) == {"bin_edges": [], "counts": []}
+    assert get_runtime_histogram([2.0, 2.0], 4) == {"bin_edges": [2.0, 2.0], "counts": [2]}
+    assert get_runtime_histogram([0.0, 1.0, 2.5, 4.0], 4) == {"bin_edges": [0.0, 1.0, 2.0, 3.0, 4.0], "counts": [1, 1, 1, 1]}
+
+
+def test_computed_summaries_are_not_stored(summaries_db: Session):
+    values = compute_workload_run_summary(1, summaries_db)
+    assert values["queries_count"] == plans_per_run
+    assert summaries_db.scalars(select(WorkloadRunSummary.workload_run_id)).all() == []
+
+
+def test_workload_run_summaries(summaries_db: Session):
+    computed = compute_workload_run_summary(1, summaries_db)
+    assert store_missing_workload_run_summaries(summaries_db) == 2
+    assert store_missing_workload_run_summaries(summaries_db) == 0
+    summary = summaries_db.get(WorkloadRunSummary, 1)
+    assert {key: getattr(summary, key) for key in computed} == computed
+    assert summary.queries_count == plans_per_run
+    assert sum(summary.runtime_histogram["counts"]) == plans_per_run
+    for histogram in [summary.joins_histogram, summary.tables_histogram, summary.nodes_histogram]:
+        assert sum(histogram.values()) == plans_per_run
+    assert summary.runtime_min <= summary.runtime_mean <= summary.runtime_max
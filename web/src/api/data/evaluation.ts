@@ -60,3 +60,7 @@ export function isFidelityType(str: string): str is FidelityType {
 }
 
 export const evaluationTypes = [...fidelityTypes, ...correlationTypes] as const;
+
+export interface Evaluations {
+  evaluations: Partial<Record<EvaluationType, ScoreEvaluation>>;
+}
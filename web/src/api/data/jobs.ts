@@ -0,0 +1,15 @@
+export const jobStatuses = [
+  'pending',
+  'running',
+  'succeeded',
+  'failed',
+] as const;
+
+export type JobStatus = (typeof jobStatuses)[number];
+
+export interface Job<T> {
+  id: string;
+  status: JobStatus;
+  result: T | undefined;
+  error: string | undefined;
+}
@@ -4,6 +4,8 @@ export interface Dataset {
   id: number;
   name: string;
   defaultZeroShotModelId: number;
+  workloadsCount: number;
+  queriesCount: number;
 }
 
 export interface Workload {
@@ -13,6 +15,23 @@ export interface Workload {
   queriesCount: number;
 }
 
+export interface RuntimeHistogram {
+  binEdges: number[];
+  counts: number[];
+}
+
+export interface WorkloadSummary {
+  workloadRunId: number;
+  queriesCount: number;
+  runtimeMin: number | null;
+  runtimeMax: number | null;
+  runtimeMean: number | null;
+  runtimeHistogram: RuntimeHistogram;
+  joinsHistogram: Record<number, number>;
+  tablesHistogram: Record<number, number>;
+  nodesHistogram: Record<number, number>;
+}
+
 export interface QueryStats {
   tables: number;
   columns: number;
@@ -36,9 +55,12 @@ export interface QueriesPage {
   limit: number;
   offset: number;
   totalCount: number;
+  nextCursor: string | null;
+  prevCursor: string | null;
 }
 
 export interface FullPlan extends Plan {
   dotGraph: string;
+  svg: string | null;
   graphNodes: GraphNode[];
 }
@@ -1,11 +1,13 @@
 import { api } from '@/lib/api';
 import { combineUseQueries } from '@/lib/combineUseQueries';
-import { skipToken, useQueries } from '@tanstack/react-query';
+import { skipToken, useQueries, useQuery } from '@tanstack/react-query';
 
 import {
   CorrelationEvaluation,
   CorrelationType,
   correlationTypes,
+  Evaluations,
+  EvaluationType,
   FidelityEvaluation,
   FidelityType,
   fidelityTypes,
@@ -29,6 +31,43 @@ function getFidelity(
     .json();
 }
 
+function getEvaluations(
+  { queryId, explanation }: EvaluationPrams,
+  types: readonly EvaluationType[],
+) {
+  return api
+    .post<Evaluations>('evaluation-fns/all', {
+      searchParams: [
+        ['query_id', queryId],
+        ...types.map((type) => ['types', type]),
+      ],
+      json: explanation,
+    })
+    .json();
+}
+
+interface EvaluationPramsTypes<T extends EvaluationType> {
+  queryId?: number;
+  explanation: Explanation | undefined;
+  types: readonly T[];
+}
+
+// Computes all types in one request, which shares the plan, explanation and predictions between the metrics
+export function useGetEvaluations<T extends EvaluationType>({
+  queryId,
+  explanation,
+  types,
+}: EvaluationPramsTypes<T>) {
+  return useQuery({
+    queryKey: [queryId, explanation, types],
+    queryFn:
+      explanation != undefined && queryId != undefined
+        ? () => getEvaluations({ queryId, explanation }, types)
+        : skipToken,
+    select: (data) => types.map((type) => data.evaluations[type]!),
+  });
+}
+
 interface EvaluationPramsFidelitySingle {
   queryId?: number;
   explanation: Explanation | undefined;
@@ -38,19 +77,7 @@ export function useGetFidelityEvaluationsAllTypes({
   queryId,
   explanation,
 }: EvaluationPramsFidelitySingle) {
-  return useQueries({
-    queries: fidelityTypes.map(
-      (fidelityType) =>
-        ({
-          queryKey: [queryId, explanation, fidelityType],
-          queryFn:
-            explanation != undefined && queryId != undefined
-              ? () => getFidelity({ queryId, explanation }, fidelityType)
-              : skipToken,
-        }) as const,
-    ),
-    combine: combineUseQueries,
-  });
+  return useGetEvaluations({ queryId, explanation, types: fidelityTypes });
 }
 
 interface EvaluationPramsFidelity {
@@ -99,20 +126,9 @@ export function useGetCorrelationEvaluationsAllTypes({
   queryId,
   explanation,
 }: EvaluationPramsCorrelationSingle) {
-  return useQueries({
-    queries: correlationTypes.map(
-      (correlationType) =>
-        ({
-          queryKey: [queryId, explanation, correlationType],
-          queryFn:
-            explanation != undefined && queryId != undefined
-              ? () => getCorrelation({ queryId, explanation }, correlationType)
-              : skipToken,
-        }) as const,
-    ),
-    combine: combineUseQueries,
-  });
+  return useGetEvaluations({ queryId, explanation, types: correlationTypes });
 }
+
 interface EvaluationPramsCorrelation {
   queryId?: number;
   explanations: (Explanation | undefined)[];
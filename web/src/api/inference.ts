@@ -15,6 +15,8 @@ import {
   Prediction,
   ZeroShotModelsResponse,
 } from './data/inference';
+import { Job } from './data/jobs';
+import { waitForJob } from './jobs';
 
 interface GetPredictionParams {
   queryId: number;
@@ -52,16 +54,19 @@ interface GetExplanationParams {
   modelId: number | undefined;
 }
 
-function getExplanation(
+async function getExplanation(
   { queryId, explainerType, modelId }: GetExplanationParams,
   signal?: AbortSignal,
 ) {
-  return api
-    .get<Explanation>(`queries/${queryId}/explanation/${explainerType}`, {
+  const job = await api
+    .post<
+      Job<Explanation>
+    >(`queries/${queryId}/explanation/${explainerType}/jobs`, {
       signal: signal,
       searchParams: { ...(modelId != undefined && { model_id: modelId }) },
     })
     .json();
+  return waitForJob(job, signal);
 }
 
 export function useGetExplanation({
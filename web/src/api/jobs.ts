@@ -0,0 +1,26 @@
+import { api } from '@/lib/api';
+
+import { Job } from './data/jobs';
+
+const pollIntervalMs = 250;
+
+function sleep(ms: number, signal?: AbortSignal) {
+  return new Promise<void>((resolve, reject) => {
+    const timeout = setTimeout(resolve, ms);
+    signal?.addEventListener('abort', () => {
+      clearTimeout(timeout);
+      reject(signal.reason);
+    });
+  });
+}
+
+export async function waitForJob<T>(job: Job<T>, signal?: AbortSignal) {
+  while (job.status == 'pending' || job.status == 'running') {
+    await sleep(pollIntervalMs, signal);
+    job = await api.get<Job<T>>(`jobs/${job.id}`, { signal: signal }).json();
+  }
+  if (job.status == 'failed' || job.result == undefined) {
+    throw new Error(job.error ?? `Job ${job.id} failed`);
+  }
+  return job.result;
+}
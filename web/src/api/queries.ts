@@ -2,7 +2,13 @@ import { PickPartial } from '@/lib/pickPartial';
 import { skipToken, useQuery } from '@tanstack/react-query';
 
 import { api } from '../lib/api';
-import { Dataset, FullPlan, QueriesPage, Workload } from './data/queries';
+import {
+  Dataset,
+  FullPlan,
+  QueriesPage,
+  Workload,
+  WorkloadSummary,
+} from './data/queries';
 
 function getDatasets() {
   return api.get<Dataset[]>('datasets').json();
@@ -28,6 +34,26 @@ export function useGetWorkloads({ datasetId }: Partial<GetWorkloadsParams>) {
   });
 }
 
+interface GetWorkloadSummaryParams {
+  workloadId: number;
+}
+
+function getWorkloadSummary({ workloadId }: GetWorkloadSummaryParams) {
+  return api.get<WorkloadSummary>(`workloads/${workloadId}/summary`).json();
+}
+
+export function useGetWorkloadSummary({
+  workloadId,
+}: Partial<GetWorkloadSummaryParams>) {
+  return useQuery({
+    queryKey: ['workload-summary', workloadId],
+    queryFn:
+      workloadId != undefined
+        ? () => getWorkloadSummary({ workloadId })
+        : skipToken,
+  });
+}
+
 export const sortKeys = [
   'id',
   'nodes',
@@ -47,6 +73,7 @@ interface GetQueriesParams {
   limit: number;
   sortKey: SortKey;
   sortAscending: boolean;
+  cursor?: string;
 }
 
 function getQueries({
@@ -55,6 +82,7 @@ function getQueries({
   limit,
   sortKey,
   sortAscending,
+  cursor,
 }: GetQueriesParams) {
   return api
     .get<QueriesPage>(`workloads/${workloadId}/queries`, {
@@ -63,6 +91,7 @@ function getQueries({
         limit: limit,
         order_by: sortKey,
         ascending: sortAscending,
+        ...(cursor != undefined && { cursor: cursor }),
       },
     })
     .json();
@@ -74,13 +103,29 @@ export function useGetQueries({
   limit,
   sortKey,
   sortAscending,
+  cursor,
 }: PickPartial<GetQueriesParams, 'workloadId'>) {
   return useQuery({
-    queryKey: ['queries', workloadId, offset, limit, sortKey, sortAscending],
+    queryKey: [
+      'queries',
+      workloadId,
+      offset,
+      limit,
+      sortKey,
+      sortAscending,
+      cursor,
+    ],
     queryFn:
       workloadId != undefined
         ? () =>
-            getQueries({ workloadId, offset, limit, sortKey, sortAscending })
+            getQueries({
+              workloadId,
+              offset,
+              limit,
+              sortKey,
+              sortAscending,
+              cursor,
+            })
         : skipToken,
     placeholderData: (prevData, prevQuery) =>
       prevQuery && prevQuery.queryKey[1] == workloadId ? prevData : undefined,
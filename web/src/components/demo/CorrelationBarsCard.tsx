@@ -1,6 +1,6 @@
 import { useState } from 'react';
 import { ExplainerType, explainerTypeToDisplay } from '@/api/data/inference';
-import { useGetCorrelaitonEvaluations } from '@/api/evaluation.ts';
+import { useGetEvaluations } from '@/api/evaluation.ts';
 import { useGetExplanations } from '@/api/inference';
 import { useGetQuery } from '@/api/queries';
 import { getBarColor } from '@/lib/barColors.ts';
@@ -36,27 +36,15 @@ export function CorrelationBarsCard({
 
   const isCardinality = baseExplainersType.includes('Cardinality');
   const correlationTypes = isCardinality
-    ? ['pearson-cardinality', 'spearman-cardinality']
-    : ['pearson', 'spearman'];
+    ? (['pearson-cardinality', 'spearman-cardinality'] as const)
+    : (['pearson', 'spearman'] as const);
 
-  const pearsonCorr = useGetCorrelaitonEvaluations({
+  const correlations = useGetEvaluations({
     queryId,
-    explanations: [explanations.data.at(1)],
-    type: correlationTypes[0] as
-      | 'pearson-cardinality'
-      | 'spearman-cardinality'
-      | 'pearson'
-      | 'spearman',
-  });
-  const spearmanCorr = useGetCorrelaitonEvaluations({
-    queryId,
-    explanations: [explanations.data.at(1)],
-    type: correlationTypes[1] as
-      | 'pearson-cardinality'
-      | 'spearman-cardinality'
-      | 'pearson'
-      | 'spearman',
+    explanation: explanations.data.at(1),
+    types: correlationTypes,
   });
+  const [pearsonCorr, spearmanCorr] = correlations.data ?? [];
 
   const validExplanations = explanations.isSuccess
     ? explanations.data.map((explanation) =>
@@ -128,11 +116,11 @@ export function CorrelationBarsCard({
                       className="font-bold"
                       style={{
                         color: getGreenRedRGB(
-                          1 - (pearsonCorr.data.at(0)?.score ?? 0),
+                          1 - (pearsonCorr?.score ?? 0),
                         ),
                       }}
                     >
-                      {round(pearsonCorr.data.at(0)?.score ?? 0)}
+                      {round(pearsonCorr?.score ?? 0)}
                     </TableCell>
                   </TableRow>
                   <TableRow>
@@ -143,11 +131,11 @@ export function CorrelationBarsCard({
                       className="font-bold"
                       style={{
                         color: getGreenRedRGB(
-                          1 - (spearmanCorr.data.at(0)?.score ?? 0),
+                          1 - (spearmanCorr?.score ?? 0),
                         ),
                       }}
                     >
-                      {round(spearmanCorr.data.at(0)?.score ?? 0)}
+                      {round(spearmanCorr?.score ?? 0)}
                     </TableCell>
                   </TableRow>
                 </TableBody>
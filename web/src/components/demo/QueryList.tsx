@@ -1,4 +1,4 @@
-import { useRef } from 'react';
+import { useRef, useState } from 'react';
 import { SortKey, useGetQueries } from '@/api/queries';
 import { round } from '@/lib/round';
 import { cn } from '@/lib/utils';
@@ -44,12 +44,19 @@ export function QueryList({
   const page = pageInput ?? 0;
   const sortKey = sortKeyInput ?? 'id';
   const sortAscending = sortAscendingInput ?? true;
+  // Cursors of pages reached with Next/Previous, other pages (e.g. opened from a link) are loaded by offset
+  const cursorsKey = `${workloadId}/${sortKey}/${sortAscending}`;
+  const [cursors, setCursors] = useState<{
+    key: string;
+    pages: Record<number, string>;
+  }>({ key: cursorsKey, pages: {} });
   const queries = useGetQueries({
     workloadId: workloadId,
     offset: page * pageSize,
     limit: pageSize,
     sortKey: sortKey,
     sortAscending: sortAscending,
+    cursor: cursors.key == cursorsKey ? cursors.pages[page] : undefined,
   });
   const pageLimit = queries.isSuccess
     ? Math.ceil(queries.data.totalCount / pageSize) - 1
@@ -62,6 +69,20 @@ export function QueryList({
     }
   };
 
+  const goToPage = (newPage: number, cursor: string | null) => {
+    if (cursor != null) {
+      setCursors((prev) => ({
+        key: cursorsKey,
+        pages: {
+          ...(prev.key == cursorsKey ? prev.pages : {}),
+          [newPage]: cursor,
+        },
+      }));
+    }
+    scrollToTop();
+    setPage(newPage);
+  };
+
   const HeaderButton = (props: { text: string; sortKey: SortKey }) => (
     <HeaderSortButton
       text={props.text}
@@ -169,10 +190,7 @@ export function QueryList({
           <Button
             variant="outline"
             size="sm"
-            onClick={() => {
-              scrollToTop();
-              setPage(page - 1);
-            }}
+            onClick={() => goToPage(page - 1, queries.data.prevCursor)}
             disabled={page <= 0}
           >
             Previous
@@ -180,10 +198,7 @@ export function QueryList({
           <Button
             variant="outline"
             size="sm"
-            onClick={() => {
-              scrollToTop();
-              setPage(page + 1);
-            }}
+            onClick={() => goToPage(page + 1, queries.data.nextCursor)}
             disabled={page >= pageLimit}
           >
             Next
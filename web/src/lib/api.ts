@@ -1,7 +1,14 @@
 import ky from 'ky';
 
 const api = ky.extend({
-  retry: 0,
+  // The backend answers 503 with Retry-After while it starts or loads a model.
+  // Only GET requests are retried, POST requests (e.g. submitting jobs) are not idempotent
+  retry: {
+    limit: 20,
+    methods: ['get'],
+    statusCodes: [503],
+    afterStatusCodes: [503],
+  },
   timeout: false,
   prefixUrl: import.meta.env.VITE_BACKEND_URL ?? 'http://127.0.0.1:8000/',
 });